@@ -0,0 +1,362 @@
+// Search, filter and sort the whole catalog in the browser. The rows come from
+// the search index site_generator.py writes next to the pages (search/index.json
+// and its shards). The static page stays in place until the form is used. A
+// query only fetches the shards whose trigram filter can contain a match, and
+// only the grid items in view are rendered.
+(function () {
+    "use strict";
+
+    // size of a grid item: .movie width plus the padding of the list item
+    const ITEM_WIDTH = 170;
+    const ITEM_HEIGHT = 290;
+    // rows rendered above and below the visible ones
+    const OVERSCAN_ROWS = 2;
+
+    const TITLE = 0, NORMALIZED = 1, RATING = 2, YEAR = 3, POSTER = 4, YEAR_TEXT = 5;
+
+    // characters whose str.casefold() in Python differs from their lower case,
+    // and the characters str.split() splits at (tests/test_site_generator.py
+    // compares both with Python)
+    const CASEFOLD = {
+        "\u00b5": "\u03bc", "\u00df": "ss", "\u0149": "\u02bcn", "\u017f": "s", "\u01f0": "j\u030c",
+        "\u0345": "\u03b9", "\u0390": "\u03b9\u0308\u0301", "\u03b0": "\u03c5\u0308\u0301", "\u03c2": "\u03c3",
+        "\u03d0": "\u03b2", "\u03d1": "\u03b8", "\u03d5": "\u03c6", "\u03d6": "\u03c0", "\u03f0": "\u03ba",
+        "\u03f1": "\u03c1", "\u03f5": "\u03b5", "\u0587": "\u0565\u0582", "\u13a0": "\u13a0", "\u13a1": "\u13a1",
+        "\u13a2": "\u13a2", "\u13a3": "\u13a3", "\u13a4": "\u13a4", "\u13a5": "\u13a5", "\u13a6": "\u13a6",
+        "\u13a7": "\u13a7", "\u13a8": "\u13a8", "\u13a9": "\u13a9", "\u13aa": "\u13aa", "\u13ab": "\u13ab",
+        "\u13ac": "\u13ac", "\u13ad": "\u13ad", "\u13ae": "\u13ae", "\u13af": "\u13af", "\u13b0": "\u13b0",
+        "\u13b1": "\u13b1", "\u13b2": "\u13b2", "\u13b3": "\u13b3", "\u13b4": "\u13b4", "\u13b5": "\u13b5",
+        "\u13b6": "\u13b6", "\u13b7": "\u13b7", "\u13b8": "\u13b8", "\u13b9": "\u13b9", "\u13ba": "\u13ba",
+        "\u13bb": "\u13bb", "\u13bc": "\u13bc", "\u13bd": "\u13bd", "\u13be": "\u13be", "\u13bf": "\u13bf",
+        "\u13c0": "\u13c0", "\u13c1": "\u13c1", "\u13c2": "\u13c2", "\u13c3": "\u13c3", "\u13c4": "\u13c4",
+        "\u13c5": "\u13c5", "\u13c6": "\u13c6", "\u13c7": "\u13c7", "\u13c8": "\u13c8", "\u13c9": "\u13c9",
+        "\u13ca": "\u13ca", "\u13cb": "\u13cb", "\u13cc": "\u13cc", "\u13cd": "\u13cd", "\u13ce": "\u13ce",
+        "\u13cf": "\u13cf", "\u13d0": "\u13d0", "\u13d1": "\u13d1", "\u13d2": "\u13d2", "\u13d3": "\u13d3",
+        "\u13d4": "\u13d4", "\u13d5": "\u13d5", "\u13d6": "\u13d6", "\u13d7": "\u13d7", "\u13d8": "\u13d8",
+        "\u13d9": "\u13d9", "\u13da": "\u13da", "\u13db": "\u13db", "\u13dc": "\u13dc", "\u13dd": "\u13dd",
+        "\u13de": "\u13de", "\u13df": "\u13df", "\u13e0": "\u13e0", "\u13e1": "\u13e1", "\u13e2": "\u13e2",
+        "\u13e3": "\u13e3", "\u13e4": "\u13e4", "\u13e5": "\u13e5", "\u13e6": "\u13e6", "\u13e7": "\u13e7",
+        "\u13e8": "\u13e8", "\u13e9": "\u13e9", "\u13ea": "\u13ea", "\u13eb": "\u13eb", "\u13ec": "\u13ec",
+        "\u13ed": "\u13ed", "\u13ee": "\u13ee", "\u13ef": "\u13ef", "\u13f0": "\u13f0", "\u13f1": "\u13f1",
+        "\u13f2": "\u13f2", "\u13f3": "\u13f3", "\u13f4": "\u13f4", "\u13f5": "\u13f5", "\u13f8": "\u13f0",
+        "\u13f9": "\u13f1", "\u13fa": "\u13f2", "\u13fb": "\u13f3", "\u13fc": "\u13f4", "\u13fd": "\u13f5",
+        "\u1c80": "\u0432", "\u1c81": "\u0434", "\u1c82": "\u043e", "\u1c83": "\u0441", "\u1c84": "\u0442",
+        "\u1c85": "\u0442", "\u1c86": "\u044a", "\u1c87": "\u0463", "\u1c88": "\ua64b", "\u1e96": "h\u0331",
+        "\u1e97": "t\u0308", "\u1e98": "w\u030a", "\u1e99": "y\u030a", "\u1e9a": "a\u02be", "\u1e9b": "\u1e61",
+        "\u1e9e": "ss", "\u1f50": "\u03c5\u0313", "\u1f52": "\u03c5\u0313\u0300", "\u1f54": "\u03c5\u0313\u0301",
+        "\u1f56": "\u03c5\u0313\u0342", "\u1f80": "\u1f00\u03b9", "\u1f81": "\u1f01\u03b9", "\u1f82": "\u1f02\u03b9",
+        "\u1f83": "\u1f03\u03b9", "\u1f84": "\u1f04\u03b9", "\u1f85": "\u1f05\u03b9", "\u1f86": "\u1f06\u03b9",
+        "\u1f87": "\u1f07\u03b9", "\u1f88": "\u1f00\u03b9", "\u1f89": "\u1f01\u03b9", "\u1f8a": "\u1f02\u03b9",
+        "\u1f8b": "\u1f03\u03b9", "\u1f8c": "\u1f04\u03b9", "\u1f8d": "\u1f05\u03b9", "\u1f8e": "\u1f06\u03b9",
+        "\u1f8f": "\u1f07\u03b9", "\u1f90": "\u1f20\u03b9", "\u1f91": "\u1f21\u03b9", "\u1f92": "\u1f22\u03b9",
+        "\u1f93": "\u1f23\u03b9", "\u1f94": "\u1f24\u03b9", "\u1f95": "\u1f25\u03b9", "\u1f96": "\u1f26\u03b9",
+        "\u1f97": "\u1f27\u03b9", "\u1f98": "\u1f20\u03b9", "\u1f99": "\u1f21\u03b9", "\u1f9a": "\u1f22\u03b9",
+        "\u1f9b": "\u1f23\u03b9", "\u1f9c": "\u1f24\u03b9", "\u1f9d": "\u1f25\u03b9", "\u1f9e": "\u1f26\u03b9",
+        "\u1f9f": "\u1f27\u03b9", "\u1fa0": "\u1f60\u03b9", "\u1fa1": "\u1f61\u03b9", "\u1fa2": "\u1f62\u03b9",
+        "\u1fa3": "\u1f63\u03b9", "\u1fa4": "\u1f64\u03b9", "\u1fa5": "\u1f65\u03b9", "\u1fa6": "\u1f66\u03b9",
+        "\u1fa7": "\u1f67\u03b9", "\u1fa8": "\u1f60\u03b9", "\u1fa9": "\u1f61\u03b9", "\u1faa": "\u1f62\u03b9",
+        "\u1fab": "\u1f63\u03b9", "\u1fac": "\u1f64\u03b9", "\u1fad": "\u1f65\u03b9", "\u1fae": "\u1f66\u03b9",
+        "\u1faf": "\u1f67\u03b9", "\u1fb2": "\u1f70\u03b9", "\u1fb3": "\u03b1\u03b9", "\u1fb4": "\u03ac\u03b9",
+        "\u1fb6": "\u03b1\u0342", "\u1fb7": "\u03b1\u0342\u03b9", "\u1fbc": "\u03b1\u03b9", "\u1fbe": "\u03b9",
+        "\u1fc2": "\u1f74\u03b9", "\u1fc3": "\u03b7\u03b9", "\u1fc4": "\u03ae\u03b9", "\u1fc6": "\u03b7\u0342",
+        "\u1fc7": "\u03b7\u0342\u03b9", "\u1fcc": "\u03b7\u03b9", "\u1fd2": "\u03b9\u0308\u0300",
+        "\u1fd3": "\u03b9\u0308\u0301", "\u1fd6": "\u03b9\u0342", "\u1fd7": "\u03b9\u0308\u0342",
+        "\u1fe2": "\u03c5\u0308\u0300", "\u1fe3": "\u03c5\u0308\u0301", "\u1fe4": "\u03c1\u0313",
+        "\u1fe6": "\u03c5\u0342", "\u1fe7": "\u03c5\u0308\u0342", "\u1ff2": "\u1f7c\u03b9", "\u1ff3": "\u03c9\u03b9",
+        "\u1ff4": "\u03ce\u03b9", "\u1ff6": "\u03c9\u0342", "\u1ff7": "\u03c9\u0342\u03b9", "\u1ffc": "\u03c9\u03b9",
+        "\uab70": "\u13a0", "\uab71": "\u13a1", "\uab72": "\u13a2", "\uab73": "\u13a3", "\uab74": "\u13a4",
+        "\uab75": "\u13a5", "\uab76": "\u13a6", "\uab77": "\u13a7", "\uab78": "\u13a8", "\uab79": "\u13a9",
+        "\uab7a": "\u13aa", "\uab7b": "\u13ab", "\uab7c": "\u13ac", "\uab7d": "\u13ad", "\uab7e": "\u13ae",
+        "\uab7f": "\u13af", "\uab80": "\u13b0", "\uab81": "\u13b1", "\uab82": "\u13b2", "\uab83": "\u13b3",
+        "\uab84": "\u13b4", "\uab85": "\u13b5", "\uab86": "\u13b6", "\uab87": "\u13b7", "\uab88": "\u13b8",
+        "\uab89": "\u13b9", "\uab8a": "\u13ba", "\uab8b": "\u13bb", "\uab8c": "\u13bc", "\uab8d": "\u13bd",
+        "\uab8e": "\u13be", "\uab8f": "\u13bf", "\uab90": "\u13c0", "\uab91": "\u13c1", "\uab92": "\u13c2",
+        "\uab93": "\u13c3", "\uab94": "\u13c4", "\uab95": "\u13c5", "\uab96": "\u13c6", "\uab97": "\u13c7",
+        "\uab98": "\u13c8", "\uab99": "\u13c9", "\uab9a": "\u13ca", "\uab9b": "\u13cb", "\uab9c": "\u13cc",
+        "\uab9d": "\u13cd", "\uab9e": "\u13ce", "\uab9f": "\u13cf", "\uaba0": "\u13d0", "\uaba1": "\u13d1",
+        "\uaba2": "\u13d2", "\uaba3": "\u13d3", "\uaba4": "\u13d4", "\uaba5": "\u13d5", "\uaba6": "\u13d6",
+        "\uaba7": "\u13d7", "\uaba8": "\u13d8", "\uaba9": "\u13d9", "\uabaa": "\u13da", "\uabab": "\u13db",
+        "\uabac": "\u13dc", "\uabad": "\u13dd", "\uabae": "\u13de", "\uabaf": "\u13df", "\uabb0": "\u13e0",
+        "\uabb1": "\u13e1", "\uabb2": "\u13e2", "\uabb3": "\u13e3", "\uabb4": "\u13e4", "\uabb5": "\u13e5",
+        "\uabb6": "\u13e6", "\uabb7": "\u13e7", "\uabb8": "\u13e8", "\uabb9": "\u13e9", "\uabba": "\u13ea",
+        "\uabbb": "\u13eb", "\uabbc": "\u13ec", "\uabbd": "\u13ed", "\uabbe": "\u13ee", "\uabbf": "\u13ef",
+        "\ufb00": "ff", "\ufb01": "fi", "\ufb02": "fl", "\ufb03": "ffi", "\ufb04": "ffl", "\ufb05": "st",
+        "\ufb06": "st", "\ufb13": "\u0574\u0576", "\ufb14": "\u0574\u0565", "\ufb15": "\u0574\u056b",
+        "\ufb16": "\u057e\u0576", "\ufb17": "\u0574\u056d"
+    };
+    const SPACES = "\t\n\u000b\f\r\u001c\u001d\u001e\u001f \u0085\u00a0\u1680\u2000\u2001\u2002\u2003\u2004\u2005\u2006\u2007\u2008\u2009\u200a\u2028\u2029\u202f\u205f\u3000";
+
+    // like SearchIndex.normalize(): casefolded, whitespace collapsed
+    function normalize(text) {
+        let folded = "";
+        for (const character of text) {
+            folded += SPACES.includes(character) ? " "
+                : CASEFOLD.hasOwnProperty(character) ? CASEFOLD[character] : character.toLowerCase();
+        }
+        return folded.split(" ").filter(Boolean).join(" ");
+    }
+
+    // like SearchIndex.trigrams(): the 3 character substrings of the text
+    function trigrams(text) {
+        const characters = Array.from(text);
+        const result = [];
+        for (let i = 0; i + 3 <= characters.length; i++) {
+            result.push(characters.slice(i, i + 3).join(""));
+        }
+        return result;
+    }
+
+    const CRC_TABLE = Array.from({length: 256}, function (_, byte) {
+        let crc = byte;
+        for (let bit = 0; bit < 8; bit++) {
+            crc = crc & 1 ? 0xedb88320 ^ (crc >>> 1) : crc >>> 1;
+        }
+        return crc >>> 0;
+    });
+    const encoder = new TextEncoder();
+
+    // like zlib.crc32() of the UTF-8 encoded text
+    function crc32(text) {
+        let crc = 0xffffffff;
+        for (const byte of encoder.encode(text)) {
+            crc = CRC_TABLE[(crc ^ byte) & 0xff] ^ (crc >>> 8);
+        }
+        return (crc ^ 0xffffffff) >>> 0;
+    }
+
+    // true if the trigram filter of a shard (SiteGenerator.trigram_filter())
+    // has the bits of every trigram set
+    function mayContain(bitmap, queryTrigrams) {
+        const size = bitmap.length * 8;
+        return queryTrigrams.every(function (trigram) {
+            const bit = crc32(trigram) % size;
+            return (bitmap[bit >> 3] & (1 << (bit & 7))) !== 0;
+        });
+    }
+
+    if (typeof module === "object") {
+        module.exports = {normalize: normalize, trigrams: trigrams, crc32: crc32, mayContain: mayContain};
+        return;
+    }
+
+    const form = document.querySelector(".movie-search");
+    const viewport = document.querySelector(".movie-viewport");
+    const staticMovies = document.querySelector(".static-movies");
+    if (!form || !viewport || !window.fetch) {
+        return;
+    }
+
+    const grid = document.createElement("ol");
+    grid.className = "movie-grid movie-grid-virtual";
+    viewport.appendChild(grid);
+
+    let searchIndex = null;
+    let filters = [];
+    // rows of the fetched shards, in the order they arrived, and their position in the catalog
+    const rows = [];
+    const positions = [];
+    // shard number -> promise of the shard being fetched and added to rows
+    const shardLoads = new Map();
+    // sort key -> row numbers in that order, built on first use
+    let orders = {};
+    // row numbers of the movies matching the form
+    let matches = [];
+    let renderPending = false;
+    // tells the latest update apart from older ones still waiting for shards
+    let updateCount = 0;
+
+    function escapeHtml(text) {
+        return String(text).replace(/[&<>"']/g, function (character) {
+            return {"&": "&amp;", "<": "&lt;", ">": "&gt;", '"': "&quot;", "'": "&#39;"}[character];
+        });
+    }
+
+    function compareTitles(a, b) {
+        return rows[a][TITLE] < rows[b][TITLE] ? -1 : rows[a][TITLE] > rows[b][TITLE] ? 1 : 0;
+    }
+
+    // missing ratings and years come last, like in the application
+    function compareField(field, descending) {
+        return function (a, b) {
+            const x = rows[a][field], y = rows[b][field];
+            if (x === y) {
+                return compareTitles(a, b);
+            }
+            if (x === null || y === null) {
+                return x === null ? 1 : -1;
+            }
+            return descending ? y - x : x - y;
+        };
+    }
+
+    function order(sortKey) {
+        if (!orders[sortKey]) {
+            const rowNumbers = Array.from(rows.keys());
+            if (sortKey === "title") {
+                rowNumbers.sort(compareTitles);
+            } else if (sortKey === "rating") {
+                rowNumbers.sort(compareField(RATING, true));
+            } else if (sortKey === "year") {
+                rowNumbers.sort(compareField(YEAR, false));
+            } else {
+                rowNumbers.sort(function (a, b) { return positions[a] - positions[b]; });
+            }
+            orders[sortKey] = rowNumbers;
+        }
+        return orders[sortKey];
+    }
+
+    function number(name) {
+        const value = form.elements[name].value;
+        return value === "" ? null : Number(value);
+    }
+
+    async function loadIndex() {
+        if (searchIndex === null) {
+            const response = await fetch("search/index.json");
+            if (!response.ok) {
+                throw new Error(`search/index.json: ${response.status}`);
+            }
+            searchIndex = await response.json();
+            filters = (searchIndex.filters || []).map(function (encoded) {
+                return Uint8Array.from(atob(encoded), function (character) { return character.charCodeAt(0); });
+            });
+        }
+        return searchIndex;
+    }
+
+    function loadShard(shardNumber) {
+        if (!shardLoads.has(shardNumber)) {
+            shardLoads.set(shardNumber, fetch(searchIndex.shards[shardNumber]).then(function (response) {
+                if (!response.ok) {
+                    throw new Error(`${searchIndex.shards[shardNumber]}: ${response.status}`);
+                }
+                return response.json();
+            }).then(function (shardRows) {
+                shardRows.forEach(function (row, i) {
+                    rows.push(row);
+                    positions.push(shardNumber * searchIndex.shard_size + i);
+                });
+                orders = {};
+            }).catch(function (error) {
+                // fetched again by the next update
+                shardLoads.delete(shardNumber);
+                throw error;
+            }));
+        }
+        return shardLoads.get(shardNumber);
+    }
+
+    function showStatic(visible) {
+        staticMovies.hidden = !visible;
+        viewport.hidden = visible;
+    }
+
+    async function update() {
+        const updateNumber = ++updateCount;
+        const words = normalize(form.elements.query.value).split(" ").filter(Boolean);
+        const minRating = number("min-rating");
+        const yearFrom = number("year-from");
+        const yearTo = number("year-to");
+        const sortKey = form.elements.sort.value;
+        const counter = form.querySelector(".movie-search-count");
+
+        if (!words.length && minRating === null && yearFrom === null && yearTo === null && !sortKey) {
+            // nothing to search for, the static page shows the stored order
+            showStatic(true);
+            counter.textContent = "";
+            return;
+        }
+
+        await loadIndex();
+        // a shard can only contain a match if it has every trigram of the query
+        // words, words shorter than a trigram or filters alone need every shard
+        const queryTrigrams = words.flatMap(trigrams);
+        const shardNumbers = Array.from(searchIndex.shards.keys()).filter(function (shardNumber) {
+            return !queryTrigrams.length || !filters[shardNumber] || mayContain(filters[shardNumber], queryTrigrams);
+        });
+        const pending = shardNumbers.map(loadShard);
+
+        function show(loaded) {
+            matches = order(sortKey).filter(function (rowNumber) {
+                const row = rows[rowNumber];
+                return words.every(function (word) { return row[NORMALIZED].includes(word); })
+                    && (minRating === null || (row[RATING] !== null && row[RATING] >= minRating))
+                    && (yearFrom === null || (row[YEAR] !== null && row[YEAR] >= yearFrom))
+                    && (yearTo === null || (row[YEAR] !== null && row[YEAR] <= yearTo));
+            });
+            counter.textContent = loaded < pending.length
+                ? `${matches.length} of ${searchIndex.count} movies (searching ${loaded} of ${pending.length} parts)`
+                : `${matches.length} of ${searchIndex.count} movies`;
+            showStatic(false);
+            scheduleRender();
+        }
+
+        // the shards are fetched concurrently, the matches are shown as they arrive
+        show(0);
+        for (let i = 0; i < pending.length; i++) {
+            await pending[i];
+            if (updateNumber !== updateCount) {
+                return;
+            }
+            show(i + 1);
+        }
+    }
+
+    function render() {
+        renderPending = false;
+        if (viewport.hidden) {
+            return;
+        }
+        const columns = Math.max(1, Math.floor(viewport.clientWidth / ITEM_WIDTH));
+        const rowCount = Math.ceil(matches.length / columns);
+        viewport.style.height = `${rowCount * ITEM_HEIGHT}px`;
+
+        const top = window.scrollY - viewport.offsetTop;
+        const firstRow = Math.max(0, Math.floor(top / ITEM_HEIGHT) - OVERSCAN_ROWS);
+        const lastRow = Math.min(rowCount, Math.ceil((top + window.innerHeight) / ITEM_HEIGHT) + OVERSCAN_ROWS);
+        const left = (viewport.clientWidth - columns * ITEM_WIDTH) / 2;
+
+        const items = [];
+        for (let index = firstRow * columns; index < Math.min(matches.length, lastRow * columns); index++) {
+            const row = rows[matches[index]];
+            const x = left + (index % columns) * ITEM_WIDTH;
+            const y = Math.floor(index / columns) * ITEM_HEIGHT;
+            items.push(
+                `<li style="left:${x}px;top:${y}px">` +
+                `<div class="movie">` +
+                `<img class="movie-poster" src="${escapeHtml(row[POSTER])}" loading="lazy" title=""/>` +
+                `<div class="movie-title">${escapeHtml(row[TITLE])}</div>` +
+                `<div class="movie-year">${escapeHtml(row[YEAR_TEXT])}</div>` +
+                `</div>` +
+                `</li>`);
+        }
+        grid.innerHTML = items.join("");
+    }
+
+    function scheduleRender() {
+        if (!renderPending) {
+            renderPending = true;
+            window.requestAnimationFrame(render);
+        }
+    }
+
+    function fallBack() {
+        // without the search index the static pages stay in place
+        form.hidden = true;
+        showStatic(true);
+    }
+
+    let updateTimer = null;
+    function scheduleUpdate() {
+        clearTimeout(updateTimer);
+        updateTimer = setTimeout(function () { update().catch(fallBack); }, 100);
+    }
+
+    // nothing is fetched before the form is used
+    form.hidden = false;
+    form.addEventListener("input", scheduleUpdate);
+    form.addEventListener("submit", function (event) { event.preventDefault(); });
+    window.addEventListener("scroll", scheduleRender, {passive: true});
+    window.addEventListener("resize", scheduleRender);
+})();
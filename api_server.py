@@ -0,0 +1,241 @@
+import gzip
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlparse
+
+from istorage import IStorage
+
+
+class MovieApiHandler(BaseHTTPRequestHandler):
+    # keep connections open between requests, every response has a Content-Length
+    protocol_version = "HTTP/1.1"
+    # headers and body are written separately, without TCP_NODELAY the body waits
+    # for the delayed ACK of the headers on a kept-alive connection (~40 ms)
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        """
+        Answer a GET request with the JSON response of MovieApiServer, 304 Not
+        Modified if the client already has it and gzip compressed if the client
+        accepts it.
+        """
+        status, etag, body, gzip_body = self.server.response(self.path)
+
+        if_none_match = [tag.strip() for tag in self.headers.get("If-None-Match", "").split(",")]
+        if etag is not None and (etag in if_none_match or "*" in if_none_match):
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.end_headers()
+            return
+
+        use_gzip = gzip_body is not None and "gzip" in self.headers.get("Accept-Encoding", "")
+        if use_gzip:
+            body = gzip_body
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Vary", "Accept-Encoding")
+        if use_gzip:
+            self.send_header("Content-Encoding", "gzip")
+        if etag is not None:
+            self.send_header("ETag", etag)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        if self.server.log_requests:
+            super().log_message(format, *args)
+
+
+class MovieApiServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # responses of at least this many bytes are gzip compressed
+    GZIP_MIN_SIZE = 1024
+    # number of encoded responses kept for the current revision of the database
+    RESPONSE_CACHE_SIZE = 256
+    # number of movies per page if the request has no limit, and the largest limit
+    DEFAULT_LIMIT = 100
+    MAX_LIMIT = 1000
+
+    def __init__(self, server_address, storage, log_requests=False):
+        """
+        Constructor of class MovieApiServer. A threaded HTTP server answering
+        read-only JSON requests from a storage:
+
+            GET /movies?offset=0&limit=100&sort=rating   a page of movies
+            GET /movies/<title>                          a single movie
+            GET /search?q=dark&fuzzy=1&limit=10          titles containing q, or the most similar
+            GET /sorted?offset=0&limit=100&min_rating=7  (title, rating) sorted by rating
+            GET /stats                                   the rating statistics
+
+        Requests share the storage, its access is serialized. The storage picks
+        up changes of other processes before every request. Responses carry the
+        revision of the database as ETag, so clients revalidate with a
+        304 Not Modified, and are cached until the revision changes.
+
+        Parameters:
+            server_address (tuple): (host, port) to listen on, port 0 picks a free port.
+            storage (IStorage): The storage the movies are read from.
+            log_requests (bool, optional): Log every request to stderr.
+        """
+        super().__init__(server_address, MovieApiHandler)
+        self.storage = storage
+        self.log_requests = log_requests
+        self.storage_lock = threading.Lock()
+        # tells the revisions of different server runs apart
+        self.instance = f"{time.time_ns():x}"
+        self._responses = {}
+        self._responses_revision = None
+
+    @staticmethod
+    def movie_json(movie_title, movie):
+        """
+        Return the JSON object of a movie. year is the (first) year as number,
+        year_text the year as written in the data, e.g. "2008–2013" of a series.
+        """
+        return {"title": movie_title, "rating": movie.rating, "year": movie.year, "year_text": movie.year_text,
+                "poster": movie.poster}
+
+    @staticmethod
+    def int_parameter(parameters, name, default, minimum=0, maximum=None):
+        """
+        Return an integer query parameter, raise ValueError if it is invalid.
+        """
+        value = parameters.get(name, [None])[0]
+        if value is None:
+            return default
+        number = int(value)
+        if number < minimum:
+            raise ValueError(f"{name} must be at least {minimum}")
+        if maximum is not None and number > maximum:
+            raise ValueError(f"{name} must be at most {maximum}")
+        return number
+
+    @staticmethod
+    def float_parameter(parameters, name):
+        """
+        Return a float query parameter or None, raise ValueError if it is invalid.
+        """
+        value = parameters.get(name, [None])[0]
+        return None if value is None else float(value)
+
+    def page_parameters(self, parameters):
+        """
+        Return (offset, limit) of a paged request.
+        """
+        return (self.int_parameter(parameters, "offset", 0),
+                self.int_parameter(parameters, "limit", self.DEFAULT_LIMIT, 1, self.MAX_LIMIT))
+
+    def list_page(self, parameters):
+        """
+        GET /movies: a page of movies in the stored order or sorted by title, rating or year.
+        """
+        offset, limit = self.page_parameters(parameters)
+        sort_key = parameters.get("sort", [None])[0]
+        movies = self.storage.list_movies_page(offset, limit, sort_key)
+        return 200, {"count": self.storage.count_movies(), "offset": offset, "limit": limit,
+                     "movies": [self.movie_json(movie_title, movie) for movie_title, movie in movies]}
+
+    def get_movie(self, movie_title):
+        """
+        GET /movies/<title>: a single movie.
+        """
+        movie = self.storage.get_movie(movie_title)
+        if movie is None:
+            return 404, {"error": f"{movie_title} is not on the list"}
+        return 200, self.movie_json(movie_title, movie)
+
+    def search(self, parameters):
+        """
+        GET /search: up to limit movies whose titles contain q (count is the number
+        of all of them), the most similar titles with fuzzy=1.
+        """
+        query = parameters.get("q", [""])[0]
+        if not query:
+            raise ValueError("q is missing")
+        fuzzy = parameters.get("fuzzy", ["0"])[0] not in ("", "0", "false")
+        limit = self.int_parameter(parameters, "limit", 10 if fuzzy else self.DEFAULT_LIMIT, 1, self.MAX_LIMIT)
+        if fuzzy:
+            found_movies = self.storage.fuzzy_search_movies(query, limit=limit)
+        else:
+            found_movies = self.storage.search_movies(query)
+        return 200, {"query": query, "count": len(found_movies),
+                     "movies": [{"title": movie_title, "rating": rating}
+                                for movie_title, rating in found_movies[:limit]]}
+
+    def sorted_page(self, parameters):
+        """
+        GET /sorted: a page of (title, rating) sorted by rating, optionally within rating bounds.
+        """
+        offset, limit = self.page_parameters(parameters)
+        min_rating = self.float_parameter(parameters, "min_rating")
+        max_rating = self.float_parameter(parameters, "max_rating")
+        movies = self.storage.movies_sorted_by_rating(offset, limit, min_rating, max_rating)
+        return 200, {"count": self.storage.count_movies_by_rating(min_rating, max_rating),
+                     "offset": offset, "limit": limit,
+                     "movies": [{"title": movie_title, "rating": rating} for movie_title, rating in movies]}
+
+    def stats(self, parameters):
+        """
+        GET /stats: the rating statistics.
+        """
+        stats = dict(self.storage.movie_stats())
+        for key in ("best", "worst"):
+            if stats[key] is not None:
+                movie_title, rating = stats[key]
+                stats[key] = {"title": movie_title, "rating": rating}
+        return 200, stats
+
+    def route(self, path, parameters):
+        """
+        Answer a request from the storage.
+
+        Returns:
+            tuple: (HTTP status, JSON object)
+        """
+        if path.startswith("/movies/"):
+            return self.get_movie(unquote(path[len("/movies/"):]))
+        handler = {
+            "/movies": self.list_page,
+            "/search": self.search,
+            "/sorted": self.sorted_page,
+            "/stats": self.stats
+        }.get(path)
+        if handler is None:
+            return 404, {"error": f"Unknown path: {path}"}
+        try:
+            return handler(parameters)
+        except ValueError as e:
+            return 400, {"error": str(e)}
+
+    def response(self, request_path):
+        """
+        Return the encoded response of a request:
+            (HTTP status, ETag or None, body, gzip compressed body or None)
+
+        Successful responses are cached until the revision of the database changes.
+        """
+        with self.storage_lock:
+            self.storage.refresh()
+            revision = self.storage.revision
+            if revision != self._responses_revision:
+                self._responses.clear()
+                self._responses_revision = revision
+            cached_response = self._responses.get(request_path)
+            if cached_response is not None:
+                return cached_response
+            url = urlparse(request_path)
+            status, payload = self.route(url.path, parse_qs(url.query))
+
+        body = IStorage.serializer.dumps(payload)
+        gzip_body = gzip.compress(body, compresslevel=5) if len(body) >= self.GZIP_MIN_SIZE else None
+        etag = f'"{self.instance}-{revision}"' if status == 200 else None
+        response = (status, etag, body, gzip_body)
+
+        if status == 200:
+            with self.storage_lock:
+                if revision == self._responses_revision and len(self._responses) < self.RESPONSE_CACHE_SIZE:
+                    self._responses[request_path] = response
+        return response
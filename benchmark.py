@@ -0,0 +1,829 @@
+import argparse
+import contextlib
+import csv
+import gc
+import http.client
+import importlib
+import json
+import multiprocessing
+import os
+import random
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+from urllib.parse import parse_qs, quote, urlparse
+
+
+@contextlib.contextmanager
+def scratch_dir():
+    """
+    Run the wrapped block inside a temporary working directory that contains
+    a dummy data/api_key.json, so MovieApp can be created without touching
+    the real movie database.
+    """
+    old_cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        os.makedirs(os.path.join(tmp_dir, "data"))
+        with open(os.path.join(tmp_dir, "data", "api_key.json"), "w") as f:
+            json.dump({"api_key": "benchmark"}, f)
+        os.chdir(tmp_dir)
+        try:
+            yield tmp_dir
+        finally:
+            os.chdir(old_cwd)
+
+
+def synthetic_movie(i):
+    """
+    Return an OMDb like response for the i-th synthetic movie.
+    Every tenth title contains a comma to exercise CSV quoting.
+    """
+    title = f"Movie {i}, Part II" if i % 10 == 0 else f"Movie {i}"
+    return {
+        "Title": title,
+        "imdbRating": f"{(i % 90) / 10 + 1:.1f}",
+        "Year": str(1950 + i % 70),
+        "Poster": f"https://example.com/posters/{i}.jpg",
+        "Response": "True"
+    }
+
+
+def write_synthetic_csv(file_path, size):
+    """
+    Write a CSV movie database with the given number of synthetic movies.
+    """
+    with open(file_path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["title", "rating", "year", "poster"])
+        for i in range(size):
+            movie = synthetic_movie(i)
+            writer.writerow([movie["Title"], movie["imdbRating"], movie["Year"], movie["Poster"]])
+
+
+def bench_csv_add(sizes, adds):
+    """
+    Measure StorageCsv.add_movie throughput for databases of different sizes.
+    With incremental index maintenance the adds/sec should stay flat.
+    """
+    from storage_csv import StorageCsv
+
+    results = []
+    with scratch_dir():
+        for size in sizes:
+            write_synthetic_csv("data/movies_data.csv", size)
+            storage = StorageCsv("data/movies_data.csv")
+
+            start = time.perf_counter()
+            for i in range(size, size + adds):
+                storage.add_movie(None, synthetic_movie(i), True)
+            elapsed = time.perf_counter() - start
+
+            results.append({"size": size, "adds": adds, "adds_per_sec": round(adds / elapsed)})
+            print(f"csv add  size={size:>9}  {adds / elapsed:>10.0f} adds/sec")
+    return results
+
+
+def bench_csv_load(sizes):
+    """
+    Measure how many rows per second StorageCsv parses when it is created.
+    """
+    from storage_csv import StorageCsv
+
+    results = []
+    with scratch_dir():
+        for size in sizes:
+            write_synthetic_csv("data/movies_data.csv", size)
+
+            start = time.perf_counter()
+            storage = StorageCsv("data/movies_data.csv")
+            elapsed = time.perf_counter() - start
+
+            assert len(storage.movie_dict) == size
+            results.append({"size": size, "seconds": round(elapsed, 3),
+                            "rows_per_sec": round(size / elapsed)})
+            print(f"csv load size={size:>9}  {elapsed:>8.3f} s  {size / elapsed:>10.0f} rows/sec")
+    return results
+
+
+def bench_memory(sizes):
+    """
+    Compare the memory used by the catalog as dict of string dictionaries
+    (the former format) and as dict of Movie records.
+    """
+    from movie import Movie
+
+    def measure(build, size):
+        tracemalloc.start()
+        catalog = build(size)
+        used, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        del catalog
+        return used
+
+    def build_dicts(size):
+        catalog = {}
+        for i in range(size):
+            movie = synthetic_movie(i)
+            catalog[movie["Title"]] = {"rating": movie["imdbRating"], "year": movie["Year"],
+                                       "poster": movie["Poster"]}
+        return catalog
+
+    def build_records(size):
+        catalog = {}
+        for i in range(size):
+            movie = synthetic_movie(i)
+            catalog[movie["Title"]] = Movie.from_omdb(movie)
+        return catalog
+
+    results = []
+    for size in sizes:
+        dict_bytes = measure(build_dicts, size)
+        record_bytes = measure(build_records, size)
+        results.append({"size": size, "dict_bytes": dict_bytes, "movie_bytes": record_bytes})
+        print(f"memory   size={size:>9}  dicts {dict_bytes / 2 ** 20:>8.1f} MiB  "
+              f"Movie {record_bytes / 2 ** 20:>8.1f} MiB  ({record_bytes / dict_bytes:.0%})")
+    return results
+
+
+def bench_search(sizes, queries):
+    """
+    Measure the latency of substring and fuzzy queries on the trigram search index.
+    """
+    from search_index import SearchIndex
+
+    results = []
+    for size in sizes:
+        index = SearchIndex(synthetic_movie(i)["Title"] for i in range(size))
+        gc.collect()  # don't time the collection triggered by building the index
+        for query in queries:
+            for kind, search in (("substring", index.search), ("fuzzy", index.fuzzy_search)):
+                start = time.perf_counter()
+                search(query)
+                elapsed = time.perf_counter() - start
+                results.append({"size": size, "query": query, "kind": kind,
+                                "ms": round(elapsed * 1000, 3)})
+                print(f"search   size={size:>9}  {kind:<9} {query!r:<24} {elapsed * 1000:>9.3f} ms")
+    return results
+
+
+def write_synthetic_catalog(storage_name, file_path, size):
+    """
+    Write a movie database with the given number of synthetic movies in the
+    file format of the storage ("json", "csv", "sqlite" or "ndjson").
+    """
+    if storage_name == "csv":
+        write_synthetic_csv(file_path, size)
+    elif storage_name == "ndjson":
+        with open(file_path, "w") as f:
+            for movie in map(synthetic_movie, range(size)):
+                f.write(json.dumps({"title": movie["Title"], "rating": movie["imdbRating"],
+                                    "year": movie["Year"], "poster": movie["Poster"]}) + "\n")
+    elif storage_name == "json":
+        with open(file_path, "w") as f:
+            json.dump({movie["Title"]: {"rating": movie["imdbRating"], "year": movie["Year"],
+                                        "poster": movie["Poster"]}
+                       for movie in map(synthetic_movie, range(size))}, f)
+    else:
+        from storage_sqlite import StorageSqlite
+        StorageSqlite(file_path).add_movies([synthetic_movie(i) for i in range(size)])
+
+
+@contextlib.contextmanager
+def omdb_stub():
+    """
+    Serve OMDb like responses from a local HTTP server, so commands that fetch
+    movies can be timed without network access or API quota. Titles starting
+    with "Unknown" are not found. Yields the URL to use as FETCH_MOVIE_URL.
+    """
+    class OmdbStubHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            movie_title = parse_qs(urlparse(self.path).query).get("t", [""])[0]
+            if movie_title.startswith("Unknown"):
+                response = {"Response": "False", "Error": "Movie not found!"}
+            else:
+                response = dict(synthetic_movie(len(movie_title)), Title=movie_title)
+            body = json.dumps(response).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), OmdbStubHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f"http://127.0.0.1:{server.server_address[1]}/?"
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def time_runs(function, runs):
+    """
+    Call function(run) for run = 0 ... runs - 1 with the output discarded and
+    return the list of durations in milliseconds.
+    """
+    durations = []
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        for run in range(runs):
+            start = time.perf_counter()
+            function(run)
+            durations.append((time.perf_counter() - start) * 1000)
+    return durations
+
+
+def bench_startup(runs, target_ms):
+    """
+    Measure the startup of the interactive application: the import time of
+    main.py (python -X importtime) and the wall time from starting
+    "python main.py" until the menu is shown, with the JSON storage.
+    """
+    repo_dir = os.path.dirname(os.path.abspath(__file__))
+    main_path = os.path.join(repo_dir, "main.py")
+    environment = dict(os.environ, PYTHONPATH=repo_dir)
+
+    # the slowest modules imported by main, cumulative microseconds
+    output = subprocess.run([sys.executable, "-X", "importtime", "-c", "import main"],
+                            capture_output=True, text=True, cwd=repo_dir).stderr
+    imports = []
+    for line in output.splitlines():
+        if line.startswith("import time:") and "|" in line:
+            _, cumulative, module = line.split("|")
+            if module.strip() == "site":
+                # everything before belongs to the interpreter startup
+                imports = []
+            elif cumulative.strip().isdigit():
+                imports.append((int(cumulative), module.strip()))
+    import_ms = next(cumulative for cumulative, module in imports if module == "main") / 1000
+    print(f"startup  import main {import_ms:>8.1f} ms")
+    for cumulative, module in sorted(imports, reverse=True)[:8]:
+        print(f"           {module:<30} {cumulative / 1000:>8.1f} ms")
+
+    durations = []
+    with scratch_dir():
+        with open("data/movies_data.json", "w") as f:
+            json.dump({}, f)
+        for _ in range(runs):
+            start = time.perf_counter()
+            process = subprocess.Popen([sys.executable, main_path], stdin=subprocess.PIPE,
+                                       stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                                       env=environment)
+            process.stdin.write(b"1\n")
+            process.stdin.flush()
+            # input() flushes its prompt, so the menu arrives as soon as it is shown
+            shown = b""
+            while b"Enter you choice" not in shown:
+                chunk = process.stdout.read1(4096)
+                if not chunk:
+                    raise RuntimeError("main.py exited before the menu was shown")
+                shown += chunk
+            durations.append((time.perf_counter() - start) * 1000)
+            process.kill()
+            process.wait()
+
+    menu_ms = statistics.median(durations)
+    print(f"startup  first menu  {menu_ms:>8.1f} ms (median of {runs}, "
+          f"{'within' if menu_ms <= target_ms else 'over'} the {target_ms} ms target)")
+    return [{"import_ms": round(import_ms, 3), "menu_ms": round(menu_ms, 3),
+             "target_ms": target_ms}]
+
+
+def bench_suite(storages, sizes, runs):
+    """
+    Time the construction, the mutators, every MovieApp command and the website
+    generation of each storage on synthetic catalogs. OMDb is replaced by a
+    local stub and the interactive prompts are answered by the benchmark.
+    """
+    from movie_app import MovieApp
+    from storage_csv import StorageCsv
+    from storage_json import StorageJson
+    from storage_ndjson import StorageNdjson
+    from storage_sqlite import StorageSqlite
+
+    storage_classes = {"json": StorageJson, "csv": StorageCsv, "sqlite": StorageSqlite,
+                       "ndjson": StorageNdjson}
+    template_path = os.path.abspath(os.path.join(os.path.dirname(__file__), "_static",
+                                                 "index_template.html"))
+    results = []
+
+    def record(storage_name, size, operation, durations):
+        results.append({"storage": storage_name, "size": size, "operation": operation,
+                        "runs": len(durations), "min_ms": round(min(durations), 3),
+                        "median_ms": round(statistics.median(durations), 3)})
+        print(f"suite    {storage_name:<6} size={size:>9}  {operation:<28} "
+              f"min {min(durations):>10.3f} ms  median {statistics.median(durations):>10.3f} ms")
+
+    def command(app, method_name, answers):
+        # answers are returned by input() one after another
+        def run_command(run):
+            with mock.patch("builtins.input", side_effect=list(answers(run))):
+                getattr(app, method_name)()
+        return run_command
+
+    with scratch_dir(), omdb_stub() as stub_url:
+        os.makedirs("_static")
+        for storage_name in storages:
+            for size in sizes:
+                file_path = f"data/movies_data.{storage_name}"
+                for path in (file_path, file_path + ".journal", file_path + ".idx"):
+                    if os.path.exists(path):
+                        os.remove(path)
+                write_synthetic_catalog(storage_name, file_path, size)
+                storage_class = storage_classes[storage_name]
+
+                record(storage_name, size, "load",
+                       time_runs(lambda run: storage_class(file_path), runs))
+                storage = storage_class(file_path)
+                app = MovieApp(storage)
+                app.FETCH_MOVIE_URL = stub_url
+
+                # titles without ", Part II", the commands title-case their input
+                titles = [synthetic_movie(i)["Title"] for i in range(1, size, 10)][:runs * 3]
+                new_movies = [synthetic_movie(size + i) for i in range(runs)]
+
+                record(storage_name, size, "add_movie", time_runs(
+                    lambda run: storage.add_movie(None, new_movies[run], True), runs))
+                record(storage_name, size, "update_movie", time_runs(
+                    lambda run: storage.update_movie(titles[run], 8.5), runs))
+                record(storage_name, size, "delete_movie", time_runs(
+                    lambda run: storage.delete_movie(titles[run]), runs))
+
+                # new titles for every run, so no OMDb response comes from the cache
+                title_files = []
+                for run in range(runs):
+                    title_files.append(os.path.abspath(f"titles-{run}.txt"))
+                    with open(title_files[-1], "w") as f:
+                        f.write("\n".join(f"Stub Batch {storage_name} {size} {run} {i}"
+                                           for i in range(100)))
+
+                commands = [
+                    ("list_movies", "_command_list_movies", lambda run: []),
+                    ("add_movie", "_command_add_movie",
+                     lambda run: [f"Stub Movie {storage_name} {size} {run}"]),
+                    ("add_movies", "_command_add_movies", lambda run: [title_files[run]]),
+                    ("update_movie", "_command_update_movie",
+                     lambda run: [titles[runs + run], "7.7"]),
+                    ("delete_movie", "_command_delete_movie", lambda run: [titles[2 * runs + run]]),
+                    ("movie_stats", "_command_movie_stats", lambda run: []),
+                    ("movie_random", "_command_movie_random", lambda run: []),
+                    ("search_movie", "_command_search_movie", lambda run: ["Movie 12"]),
+                    ("search_movie_fuzzy", "_command_search_movie", lambda run: ["Moive 123"]),
+                    ("sort_movie", "_command_sort_movie", lambda run: ["", "q"]),
+                    ("sort_movie_range", "_command_sort_movie", lambda run: ["7.5-8.0", "q"]),
+                ]
+                for operation, method_name, answers in commands:
+                    record(storage_name, size, f"command {operation}",
+                           time_runs(command(app, method_name, answers), runs))
+
+                shutil.rmtree("_static")
+                os.makedirs("_static")
+                record(storage_name, size, "generate_website", time_runs(
+                    lambda run: app.generate_website(template_path), 1))
+                record(storage_name, size, "generate_website_warm", time_runs(
+                    lambda run: app.generate_website(template_path), runs))
+    return results
+
+
+def stress_storage(storage_name, file_path):
+    """
+    Open the storage of a stress test worker. JSON journals and NDJSON catalogs
+    are compacted after 16 KB, so compactions run while other workers write.
+    """
+    if storage_name == "json":
+        from storage_json import StorageJson
+        return StorageJson(file_path, compact_threshold=16 * 1024)
+    if storage_name == "ndjson":
+        from storage_ndjson import StorageNdjson
+        return StorageNdjson(file_path, compact_threshold=16 * 1024)
+    from cli import create_storage
+    return create_storage(storage_name, file_path)
+
+
+def stress_worker(storage_name, file_path, worker, operations, shared_titles):
+    """
+    Run random mutations against a storage shared with other processes. Every
+    worker adds, updates and deletes titles of its own and races the others
+    to add the shared titles.
+
+    Returns:
+        tuple: (expected {title: rating} of the own titles, shared titles this
+            worker added, number of own mutations that failed)
+    """
+    rng = random.Random(worker)
+    storage = stress_storage(storage_name, file_path)
+    expected = {}
+    shared_added = []
+    failed = 0
+    for i in range(operations):
+        choice = rng.random()
+        if choice < 0.4 or not expected:
+            movie = dict(synthetic_movie(i), Title=f"Stress {worker} {i}")
+            ((movie_title, added, _),) = storage.add_movies([movie])
+            if added:
+                expected[movie_title] = float(movie["imdbRating"])
+            else:
+                failed += 1
+        elif choice < 0.65:
+            movie_title = rng.choice(list(expected))
+            rating = (worker * 7 + i) % 100 / 10
+            if storage.update_movie(movie_title, rating):
+                expected[movie_title] = rating
+            else:
+                # the movie was lost, nobody else touches it
+                failed += 1
+                del expected[movie_title]
+        elif choice < 0.8:
+            movie_title = rng.choice(list(expected))
+            if not storage.delete_movie(movie_title):
+                failed += 1
+            del expected[movie_title]
+        else:
+            movie_title = rng.choice(shared_titles)
+            ((_, added, _),) = storage.add_movies([dict(synthetic_movie(i), Title=movie_title)])
+            if added:
+                shared_added.append(movie_title)
+    return expected, shared_added, failed
+
+
+def bench_stress(storages, processes, operations, size):
+    """
+    Run several processes doing mixed mutations on one database per storage and
+    check that no write was lost: afterwards the database must contain exactly
+    the titles every worker expects with the ratings it wrote last, and every
+    shared title must have been added by a single worker.
+    """
+    results = []
+    shared_titles = [f"Stress Shared {i}" for i in range(max(1, operations // 10))]
+    with scratch_dir():
+        for storage_name in storages:
+            file_path = os.path.abspath(f"data/stress.{storage_name}")
+            write_synthetic_catalog(storage_name, file_path, size)
+
+            start = time.perf_counter()
+            with multiprocessing.Pool(processes) as pool:
+                outcomes = pool.starmap(stress_worker, [
+                    (storage_name, file_path, worker, operations, shared_titles)
+                    for worker in range(processes)])
+            elapsed = time.perf_counter() - start
+
+            movies = stress_storage(storage_name, file_path).list_movies()
+            expected = {}
+            shared_added = []
+            errors = 0
+            for worker_expected, worker_shared_added, worker_failed in outcomes:
+                expected.update(worker_expected)
+                shared_added.extend(worker_shared_added)
+                errors += worker_failed
+            stress_titles = {movie_title for movie_title in movies
+                             if movie_title.startswith("Stress ") and movie_title not in shared_titles}
+            errors += len(stress_titles ^ expected.keys())
+            errors += sum(1 for movie_title, rating in expected.items()
+                          if movie_title in movies and movies[movie_title].rating != rating)
+            errors += len(shared_added) - len(set(shared_added))
+            errors += sum(1 for movie_title in shared_added if movie_title not in movies)
+            errors += abs(len(movies) - size - len(expected) - len(set(shared_added)))
+
+            results.append({"storage": storage_name, "processes": processes,
+                            "operations": processes * operations,
+                            "ops_per_s": round(processes * operations / elapsed, 1),
+                            "errors": errors})
+            print(f"stress   {storage_name:<6} processes={processes:>3}  "
+                  f"{processes * operations:>7} operations  {processes * operations / elapsed:>10.1f} ops/s  "
+                  f"{'OK' if not errors else f'{errors} ERRORS'}")
+    return results
+
+
+def bench_api(storages, size, clients, requests_per_client):
+    """
+    Load test the JSON API (cli.py serve) on a synthetic catalog per storage.
+    Every client thread keeps one connection open and requests a mix of
+    pages, single movies, searches, sorted pages and statistics, first without
+    and then with the ETags of the responses (answered with 304 Not Modified).
+    Reports requests per second and the median and p99 latency.
+    """
+    cli_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "cli.py")
+    paths = ["/stats", "/search?q=Movie%2012", "/search?q=moive%2012&fuzzy=1"]
+    for i in range(50):
+        paths.append(f"/movies?offset={i * size // 50}&limit=100")
+        paths.append(f"/movies?offset={i * 20}&limit=20&sort=rating")
+        paths.append(f"/sorted?offset={i * 20}&limit=20&min_rating=5")
+        paths.append(f"/movies/{quote(synthetic_movie(i * size // 50)['Title'])}")
+    results = []
+
+    def run_clients(port, etags):
+        latencies = []
+        errors = []
+
+        def client(number):
+            connection = http.client.HTTPConnection("127.0.0.1", port)
+            for i in range(requests_per_client):
+                path = paths[(number * requests_per_client + i) % len(paths)]
+                headers = {"Accept-Encoding": "gzip"}
+                if etags:
+                    headers["If-None-Match"] = etags[path]
+                start = time.perf_counter()
+                connection.request("GET", path, headers=headers)
+                response = connection.getresponse()
+                response.read()
+                latencies.append((time.perf_counter() - start) * 1000)
+                if response.status != (304 if etags else 200):
+                    errors.append(path)
+                elif not etags:
+                    etags_seen[path] = response.getheader("ETag")
+            connection.close()
+
+        etags_seen = {}
+        threads = [threading.Thread(target=client, args=(number,)) for number in range(clients)]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+        return latencies, elapsed, errors, etags_seen
+
+    with scratch_dir():
+        for storage_name in storages:
+            file_path = f"data/movies_data.{storage_name}"
+            write_synthetic_catalog(storage_name, file_path, size)
+            server = subprocess.Popen([sys.executable, cli_path, "--storage", storage_name,
+                                       "--file", file_path, "serve", "--port", "0"],
+                                      stdout=subprocess.PIPE, text=True)
+            try:
+                port = int(server.stdout.readline().strip().rstrip("/").rsplit(":", 1)[1])
+                etags = {}
+                for mode in ("200", "304"):
+                    latencies, elapsed, errors, etags_seen = run_clients(port, etags)
+                    etags.update(etags_seen)
+                    latencies.sort()
+                    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+                    results.append({"storage": storage_name, "size": size, "responses": mode,
+                                    "clients": clients, "requests": len(latencies),
+                                    "requests_per_s": round(len(latencies) / elapsed, 1),
+                                    "median_ms": round(statistics.median(latencies), 3),
+                                    "p99_ms": round(p99, 3), "errors": len(errors)})
+                    print(f"api      {storage_name:<6} size={size:>9}  {mode}  {clients:>3} clients  "
+                          f"{len(latencies) / elapsed:>9.1f} req/s  median {statistics.median(latencies):>8.3f} ms  "
+                          f"p99 {p99:>8.3f} ms{f'  {len(errors)} ERRORS' if errors else ''}")
+            finally:
+                server.terminate()
+                server.wait()
+    return results
+
+
+def bench_serializers(serializers, sizes, runs):
+    """
+    Compare the JSON serializers of IStorage: encoding and decoding of a JSON
+    movie database in memory, saving it with IStorage.modify_json and loading
+    it with StorageJson. Serializers that aren't installed are skipped.
+    """
+    from istorage import IStorage, set_serializer
+    from storage_json import StorageJson
+
+    results = []
+    default_serializer = IStorage.serializer
+    try:
+        with scratch_dir():
+            for size in sizes:
+                data = {movie["Title"]: {"rating": float(movie["imdbRating"]), "year": int(movie["Year"]),
+                                         "poster": movie["Poster"]}
+                        for movie in map(synthetic_movie, range(size))}
+                for name in serializers:
+                    try:
+                        set_serializer(name)
+                    except ValueError as e:
+                        print(f"serializers {name:<8} skipped: {e}")
+                        continue
+                    encoded = IStorage.serializer.dumps(data)
+                    operations = {
+                        "encode": lambda run: IStorage.serializer.dumps(data),
+                        "decode": lambda run: IStorage.serializer.loads(encoded),
+                        "save": lambda run: IStorage.modify_json("data/movies_data.json", data),
+                        "load": lambda run: StorageJson("data/movies_data.json")
+                    }
+                    for operation, function in operations.items():
+                        durations = time_runs(function, runs)
+                        median_ms = statistics.median(durations)
+                        mb_per_sec = len(encoded) / 1e6 / (median_ms / 1000)
+                        results.append({"serializer": name, "operation": operation, "size": size,
+                                        "median_ms": round(median_ms, 2), "mb_per_sec": round(mb_per_sec, 1)})
+                        print(f"serializers {name:<8} {operation:<7} size={size:>9}  {median_ms:>9.2f} ms  "
+                              f"{mb_per_sec:>8.1f} MB/s")
+    finally:
+        set_serializer(default_serializer.name)
+    return results
+
+
+def bench_columnar(storages, sizes, runs):
+    """
+    Compare loading a JSON or CSV database from its text file with loading it
+    from its columnar snapshot, and the stats and sorted queries on both.
+    """
+    results = []
+    with scratch_dir():
+        for storage_name in storages:
+            storage_class = getattr(importlib.import_module(f"storage_{storage_name}"),
+                                    f"Storage{storage_name.capitalize()}")
+            for size in sizes:
+                file_path = f"data/movies_data_{size}.{storage_name}"
+                write_synthetic_catalog(storage_name, file_path, size)
+
+                start = time.perf_counter()
+                storage_class(file_path, columnar=True)
+                save_ms = (time.perf_counter() - start) * 1000
+                results.append({"storage": storage_name, "format": "columnar", "operation": "first load",
+                                "size": size, "median_ms": round(save_ms, 2)})
+                print(f"columnar {storage_name:<4} columnar  first load  size={size:>9}  {save_ms:>10.2f} ms")
+
+                for columnar in (False, True):
+                    storage_format = "columnar" if columnar else "text"
+                    # every query runs first on a freshly loaded storage, before its indexes are built
+                    durations = {"load": [], "stats": [], "top 100": [], "year page": []}
+                    for run in range(runs):
+                        start = time.perf_counter()
+                        storage = storage_class(file_path, columnar=columnar)
+                        durations["load"].append((time.perf_counter() - start) * 1000)
+                        for operation, function in (("stats", storage.movie_stats),
+                                                    ("top 100", lambda: storage.movies_sorted_by_rating(0, 100)),
+                                                    ("year page", lambda: storage.list_movies_page(0, 100, "year"))):
+                            start = time.perf_counter()
+                            function()
+                            durations[operation].append((time.perf_counter() - start) * 1000)
+                        del storage
+
+                    for operation, operation_durations in durations.items():
+                        median_ms = statistics.median(operation_durations)
+                        results.append({"storage": storage_name, "format": storage_format,
+                                        "operation": operation, "size": size, "median_ms": round(median_ms, 2)})
+                        print(f"columnar {storage_name:<4} {storage_format:<9} {operation:<11} "
+                              f"size={size:>9}  {median_ms:>10.2f} ms")
+    return results
+
+
+def compare_results(old_path, new_path):
+    """
+    Print the change of every result that is in both JSON reports.
+    Timings are compared by median_ms, other results by their first numeric value.
+    """
+    def keyed(path):
+        with open(path, "r") as f:
+            report = json.load(f)
+        results = {}
+        for result in report["results"]:
+            key = tuple((k, v) for k, v in result.items()
+                        if isinstance(v, str) or k in ("size", "adds"))
+            results[key] = result
+        return report, results
+
+    old_report, old_results = keyed(old_path)
+    new_report, new_results = keyed(new_path)
+    print(f"{old_report.get('commit')} -> {new_report.get('commit')}")
+    for key, new_result in new_results.items():
+        old_result = old_results.get(key)
+        if old_result is None:
+            continue
+        metric = "median_ms" if "median_ms" in new_result else next(
+            (k for k, v in new_result.items() if k not in dict(key) and isinstance(v, (int, float))),
+            None)
+        if metric is None or not old_result.get(metric):
+            continue
+        change = new_result[metric] / old_result[metric] - 1
+        label = " ".join(f"{v}" for _, v in key)
+        print(f"{label:<60} {metric:<14} {old_result[metric]:>12} -> {new_result[metric]:>12}  "
+              f"{change:>+8.1%}")
+
+
+def git_commit():
+    """
+    Return the current commit hash of the repository, None outside of a git checkout.
+    """
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, check=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def write_report(file_path, benchmark, args, results):
+    """
+    Write the results of a benchmark run as JSON, together with the commit and
+    Python version they were measured with.
+    """
+    report = {
+        "benchmark": benchmark,
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "arguments": {key: value for key, value in vars(args).items() if key != "json"},
+        "results": results
+    }
+    with open(file_path, "w") as f:
+        json.dump(report, f, indent=2)
+
+
+def main():
+    """
+    Command line entry point of the benchmarks.
+    """
+    parser = argparse.ArgumentParser(description="Movie project benchmarks")
+    parser.add_argument("--json", metavar="FILE", help="also write the results as JSON to FILE")
+    subparsers = parser.add_subparsers(dest="benchmark", required=True)
+
+    csv_add = subparsers.add_parser("csv-add", help="StorageCsv.add_movie throughput")
+    csv_add.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    csv_add.add_argument("--adds", type=int, default=500)
+
+    csv_load = subparsers.add_parser("csv-load", help="StorageCsv load throughput")
+    csv_load.add_argument("--sizes", type=int, nargs="+", default=[1000, 100000, 1000000])
+
+    memory = subparsers.add_parser("memory", help="Catalog memory, dicts vs Movie records")
+    memory.add_argument("--sizes", type=int, nargs="+", default=[100000, 1000000])
+
+    search = subparsers.add_parser("search", help="Search index query latency")
+    search.add_argument("--sizes", type=int, nargs="+", default=[1000000])
+    search.add_argument("--queries", nargs="+", default=["Movie 123456", "Part II", "moive 12345"])
+
+    suite = subparsers.add_parser("suite", help="Load, mutators, every command and website per storage")
+    suite.add_argument("--storages", nargs="+", choices=["json", "csv", "sqlite", "ndjson"],
+                       default=["json", "csv", "sqlite", "ndjson"])
+    suite.add_argument("--sizes", type=int, nargs="+", default=[1000, 100000, 1000000])
+    suite.add_argument("--runs", type=int, default=5)
+
+    startup = subparsers.add_parser("startup", help="Import time and time to the first menu")
+    startup.add_argument("--runs", type=int, default=10)
+    startup.add_argument("--target-ms", type=float, default=100)
+
+    stress = subparsers.add_parser("stress", help="Concurrent mutations of several processes on one database")
+    stress.add_argument("--storages", nargs="+", choices=["json", "csv", "sqlite", "ndjson"],
+                        default=["json", "csv", "sqlite", "ndjson"])
+    stress.add_argument("--processes", type=int, default=8)
+    stress.add_argument("--operations", type=int, default=200, help="mutations per process")
+    stress.add_argument("--size", type=int, default=1000, help="movies in the database before the test")
+
+    api = subparsers.add_parser("api", help="Load test of the JSON API, requests per second and p99 latency")
+    api.add_argument("--storages", nargs="+", choices=["json", "csv", "sqlite", "ndjson"],
+                     default=["json", "csv", "sqlite", "ndjson"])
+    api.add_argument("--size", type=int, default=100000)
+    api.add_argument("--clients", type=int, default=8)
+    api.add_argument("--requests", type=int, default=500, help="requests per client and run")
+
+    serializers = subparsers.add_parser("serializers", help="Load and save throughput of the JSON serializers")
+    serializers.add_argument("--serializers", nargs="+", choices=["orjson", "msgspec", "json"],
+                             default=["orjson", "msgspec", "json"])
+    serializers.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000, 1000000])
+    serializers.add_argument("--runs", type=int, default=5)
+
+    columnar = subparsers.add_parser("columnar", help="Text vs columnar snapshot load, stats and sorted pages")
+    columnar.add_argument("--storages", nargs="+", choices=["json", "csv"], default=["json", "csv"])
+    columnar.add_argument("--sizes", type=int, nargs="+", default=[100000, 1000000])
+    columnar.add_argument("--runs", type=int, default=3)
+
+    compare = subparsers.add_parser("compare", help="Compare two JSON reports")
+    compare.add_argument("old")
+    compare.add_argument("new")
+
+    args = parser.parse_args()
+    if args.benchmark == "csv-add":
+        results = bench_csv_add(args.sizes, args.adds)
+    elif args.benchmark == "csv-load":
+        results = bench_csv_load(args.sizes)
+    elif args.benchmark == "memory":
+        results = bench_memory(args.sizes)
+    elif args.benchmark == "search":
+        results = bench_search(args.sizes, args.queries)
+    elif args.benchmark == "suite":
+        results = bench_suite(args.storages, args.sizes, args.runs)
+    elif args.benchmark == "startup":
+        results = bench_startup(args.runs, args.target_ms)
+    elif args.benchmark == "api":
+        results = bench_api(args.storages, args.size, args.clients, args.requests)
+    elif args.benchmark == "stress":
+        results = bench_stress(args.storages, args.processes, args.operations, args.size)
+    elif args.benchmark == "serializers":
+        results = bench_serializers(args.serializers, args.sizes, args.runs)
+    elif args.benchmark == "columnar":
+        results = bench_columnar(args.storages, args.sizes, args.runs)
+    else:
+        compare_results(args.old, args.new)
+        return
+
+    if args.json:
+        write_report(args.json, args.benchmark, args, results)
+    if any(result.get("errors") for result in results):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
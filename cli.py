@@ -0,0 +1,239 @@
+import argparse
+import importlib
+import sys
+import time
+
+from movie_app import MovieApp
+
+# storage name -> (module, storage class, default file path), only the chosen
+# storage module is imported
+STORAGES = {
+    "json": ("storage_json", "StorageJson", "data/movies_data.json"),
+    "csv": ("storage_csv", "StorageCsv", "data/movies_data.csv"),
+    "sqlite": ("storage_sqlite", "StorageSqlite", "data/movies_data.sqlite"),
+    "ndjson": ("storage_ndjson", "StorageNdjson", "data/movies_data.ndjson")
+}
+
+
+def create_storage(storage_name, file_path=None, columnar=False):
+    """
+    Return the storage of the given type, stored in file_path or its default file.
+    With columnar, the JSON and CSV storages keep a columnar snapshot of the file.
+    """
+    module_name, class_name, default_path = STORAGES[storage_name]
+    storage_class = getattr(importlib.import_module(module_name), class_name)
+    options = {"columnar": True} if columnar else {}
+    return storage_class(file_path or default_path, **options)
+
+
+def command_list(storage, args):
+    """
+    Print a page of movies as tab separated lines: title, rating, year, poster.
+    """
+    movies = storage.list_movies_page(args.offset, args.limit, args.sort)
+    lines = (f"{movie_title}\t{movie.rating_text}\t{movie.year_text}\t{movie.poster}\n"
+             for movie_title, movie in movies)
+    if args.throttle:
+        for line in lines:
+            sys.stdout.write(line)
+            sys.stdout.flush()
+            time.sleep(args.throttle)
+    else:
+        sys.stdout.writelines(lines)
+    return 0
+
+
+def command_add(storage, args):
+    """
+    Fetch the given titles from OMDb and add them to the storage. Fails if a
+    title could neither be added nor is already on the list.
+    """
+    report = MovieApp(storage).add_movies(args.titles)
+    failed = 0
+    for movie_title, added, message in report:
+        print(f"{movie_title} {message}")
+        if not added and not storage.has_movie(movie_title):
+            failed += 1
+    return 1 if failed else 0
+
+
+def command_delete(storage, args):
+    """
+    Delete a movie, fails if it is not on the list.
+    """
+    if not storage.delete_movie(args.title):
+        print(f"{args.title} is not on the list", file=sys.stderr)
+        return 1
+    print(f"{args.title} was successfully deleted!")
+    return 0
+
+
+def command_update(storage, args):
+    """
+    Update the rating of a movie, fails if it is not on the list.
+    """
+    if not storage.update_movie(args.title, args.rating):
+        print(f"{args.title} is not on the list", file=sys.stderr)
+        return 1
+    print(f"The rating of {args.title} was successfully updated to {args.rating}")
+    return 0
+
+
+def command_stats(storage, args):
+    """
+    Print the movie statistics, one "key: value" line each.
+    """
+    stats = storage.movie_stats()
+    print(f"count: {stats['count']}")
+    for key in ("average", "median"):
+        value = stats[key]
+        print(f"{key}: {'N/A' if value is None else round(value, 1)}")
+    for key in ("best", "worst"):
+        if stats[key] is None:
+            print(f"{key}: N/A")
+        else:
+            movie_title, rating = stats[key]
+            print(f"{key}: {movie_title} ({rating})")
+    return 0
+
+
+def command_search(storage, args):
+    """
+    Print the movies containing the query, or the most similar titles with --fuzzy.
+    Fails if nothing was found.
+    """
+    if args.fuzzy:
+        found_movies = storage.fuzzy_search_movies(args.query, limit=args.limit)
+    else:
+        found_movies = storage.search_movies(args.query)
+    for movie_title, rating in found_movies:
+        print(f"{movie_title}\t{MovieApp.format_rating(rating)}")
+    return 0 if found_movies else 1
+
+
+def command_build_site(storage, args):
+    """
+    Generate the static website, optionally with locally mirrored posters.
+    """
+    MovieApp(storage).generate_website(args.template, mirror_posters=args.mirror_posters)
+    return 0
+
+
+def command_serve(storage, args):
+    """
+    Serve the movies as read-only JSON API until the process is interrupted.
+    """
+    from api_server import MovieApiServer
+
+    server = MovieApiServer((args.host, args.port), storage, log_requests=args.log_requests)
+    print(f"Serving the movie API on http://{args.host}:{server.server_address[1]}/", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+
+def command_convert(args):
+    """
+    Convert a JSON, CSV or SQLite movie database into an NDJSON catalog.
+    """
+    from storage_ndjson import StorageNdjson
+
+    movie_count = StorageNdjson.convert(args.source, args.target)
+    print(f"{movie_count} movies were converted to {args.target}")
+    return 0
+
+
+def build_parser():
+    """
+    Return the argument parser of the command line interface.
+    """
+    parser = argparse.ArgumentParser(
+        description="Manage the movie database without the interactive menu.")
+    parser.add_argument("--storage", choices=sorted(STORAGES), default="json",
+                        help="storage backend (default: json)")
+    parser.add_argument("--file", help="data file of the storage (default: data/movies_data.<storage>)")
+    parser.add_argument("--columnar", action="store_true",
+                        help="load a JSON or CSV database from a binary columnar snapshot kept next to it")
+    parser.add_argument("--instrument", action="store_true",
+                        help="print call counts, latencies and bytes of the storage I/O to stderr on exit")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    list_parser = subparsers.add_parser("list", help="list the movies")
+    list_parser.add_argument("--offset", type=int, default=0, help="number of movies to skip")
+    list_parser.add_argument("--limit", type=int, help="maximum number of movies to list")
+    list_parser.add_argument("--sort", choices=["title", "rating", "year"],
+                             help="sort order (default: stored order)")
+    list_parser.add_argument("--throttle", type=float, default=0,
+                             help="seconds to wait after every movie")
+    list_parser.set_defaults(handler=command_list)
+
+    add_parser = subparsers.add_parser("add", help="fetch movies from OMDb and add them")
+    add_parser.add_argument("titles", nargs="+", metavar="TITLE")
+    add_parser.set_defaults(handler=command_add)
+
+    delete_parser = subparsers.add_parser("delete", help="delete a movie")
+    delete_parser.add_argument("title")
+    delete_parser.set_defaults(handler=command_delete)
+
+    update_parser = subparsers.add_parser("update", help="update the rating of a movie")
+    update_parser.add_argument("title")
+    update_parser.add_argument("rating", type=float)
+    update_parser.set_defaults(handler=command_update)
+
+    stats_parser = subparsers.add_parser("stats", help="print the movie statistics")
+    stats_parser.set_defaults(handler=command_stats)
+
+    search_parser = subparsers.add_parser("search", help="search movies by title")
+    search_parser.add_argument("query")
+    search_parser.add_argument("--fuzzy", action="store_true",
+                               help="rank titles by similarity, tolerates typos")
+    search_parser.add_argument("--limit", type=int, default=10,
+                               help="maximum number of fuzzy matches (default: 10)")
+    search_parser.set_defaults(handler=command_search)
+
+    site_parser = subparsers.add_parser("build-site", help="generate the static website")
+    site_parser.add_argument("--template", default="_static/index_template.html")
+    site_parser.add_argument("--mirror-posters", action="store_true",
+                             help="download the posters into _static/posters")
+    site_parser.set_defaults(handler=command_build_site)
+
+    serve_parser = subparsers.add_parser("serve", help="serve the movies as read-only JSON API")
+    serve_parser.add_argument("--host", default="127.0.0.1")
+    serve_parser.add_argument("--port", type=int, default=8000, help="port, 0 picks a free one (default: 8000)")
+    serve_parser.add_argument("--log-requests", action="store_true", help="log every request to stderr")
+    serve_parser.set_defaults(handler=command_serve)
+
+    convert_parser = subparsers.add_parser(
+        "convert", help="convert a JSON, CSV or SQLite database into an NDJSON catalog")
+    convert_parser.add_argument("source")
+    convert_parser.add_argument("target")
+    convert_parser.set_defaults(handler=command_convert, needs_storage=False)
+
+    return parser
+
+
+def main(argv=None):
+    """
+    Command line entry point, returns the exit code.
+    """
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.columnar and args.storage not in ("json", "csv"):
+        parser.error("--columnar is only supported by the json and csv storages")
+    if args.instrument:
+        from instrumentation import Instrumentation
+        # the storage module has to be imported to be instrumented
+        importlib.import_module(STORAGES[args.storage][0])
+        Instrumentation.enable()
+    if not getattr(args, "needs_storage", True):
+        return args.handler(args)
+    storage = create_storage(args.storage, args.file, args.columnar)
+    return args.handler(storage, args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,354 @@
+from array import array
+from collections.abc import MutableMapping
+import math
+import mmap
+import statistics
+import struct
+
+from movie import Movie
+from rating_index import RatingIndex
+
+
+class ColumnarSnapshot(MutableMapping):
+    MAGIC = b"MCOL"
+    VERSION = 3
+    # written in native byte order, a snapshot of a machine with another byte order is not used
+    BYTE_ORDER_MARK = 0x01020304
+    # magic, version, byte order mark, number of movies, length of the title,
+    # poster and raw year string tables, and six integers describing the source
+    # the snapshot was made from (defined by the storage, see source)
+    HEADER = struct.Struct("=4sIIQQQQ6q4x")
+    # stand-ins for missing values in the columns
+    MISSING_YEAR = -2 ** 31
+    MISSING_POSTER = b"\x00"
+
+    def __init__(self, data):
+        """
+        Constructor of class ColumnarSnapshot. A title -> Movie mapping over a
+        binary columnar snapshot of a movie database, usually a memory-mapped file:
+
+            header         see HEADER
+            ratings        float64 per movie in stored order, NaN if missing
+            years          int32 per movie, MISSING_YEAR if missing
+            title offsets  uint64 per movie + 1, into the title string table
+            poster offsets uint64 per movie + 1, into the poster string table
+            raw year offsets uint64 per movie + 1, into the raw year string table
+            by title       uint32 row numbers sorted by title
+            by rating      uint32 row numbers, best rating first, missing last, ties by title
+            by year        uint32 row numbers, oldest first, missing last, ties by title
+            titles         UTF-8 string table
+            posters        UTF-8 string table, MISSING_POSTER if missing
+            raw years      UTF-8 string table of Movie.raw_year, empty if None
+
+        Every section starts at a multiple of 8 bytes. The columns are read in
+        place, a movie is only decoded when it is looked up. Titles are found by
+        a binary search over the title order.
+
+        Changes are kept in memory on top of the snapshot, like in a dict updated
+        movies keep their position and added movies come last. While there are
+        none, stats and sorted pages are answered straight from the columns.
+
+        Parameters:
+            data (bytes-like): The encoded snapshot, see encode().
+
+        Raises:
+            ValueError: The data is not a snapshot of this version.
+        """
+        self._data = data
+        view = memoryview(data)
+        if len(view) < self.HEADER.size:
+            raise ValueError("Not a columnar snapshot")
+        magic, version, byte_order_mark, count, titles_size, posters_size, raw_years_size, *source = \
+            self.HEADER.unpack_from(view)
+        if magic != self.MAGIC or version != self.VERSION or byte_order_mark != self.BYTE_ORDER_MARK:
+            raise ValueError("Not a columnar snapshot of this version")
+        self.count = count
+        self.source = tuple(source)
+
+        offset = self.HEADER.size
+        sections = []
+        for type_code, length in (("d", count), ("i", count), ("Q", count + 1), ("Q", count + 1),
+                                  ("Q", count + 1), ("I", count), ("I", count), ("I", count),
+                                  ("B", titles_size), ("B", posters_size), ("B", raw_years_size)):
+            end = offset + length * array(type_code).itemsize
+            if end > len(view):
+                raise ValueError("Truncated columnar snapshot")
+            sections.append(view[offset:end].cast(type_code))
+            offset = self.aligned(end)
+        (self._ratings, self._years, self._title_offsets, self._poster_offsets, self._raw_year_offsets,
+         self._by_title, self._by_rating, self._by_year, self._titles, self._posters, self._raw_years) = sections
+
+        # row -> Movie of updated movies, None for deleted ones
+        self._overrides = {}
+        self._deleted = 0
+        # title -> Movie of movies that are not in the snapshot (or were deleted and added again)
+        self._added = {}
+
+    @classmethod
+    def open(cls, file_path):
+        """
+        Map a snapshot file into memory.
+
+        Returns:
+            ColumnarSnapshot: The snapshot, None if the file doesn't exist or is no valid snapshot.
+        """
+        try:
+            with open(file_path, "rb") as f:
+                data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            return None
+        try:
+            return cls(data)
+        except ValueError:
+            return None
+
+    @staticmethod
+    def aligned(offset):
+        """
+        Return offset rounded up to the next multiple of 8.
+        """
+        return (offset + 7) & ~7
+
+    @classmethod
+    def encode(cls, movies, source=(0, 0, 0, 0, 0, 0)):
+        """
+        Encode (title, Movie) tuples in stored order as snapshot.
+
+        Parameters:
+            movies (iterable): (title, Movie) tuples, every title once.
+            source (tuple): Six integers the storage uses to tell whether the
+                snapshot still matches its data file.
+
+        Returns:
+            bytes: The snapshot, to be written with a single write().
+        """
+        ratings = array("d")
+        years = array("i")
+        title_offsets = array("Q", [0])
+        poster_offsets = array("Q", [0])
+        raw_year_offsets = array("Q", [0])
+        titles = []
+        encoded_titles = bytearray()
+        encoded_posters = bytearray()
+        encoded_raw_years = bytearray()
+        for movie_title, movie in movies:
+            titles.append(movie_title)
+            ratings.append(math.nan if movie.rating is None else movie.rating)
+            years.append(cls.MISSING_YEAR if movie.year is None else movie.year)
+            encoded_titles += movie_title.encode()
+            title_offsets.append(len(encoded_titles))
+            encoded_posters += cls.MISSING_POSTER if movie.poster is None else movie.poster.encode()
+            poster_offsets.append(len(encoded_posters))
+            if movie.raw_year is not None:
+                encoded_raw_years += movie.raw_year.encode()
+            raw_year_offsets.append(len(encoded_raw_years))
+
+        # the rating and year orders are stable sorts of the title order, so ties are sorted by title
+        by_title = sorted(range(len(titles)), key=titles.__getitem__)
+        rating_keys = [RatingIndex.sort_key(None if math.isnan(rating) else rating) for rating in ratings]
+        by_rating = sorted(by_title, key=rating_keys.__getitem__)
+        year_keys = [(year == cls.MISSING_YEAR, year) for year in years]
+        by_year = sorted(by_title, key=year_keys.__getitem__)
+
+        header = cls.HEADER.pack(cls.MAGIC, cls.VERSION, cls.BYTE_ORDER_MARK, len(titles),
+                                 len(encoded_titles), len(encoded_posters), len(encoded_raw_years), *source)
+        buffer = bytearray(header)
+        for section in (ratings, years, title_offsets, poster_offsets, raw_year_offsets,
+                        array("I", by_title), array("I", by_rating), array("I", by_year),
+                        encoded_titles, encoded_posters, encoded_raw_years):
+            buffer += section if isinstance(section, bytearray) else section.tobytes()
+            buffer += bytes(cls.aligned(len(buffer)) - len(buffer))
+        return bytes(buffer)
+
+    @property
+    def changed(self):
+        """
+        True if movies were added, updated or deleted since the snapshot was made.
+        """
+        return bool(self._overrides or self._added)
+
+    def title(self, row):
+        """
+        Return the title of a row.
+        """
+        return str(self._titles[self._title_offsets[row]:self._title_offsets[row + 1]], "utf-8")
+
+    def rating(self, row):
+        """
+        Return the rating of a row, None if it is missing.
+        """
+        rating = self._ratings[row]
+        return None if math.isnan(rating) else rating
+
+    def movie(self, row):
+        """
+        Decode the Movie of a row.
+        """
+        year = self._years[row]
+        poster = bytes(self._posters[self._poster_offsets[row]:self._poster_offsets[row + 1]])
+        raw_year = str(self._raw_years[self._raw_year_offsets[row]:self._raw_year_offsets[row + 1]], "utf-8")
+        return Movie(self.rating(row), None if year == self.MISSING_YEAR else year,
+                     None if poster == self.MISSING_POSTER else poster.decode(), raw_year or None)
+
+    def find_row(self, movie_title):
+        """
+        Return the row of a title by a binary search over the title order, None
+        if the snapshot doesn't contain it. Deleted movies keep their row.
+        """
+        low, high = 0, self.count
+        while low < high:
+            middle = (low + high) // 2
+            if self.title(self._by_title[middle]) < movie_title:
+                low = middle + 1
+            else:
+                high = middle
+        if low < self.count and self.title(self._by_title[low]) == movie_title:
+            return self._by_title[low]
+        return None
+
+    def __getitem__(self, movie_title):
+        movie = self._added.get(movie_title)
+        if movie is not None:
+            return movie
+        row = self.find_row(movie_title)
+        if row is None:
+            raise KeyError(movie_title)
+        if row in self._overrides:
+            movie = self._overrides[row]
+            if movie is None:
+                raise KeyError(movie_title)
+            return movie
+        return self.movie(row)
+
+    def __setitem__(self, movie_title, movie):
+        if movie_title not in self._added:
+            row = self.find_row(movie_title)
+            if row is not None and self._overrides.get(row, True) is not None:
+                self._overrides[row] = movie
+                return
+        self._added[movie_title] = movie
+
+    def __delitem__(self, movie_title):
+        if self._added.pop(movie_title, None) is not None:
+            return
+        row = self.find_row(movie_title)
+        if row is None or self._overrides.get(row, True) is None:
+            raise KeyError(movie_title)
+        self._overrides[row] = None
+        self._deleted += 1
+
+    def __iter__(self):
+        overrides = self._overrides
+        for row in range(self.count):
+            if row not in overrides or overrides[row] is not None:
+                yield self.title(row)
+        yield from list(self._added)
+
+    def __len__(self):
+        return self.count - self._deleted + len(self._added)
+
+    def rating_items(self):
+        """
+        Yield (title, rating) of every movie, the movies of the snapshot best
+        rating first, so sorting them again is close to linear.
+        """
+        overrides = self._overrides
+        for row in self._by_rating:
+            if row not in overrides:
+                yield self.title(row), self.rating(row)
+        for row, movie in overrides.items():
+            if movie is not None:
+                yield self.title(row), movie.rating
+        for movie_title, movie in self._added.items():
+            yield movie_title, movie.rating
+
+    def movie_stats(self):
+        """
+        Compute the rating statistics of IStorage.movie_stats() from the rating
+        column, with the changes applied. Like there, best and worst are the
+        first movies in stored order with the highest and lowest rating.
+        """
+        ratings = self._ratings.tolist()
+        for row, movie in self._overrides.items():
+            ratings[row] = math.nan if movie is None or movie.rating is None else movie.rating
+        added_titles = list(self._added)
+        ratings.extend(math.nan if movie.rating is None else movie.rating for movie in self._added.values())
+
+        # NaN, a missing rating, is the only value not equal to itself
+        rated = [rating for rating in ratings if rating == rating]
+        if not rated:
+            return {"count": 0, "average": None, "median": None, "best": None, "worst": None}
+
+        if self.changed:
+            median = statistics.median(rated)
+        else:
+            # the rated movies come first in the rating order, best first
+            count = len(rated)
+            middle = self._ratings[self._by_rating[count // 2]]
+            median = middle if count % 2 else (self._ratings[self._by_rating[count // 2 - 1]] + middle) / 2
+
+        def movie_with_rating(rating):
+            position = ratings.index(rating)
+            movie_title = self.title(position) if position < self.count else added_titles[position - self.count]
+            return movie_title, rating
+
+        return {
+            "count": len(rated),
+            "average": sum(rated) / len(rated),
+            "median": median,
+            "best": movie_with_rating(max(rated)),
+            "worst": movie_with_rating(min(rated))
+        }
+
+    def rating_bounds(self, min_rating=None, max_rating=None):
+        """
+        Return the (start, end) positions in the rating order of the movies
+        rated between min_rating and max_rating, like RatingIndex.bounds().
+        Only valid while the snapshot is unchanged.
+        """
+        def first_position(predicate):
+            low, high = 0, self.count
+            while low < high:
+                middle = (low + high) // 2
+                if predicate(RatingIndex.sort_key(self.rating(self._by_rating[middle]))):
+                    high = middle
+                else:
+                    low = middle + 1
+            return low
+
+        if min_rating is None and max_rating is None:
+            return 0, self.count
+        start = 0 if max_rating is None else first_position(lambda score: score >= -max_rating)
+        if min_rating is None:
+            end = first_position(lambda score: score == float("inf"))
+        else:
+            end = first_position(lambda score: score > -min_rating)
+        return start, max(start, end)
+
+    def movies_sorted_by_rating(self, offset=0, limit=None, min_rating=None, max_rating=None):
+        """
+        Return (title, rating) tuples like IStorage.movies_sorted_by_rating(),
+        straight from the rating order. Only valid while the snapshot is unchanged.
+        """
+        start, end = self.rating_bounds(min_rating, max_rating)
+        start = min(start + offset, end)
+        if limit is not None:
+            end = min(start + limit, end)
+        return [(self.title(row), self.rating(row)) for row in self._by_rating[start:end]]
+
+    def count_movies_by_rating(self, min_rating=None, max_rating=None):
+        """
+        Return the number of movies rated between min_rating and max_rating.
+        Only valid while the snapshot is unchanged.
+        """
+        start, end = self.rating_bounds(min_rating, max_rating)
+        return end - start
+
+    def sorted_page(self, offset=0, limit=None, sort_key="title"):
+        """
+        Return a page of (title, Movie) tuples sorted by "title", "rating" or
+        "year" like IStorage.list_movies_page(). Only valid while the snapshot is unchanged.
+        """
+        order = {"title": self._by_title, "rating": self._by_rating, "year": self._by_year}[sort_key]
+        end = self.count if limit is None else min(offset + limit, self.count)
+        return [(self.title(row), self.movie(row)) for row in order[offset:end]]
@@ -0,0 +1,41 @@
+import json
+
+
+class Config:
+    # base URL of the OMDb API
+    OMDB_URL = "http://www.omdbapi.com/"
+
+    # file path -> Config, every file is parsed only once per process
+    _loaded = {}
+
+    def __init__(self, api_key, omdb_cache_path="data/omdb_cache.sqlite"):
+        """
+        Constructor of class Config. The settings shared by the application,
+        loaded once with Config.load() instead of by every object that needs them.
+
+        Parameters:
+            api_key (str): The OMDb API key.
+            omdb_cache_path (str, optional): File path of the OMDb response cache.
+        """
+        self.api_key = api_key
+        self.omdb_cache_path = omdb_cache_path
+
+    @property
+    def fetch_movie_url(self):
+        """
+        The OMDb request URL including the API key, the query parameters are appended.
+        """
+        return f"{self.OMDB_URL}?apikey={self.api_key}&"
+
+    @classmethod
+    def load(cls, file_path="data/api_key.json"):
+        """
+        Return the configuration stored in file_path. The file is parsed on the
+        first call, later calls return the same object.
+        """
+        config = cls._loaded.get(file_path)
+        if config is None:
+            with open(file_path, "r") as f:
+                config = cls(json.load(f)["api_key"])
+            cls._loaded[file_path] = config
+        return config
@@ -0,0 +1,241 @@
+import atexit
+import functools
+import os
+import sys
+import threading
+import time
+
+
+class Instrumentation:
+    # upper bounds (milliseconds) of the latency histogram buckets, the last bucket is unbounded
+    BUCKETS_MS = (0.1, 0.5, 1, 5, 10, 50, 100, 500, 1000, 5000)
+
+    # module -> class -> (method, "read" / "write" / "append" or None, file path of the call)
+    # The bytes of a call are the size of the file after a read or write, and its growth
+    # by an append. Only modules that are already imported are instrumented.
+    TARGETS = {
+        "istorage": {
+            "IStorage": [
+                ("parse_json", "read", lambda args: args[0]),
+                ("modify_json", "write", lambda args: args[0]),
+                ("save_columns", "write", lambda args: args[0].columns_path),
+            ]
+        },
+        "storage_json": {
+            "StorageJson": [
+                ("load", "read", lambda args: args[0].file_path),
+                ("refresh", None, None),
+                ("append_journal", "append", lambda args: args[0].journal_path),
+                ("compact", "write", lambda args: args[0].file_path),
+                ("add_movies", None, None),
+                ("delete_movie", None, None),
+                ("update_movie", None, None),
+            ]
+        },
+        "storage_csv": {
+            "StorageCsv": [
+                ("load_csv", "read", lambda args: args[0].file_path),
+                ("refresh", None, None),
+                ("modify_csv", "append", lambda args: args[0].file_path),
+                ("rewrite_csv", "write", lambda args: args[0].file_path),
+                ("add_movies", None, None),
+                ("delete_movie", None, None),
+                ("update_movie", None, None),
+            ]
+        },
+        "storage_sqlite": {
+            "StorageSqlite": [
+                ("refresh", None, None),
+                ("add_movies", None, None),
+                ("delete_movie", None, None),
+                ("update_movie", None, None),
+            ]
+        },
+        "storage_ndjson": {
+            "NdjsonCatalog": [
+                ("load_index", "read", lambda args: args[0].file_path),
+                ("append", "append", lambda args: args[0].file_path),
+                ("compact", "write", lambda args: args[0].file_path),
+            ],
+            "StorageNdjson": [
+                ("refresh", None, None),
+                ("add_movies", None, None),
+                ("delete_movie", None, None),
+                ("update_movie", None, None),
+            ]
+        },
+        "movie_app": {
+            "MovieApp": [
+                ("fetch_data", None, None),
+                ("generate_website", None, None),
+            ]
+        }
+    }
+
+    # the enabled instance, None while instrumentation is off
+    active = None
+
+    def __init__(self):
+        """
+        Constructor of class Instrumentation. Collects the number of calls, a
+        latency histogram and the bytes read and written of every instrumented
+        method. Use Instrumentation.enable(), instrumentation is off by default
+        and costs nothing then.
+        """
+        self._lock = threading.Lock()
+        self.calls = {}
+
+    @classmethod
+    def enable(cls, dump_on_exit=True):
+        """
+        Instrument the methods of TARGETS and every MovieApp command, and print
+        the report to stderr when the process exits. Enabling it again only
+        instruments modules imported since.
+
+        Returns:
+            Instrumentation: The active instance.
+        """
+        if cls.active is None:
+            cls.active = cls()
+            if dump_on_exit:
+                atexit.register(cls.active.dump)
+        cls.active.instrument_modules()
+        return cls.active
+
+    @staticmethod
+    def file_size(file_path):
+        """
+        Return the size of a file in bytes, 0 if it doesn't exist.
+        """
+        try:
+            return os.path.getsize(file_path)
+        except (OSError, TypeError):
+            return 0
+
+    def record(self, name, seconds, bytes_read=0, bytes_written=0):
+        """
+        Record a single call of name.
+        """
+        milliseconds = seconds * 1000
+        bucket = next((i for i, bound in enumerate(self.BUCKETS_MS) if milliseconds <= bound),
+                      len(self.BUCKETS_MS))
+        with self._lock:
+            calls = self.calls.get(name)
+            if calls is None:
+                calls = self.calls[name] = {"count": 0, "total_ms": 0.0, "max_ms": 0.0,
+                                            "histogram": [0] * (len(self.BUCKETS_MS) + 1),
+                                            "bytes_read": 0, "bytes_written": 0}
+            calls["count"] += 1
+            calls["total_ms"] += milliseconds
+            calls["max_ms"] = max(calls["max_ms"], milliseconds)
+            calls["histogram"][bucket] += 1
+            calls["bytes_read"] += bytes_read
+            calls["bytes_written"] += bytes_written
+
+    def wrap(self, name, function, io=None, file_path=None):
+        """
+        Return function wrapped to record its calls under name.
+        """
+        @functools.wraps(function)
+        def instrumented(*args, **kwargs):
+            size_before = self.file_size(file_path(args)) if io == "append" else 0
+            start = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                seconds = time.perf_counter() - start
+                size = self.file_size(file_path(args)) if io is not None else 0
+                self.record(name, seconds,
+                            bytes_read=size if io == "read" else 0,
+                            bytes_written=max(0, size - size_before) if io in ("write", "append") else 0)
+
+        instrumented.instrumented = True
+        return instrumented
+
+    def instrument_method(self, cls, method_name, io=None, file_path=None):
+        """
+        Replace a method of a class by its instrumented version, static and
+        class methods stay static and class methods.
+        """
+        attribute = cls.__dict__.get(method_name)
+        if attribute is None:
+            return
+        function = attribute.__func__ if isinstance(attribute, (staticmethod, classmethod)) else attribute
+        if getattr(function, "instrumented", False):
+            return
+        instrumented = self.wrap(f"{cls.__name__}.{method_name}", function, io, file_path)
+        if isinstance(attribute, staticmethod):
+            instrumented = staticmethod(instrumented)
+        elif isinstance(attribute, classmethod):
+            instrumented = classmethod(instrumented)
+        setattr(cls, method_name, instrumented)
+
+    def instrument_modules(self):
+        """
+        Instrument the methods of TARGETS in the modules that are imported.
+        """
+        for module_name, classes in self.TARGETS.items():
+            module = sys.modules.get(module_name)
+            if module is None:
+                continue
+            for class_name, methods in classes.items():
+                cls = getattr(module, class_name)
+                for method_name, io, file_path in methods:
+                    self.instrument_method(cls, method_name, io, file_path)
+                if class_name == "MovieApp":
+                    for method_name in list(vars(cls)):
+                        if method_name.startswith("_command_"):
+                            self.instrument_method(cls, method_name)
+
+    def percentile_bound(self, histogram, share):
+        """
+        Return the upper bound (ms) of the histogram bucket holding the given
+        share of the calls, None for the unbounded bucket.
+        """
+        threshold = share * sum(histogram)
+        count = 0
+        for i, bucket_count in enumerate(histogram):
+            count += bucket_count
+            if count >= threshold:
+                return self.BUCKETS_MS[i] if i < len(self.BUCKETS_MS) else None
+        return None
+
+    def report(self):
+        """
+        Return the collected calls as text: one line per method sorted by total
+        time, followed by the latency histograms.
+        """
+        with self._lock:
+            calls = {name: dict(values, histogram=list(values["histogram"]))
+                     for name, values in self.calls.items()}
+        if not calls:
+            return "No instrumented calls yet."
+
+        def bound(value):
+            return "inf" if value is None else f"{value:g}"
+
+        names = sorted(calls, key=lambda name: calls[name]["total_ms"], reverse=True)
+        lines = [f"{'method':<34} {'calls':>7} {'total ms':>10} {'mean ms':>9} {'max ms':>9} "
+                 f"{'p50<=':>6} {'p99<=':>6} {'read B':>11} {'written B':>11}"]
+        for name in names:
+            values = calls[name]
+            lines.append(
+                f"{name:<34} {values['count']:>7} {values['total_ms']:>10.1f} "
+                f"{values['total_ms'] / values['count']:>9.2f} {values['max_ms']:>9.1f} "
+                f"{bound(self.percentile_bound(values['histogram'], 0.5)):>6} "
+                f"{bound(self.percentile_bound(values['histogram'], 0.99)):>6} "
+                f"{values['bytes_read']:>11} {values['bytes_written']:>11}")
+
+        lines.append("")
+        lines.append("latency histograms (calls per bucket, upper bound in ms):")
+        for name in names:
+            buckets = [f"<={bound(self.BUCKETS_MS[i] if i < len(self.BUCKETS_MS) else None)}:{count}"
+                       for i, count in enumerate(calls[name]["histogram"]) if count]
+            lines.append(f"{name:<34} {' '.join(buckets)}")
+        return "\n".join(lines)
+
+    def dump(self, file=None):
+        """
+        Print the report, to stderr by default.
+        """
+        print(self.report(), file=file or sys.stderr)
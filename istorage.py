@@ -1,9 +1,139 @@
 from abc import ABC, abstractmethod
+from contextlib import contextmanager
+import heapq
+import itertools
 import json
-import requests
+import os
+import random
+import statistics
+import tempfile
+
+try:
+    import fcntl
+except ImportError:
+    # Windows has no advisory locks, writes of several processes aren't serialized there
+    fcntl = None
+
+try:
+    import orjson
+except ImportError:  # the faster JSON libraries are optional
+    orjson = None
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+
+from columnar_snapshot import ColumnarSnapshot
+from rating_index import RatingIndex
+from search_index import SearchIndex
+
+
+class JsonSerializer:
+    """
+    Encode to and decode from compact JSON bytes with the json module of the
+    standard library. dumps() returns the complete document, so it is written
+    with a single write() call, and loads() raises ValueError for invalid JSON.
+    """
+    name = "json"
+
+    @staticmethod
+    def available():
+        return True
+
+    @staticmethod
+    def dumps(data):
+        return json.dumps(data, separators=(",", ":")).encode()
+
+    @staticmethod
+    def loads(data):
+        return json.loads(data)
+
+
+class OrjsonSerializer(JsonSerializer):
+    """
+    JsonSerializer using orjson, which encodes straight to bytes.
+    """
+    name = "orjson"
+
+    @staticmethod
+    def available():
+        return orjson is not None
+
+    @staticmethod
+    def dumps(data):
+        return orjson.dumps(data)
+
+    @staticmethod
+    def loads(data):
+        return orjson.loads(data)
+
+
+class MsgspecSerializer(JsonSerializer):
+    """
+    JsonSerializer using msgspec.
+    """
+    name = "msgspec"
+
+    @staticmethod
+    def available():
+        return msgspec is not None
+
+    @staticmethod
+    def dumps(data):
+        return msgspec.json.encode(data)
+
+    @staticmethod
+    def loads(data):
+        try:
+            return msgspec.json.decode(data)
+        except msgspec.DecodeError as e:
+            raise ValueError(str(e)) from e
+
+
+# the JSON serializers by name, the fastest first
+SERIALIZERS = {serializer.name: serializer
+               for serializer in (OrjsonSerializer, MsgspecSerializer, JsonSerializer)}
+
+
+def get_serializer(name=None):
+    """
+    Return the serializer called name, or the fastest one installed if name is None.
+    Raise ValueError if it is unknown or its library isn't installed.
+    """
+    if name is None:
+        return next(serializer for serializer in SERIALIZERS.values() if serializer.available())
+    serializer = SERIALIZERS.get(name)
+    if serializer is None:
+        raise ValueError(f"Unknown serializer {name}, choose one of {', '.join(SERIALIZERS)}")
+    if not serializer.available():
+        raise ValueError(f"Serializer {name} is not installed")
+    return serializer
+
+
+def set_serializer(name=None):
+    """
+    Make the serializer called name (see get_serializer()) the one every
+    storage uses, IStorage.serializer, and return it.
+    """
+    IStorage.serializer = get_serializer(name)
+    return IStorage.serializer
 
 
 class IStorage(ABC):
+    # version counter of the database the storage last wrote at and the number of
+    # file replacements it last read the database at, see write_lock()
+    version = None
+    generation = None
+    _lock_depth = 0
+    _lock_generation = 0
+    # number of changes of the database this storage has seen, by its own writes
+    # or by refresh(), cached responses of the database are valid for one revision
+    revision = 0
+    _replaced_file = False
+    # encodes and decodes every JSON file, journal and NDJSON line, always read
+    # as IStorage.serializer, call set_serializer(name) to use another one
+    serializer = get_serializer()
+
     @staticmethod
     def fetching_successful(response):
         """
@@ -13,43 +143,451 @@ class IStorage(ABC):
             return True
         return False
 
+    @staticmethod
+    @contextmanager
+    def atomic_open(file_path, mode="w", newline=None):
+        """
+        Open a temporary file next to file_path and move it over file_path
+        once the with-block finished without an error.
+
+        The data is flushed and fsynced before the rename, so after a crash the
+        file contains either the complete old or the complete new content.
+        """
+        directory = os.path.dirname(os.path.abspath(file_path))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, mode, newline=newline) as f:
+                yield f
+                f.flush()
+                os.fsync(f.fileno())
+
+            # keep the permissions of the file we are replacing
+            if os.path.exists(file_path):
+                os.chmod(tmp_path, os.stat(file_path).st_mode)
+            os.replace(tmp_path, file_path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
     @staticmethod
     def modify_json(file_path, data):
         """
-        Save modified data to file.
+        Save modified data to file. The file is replaced atomically, the data is
+        encoded first and written with a single write() call.
+        """
+        encoded = IStorage.serializer.dumps(data)
+        with IStorage.atomic_open(file_path, "wb") as f:
+            f.write(encoded)
+
+    @staticmethod
+    def file_signature(file_path):
+        """
+        Return (inode, size, modification time) of a file, None if it doesn't exist.
+        A different signature means another process replaced or changed the file.
         """
-        with open(file_path, "w") as f:
-            json.dump(data, f)
+        try:
+            stat = os.stat(file_path)
+        except FileNotFoundError:
+            return None
+        return stat.st_ino, stat.st_size, stat.st_mtime_ns
 
     @staticmethod
     def parse_json(file):
         """
         Parse JSON file in to python object and return it.
         """
-        with open(file, "r") as f:
-            return json.load(f)
+        with open(file, "rb") as f:
+            return IStorage.serializer.loads(f.read())
+
+    @property
+    def columns_path(self):
+        """
+        The columnar snapshot next to the data file, see ColumnarSnapshot.
+        """
+        return f"{self.file_path}.cols"
+
+    def save_columns(self, source):
+        """
+        Save movie_dict as columnar snapshot of the data file. The snapshot is
+        only a cache, it isn't saved if the file can't be written.
+
+        Parameters:
+            source (tuple): Six integers describing the data file the movies were read from.
+        """
+        encoded = ColumnarSnapshot.encode(self.movie_dict.items(), source)
+        try:
+            with self.atomic_open(self.columns_path, "wb") as f:
+                f.write(encoded)
+        except OSError:
+            pass
+
+    def columns(self):
+        """
+        Return movie_dict if it is an unchanged columnar snapshot, which answers
+        stats and sorted queries straight from its columns, otherwise None.
+        """
+        movie_dict = getattr(self, "movie_dict", None)
+        if isinstance(movie_dict, ColumnarSnapshot) and not movie_dict.changed:
+            return movie_dict
+        return None
+
+    # query methods, storages may override them to answer the query without
+    # going through the in-memory movie_dict of Movie records
+    def has_movie(self, movie_title):
+        """
+        Return True if a movie with the given title is in the database.
+        """
+        return movie_title in self.movie_dict
+
+    def movie_titles(self):
+        """
+        Return the titles of every movie in the database.
+        """
+        return self.movie_dict.keys()
+
+    def count_movies(self):
+        """
+        Return the number of movies in the database.
+        """
+        return len(self.movie_dict)
+
+    def get_movie(self, movie_title):
+        """
+        Return the Movie record of the given title, None if it is not in the database.
+        """
+        return self.movie_dict.get(movie_title)
+
+    def search_index(self):
+        """
+        Return the trigram search index over all titles. It is built on first use
+        and afterwards kept up to date by movies_changed().
+        """
+        index = getattr(self, "_search_index", None)
+        if index is None:
+            index = SearchIndex(self.movie_titles())
+            self._search_index = index
+        return index
+
+    def search_movies(self, query):
+        """
+        Return a (title, rating) tuple for every movie whose title contains the
+        query. The search is case-insensitive, missing ratings are None.
+        """
+        return [(movie_title, self.movie_dict[movie_title].rating)
+                for movie_title in self.search_index().search(query)]
+
+    def fuzzy_search_movies(self, query, limit=10):
+        """
+        Return up to limit (title, rating) tuples of the movies whose titles are
+        most similar to the query, so misspelled queries still find the movie.
+        """
+        return [(movie_title, self.movie_dict[movie_title].rating)
+                for movie_title, _ in self.search_index().fuzzy_search(query, limit)]
+
+    def rating_index(self):
+        """
+        Return the index of all movies ordered by rating. It is built on first use
+        and afterwards kept up to date by movies_changed().
+        """
+        index = getattr(self, "_rating_index", None)
+        if index is None:
+            if isinstance(self.movie_dict, ColumnarSnapshot):
+                movies = self.movie_dict.rating_items()
+            else:
+                movies = ((movie_title, movie.rating) for movie_title, movie in self.movie_dict.items())
+            index = RatingIndex(movies)
+            self._rating_index = index
+        return index
+
+    def list_movies_page(self, offset=0, limit=None, sort_key=None):
+        """
+        Return a page of (title, Movie) tuples without copying the whole catalog.
+
+        Parameters:
+            offset (int, optional): Number of movies to skip.
+            limit (int, optional): Maximum number of movies to return.
+            sort_key (str, optional): None keeps the stored order, "title" sorts
+                alphabetically, "rating" best rating first and "year" oldest first.
+                Movies without rating or year come last, ties are sorted by title.
+        """
+        end = None if limit is None else offset + limit
+        columns = self.columns()
+        if columns is not None and sort_key is not None:
+            if sort_key not in ("title", "rating", "year"):
+                raise ValueError(f"Unknown sort key: {sort_key}")
+            return columns.sorted_page(offset, limit, sort_key)
+        if sort_key is None:
+            titles = itertools.islice(self.movie_dict, offset, end)
+        elif sort_key == "rating":
+            titles = [title for title, _ in self.rating_index().range(offset, limit)]
+        elif sort_key in ("title", "year"):
+            if sort_key == "title":
+                key = None
+            else:
+                def key(title):
+                    year = self.movie_dict[title].year
+                    return year is None, year or 0, title
+            # a page near the start only needs a partial sort
+            if end is None:
+                titles = sorted(self.movie_dict, key=key)[offset:]
+            else:
+                titles = heapq.nsmallest(end, self.movie_dict, key=key)[offset:]
+        else:
+            raise ValueError(f"Unknown sort key: {sort_key}")
+        return [(title, self.movie_dict[title]) for title in titles]
+
+    def movies_sorted_by_rating(self, offset=0, limit=None, min_rating=None, max_rating=None):
+        """
+        Return (title, rating) tuples sorted by rating in descending order, ties by title.
+        Movies without a rating have the rating None and come last.
+
+        Parameters:
+            offset (int, optional): Number of movies to skip.
+            limit (int, optional): Maximum number of movies to return.
+            min_rating (float, optional): Only movies rated at least min_rating.
+            max_rating (float, optional): Only movies rated at most max_rating.
+                With a rating bound, movies without rating are left out.
+        """
+        columns = self.columns()
+        if columns is not None:
+            return columns.movies_sorted_by_rating(offset, limit, min_rating, max_rating)
+        return self.rating_index().range(offset, limit, min_rating, max_rating)
+
+    def count_movies_by_rating(self, min_rating=None, max_rating=None):
+        """
+        Return the number of movies movies_sorted_by_rating() returns for the rating bounds.
+        """
+        columns = self.columns()
+        if columns is not None:
+            return columns.count_movies_by_rating(min_rating, max_rating)
+        return self.rating_index().count(min_rating, max_rating)
+
+    def movie_stats(self):
+        """
+        Return the rating statistics of the database:
+            {
+                "count": number of rated movies,
+                "average": float or None,
+                "median": float or None,
+                "best": (title, rating) or None,
+                "worst": (title, rating) or None
+            }
+
+        The statistics are cached until the next change of the database.
+        """
+        stats = getattr(self, "_stats_cache", None)
+        if stats is None:
+            stats = self.compute_movie_stats()
+            self._stats_cache = stats
+        return stats
+
+    def compute_movie_stats(self):
+        """
+        Compute the statistics of movie_stats() in a single pass over movie_dict.
+        Movies without a rating are ignored.
+        """
+        if isinstance(self.movie_dict, ColumnarSnapshot):
+            return self.movie_dict.movie_stats()
+        ratings = []
+        best = worst = None
+        for movie_title, movie in self.movie_dict.items():
+            rating = movie.rating
+            if rating is None:
+                continue
+            ratings.append(rating)
+            if best is None or rating > best[1]:
+                best = (movie_title, rating)
+            if worst is None or rating < worst[1]:
+                worst = (movie_title, rating)
+
+        if not ratings:
+            return {"count": 0, "average": None, "median": None, "best": None, "worst": None}
+        return {
+            "count": len(ratings),
+            "average": sum(ratings) / len(ratings),
+            "median": statistics.median(ratings),
+            "best": best,
+            "worst": worst
+        }
+
+    def movies_changed(self, movie_titles=()):
+        """
+        Drop every cached query result and update
+        the indexes for the given added, updated or deleted titles.
+        Storages call this after each change of the database.
+        """
+        self._stats_cache = None
+        if movie_titles:
+            self.revision += 1
+
+        search_index = getattr(self, "_search_index", None)
+        rating_index = getattr(self, "_rating_index", None)
+        for movie_title in movie_titles:
+            if self.has_movie(movie_title):
+                if search_index is not None:
+                    search_index.add(movie_title)
+                if rating_index is not None:
+                    rating_index.add(movie_title, self.movie_dict[movie_title].rating)
+            else:
+                if search_index is not None:
+                    search_index.remove(movie_title)
+                if rating_index is not None:
+                    rating_index.remove(movie_title)
+
+    def reset_indexes(self):
+        """
+        Drop the indexes and every cached query result, they are built again on
+        their next use. Storages call this after they reloaded the whole database.
+        """
+        self.revision += 1
+        self._stats_cache = None
+        self._search_index = None
+        self._rating_index = None
+
+    def refresh(self):
+        """
+        Pick up the changes other processes made to the database since it was
+        read. Cheap when nothing changed, storages only compare file signatures.
+
+        Returns:
+            bool: True if the database changed.
+        """
+        return False
+
+    @property
+    def lock_path(self):
+        """
+        The lock file next to the data file, it also holds the version counters.
+        """
+        return f"{self.file_path}.lock"
+
+    @staticmethod
+    def parse_lock_state(data):
+        """
+        Parse the content of a lock file: "<version> <generation>".
+        """
+        version, _, generation = data.decode().partition(" ")
+        return int(version or 0), int(generation or 0)
+
+    def read_lock_state(self):
+        """
+        Return (version, generation) of the database: the number of writes made
+        under write_lock() by all processes, and how many of them replaced a
+        data file instead of appending to it.
+        """
+        try:
+            with open(self.lock_path, "rb") as f:
+                return self.parse_lock_state(f.read())
+        except FileNotFoundError:
+            return 0, 0
+
+    def file_replaced(self):
+        """
+        Record that the current write_lock() block replaced a data file, other
+        processes have to read it again as a whole instead of only its tail.
+
+        Returns:
+            int: The generation of the database after the block.
+        """
+        self._replaced_file = True
+        return self._lock_generation + 1
+
+    @contextmanager
+    def write_lock(self):
+        """
+        Hold the exclusive lock of the database while checking and changing it.
+
+        Writers of all processes take an fcntl advisory lock on the lock file
+        (file_path + ".lock"), so their writes never interleave. The lock file
+        holds a version counter that is bumped by every write. If it differs from
+        the version this storage last wrote at, another process wrote in between
+        and its changes are merged into the in-memory state with refresh() before
+        the block runs, instead of being overwritten. Nested blocks share the lock.
+
+        The generation counter of the lock file is bumped by writes that replaced
+        a data file (see file_replaced()). A replacement can reuse the inode of an
+        older file, so refresh() compares the generation before it trusts a file
+        signature and reads only the appended tail.
+        """
+        if self._lock_depth:
+            self._lock_depth += 1
+            try:
+                yield
+            finally:
+                self._lock_depth -= 1
+            return
+
+        fd = os.open(self.lock_path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            if fcntl is not None:
+                fcntl.flock(fd, fcntl.LOCK_EX)
+            self._lock_depth = 1
+            self._replaced_file = False
+            # os.pread() and os.pwrite() don't exist on Windows
+            os.lseek(fd, 0, os.SEEK_SET)
+            version, generation = self.parse_lock_state(os.read(fd, 64))
+            self._lock_generation = generation
+            if version != self.version:
+                self.refresh()
+            yield
+            if self._replaced_file:
+                generation += 1
+                self.generation = generation
+            self.version = version + 1
+            os.ftruncate(fd, 0)
+            os.lseek(fd, 0, os.SEEK_SET)
+            os.write(fd, f"{self.version} {generation}".encode())
+        finally:
+            self._lock_depth = 0
+            # closing the file releases the lock
+            os.close(fd)
+
+    def random_movie(self):
+        """
+        Return the (title, rating) tuple of a random movie.
+        """
+        movie_title = random.choice(list(self.movie_dict))
+        return movie_title, self.movie_dict[movie_title].rating
+
+    def add_movie(self, movie_title, movie_data, fetch_successful):
+        """
+        Add a fetched movie to the storage system.
+
+        Parameters:
+            movie_title (str): The title the user searched for.
+            movie_data (dict): The OMDb response.
+            fetch_successful (bool): False if OMDb didn't find the movie.
+
+        Returns:
+            tuple: (title, added, message)
+        """
+        if not fetch_successful:
+            return movie_title, False, "couldn't be found"
+        return self.add_movies([movie_data])[0]
 
     # abstract methods
     @abstractmethod
     def list_movies(self):
         """
-        Prints every movie in the database
+        Return a dictionary mapping every title in the database to its Movie record.
         """
 
     @abstractmethod
-    def add_movie(self, movie_title, movie_data, fetch_successful):
+    def add_movies(self, movies_data):
         """
-        Add a movie to the storage system.
+        Add several fetched movies with one batched write and
+        return a (title, added, message) tuple per movie.
         """
 
     @abstractmethod
-    def delete_movie(self):
+    def delete_movie(self, movie_title):
         """
-        Delete a movie from the storage system.
+        Delete a movie from the storage system, return False if it doesn't exist.
         """
 
     @abstractmethod
-    def update_movie(self):
+    def update_movie(self, movie_title, new_rating):
         """
-        Update the movie manually.
+        Update the rating of a movie, return False if it doesn't exist.
         """
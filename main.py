@@ -1,13 +1,14 @@
+import argparse
+
 from movie_app import MovieApp
-from storage_json import StorageJson
-from storage_csv import StorageCsv
 
 
 def main():
     """
     The main function of the movie database application.
 
-    - It creates an instance of either StorageJson or StorageCsv based on the user choice.
+    - It creates an instance of StorageJson, StorageCsv, StorageSqlite or StorageNdjson based on
+      the user choice.
     - It then initializes a MovieApp instance with the chosen storage.
     - Finally, it runs the movie application using the `run()` method of the MovieApp instance.
 
@@ -18,38 +19,70 @@ def main():
     Supported File Formats:
     - JSON: If the user selects option 1, StorageJson will be used.
     - CSV: If the user selects option 2, StorageCsv will be used.
+    - SQLite: If the user selects option 3, StorageSqlite will be used.
+    - NDJSON: If the user selects option 4, StorageNdjson will be used.
+
+    Command line options:
+    - --throttle SECONDS: Wait after every movie of the movie list (default: no delay).
+    - --columnar: Load a JSON or CSV database from a binary columnar snapshot kept next to it.
+    - --instrument: Record call counts, latencies and bytes read and written of the
+      commands and the storage, shown by menu entry 12 and printed on exit.
     """
+    parser = argparse.ArgumentParser(description="My Movies Database")
+    parser.add_argument("--throttle", type=float, default=0,
+                        help="seconds to wait after every movie of the movie list")
+    parser.add_argument("--columnar", action="store_true",
+                        help="load a JSON or CSV database from a binary columnar snapshot kept next to it")
+    parser.add_argument("--instrument", action="store_true",
+                        help="record call counts, latencies and bytes of commands and storage I/O")
+    args = parser.parse_args()
+
     storage_types = {
         1: "data/movies_data.json",
-        2: "data/movies_data.csv"
+        2: "data/movies_data.csv",
+        3: "data/movies_data.sqlite",
+        4: "data/movies_data.ndjson"
     }
 
-    # Storage choice will be displayed as infinite loop, until 1 or 2 is chosen
+    # Storage choice will be displayed as infinite loop, until 1, 2, 3 or 4 is chosen
     while True:
         try:
             user_storage_choice = int(input("Which Storage would you like to use?\n"
                                             "1. JSON\n"
                                             "2. CSV\n"
+                                            "3. SQLite\n"
+                                            "4. NDJSON\n"
                                             "\n"
-                                            "Enter your choice (1-2): "))
+                                            "Enter your choice (1-4): "))
 
             file_path = storage_types.get(user_storage_choice)
 
             if file_path is None:
                 raise ValueError
             else:
+                # only the chosen storage module is imported
                 if user_storage_choice == 1:
-                    storage = StorageJson(file_path)
-                    movie_app = MovieApp(storage)
-                    movie_app.run()
-                    break
+                    from storage_json import StorageJson as storage_class
                 elif user_storage_choice == 2:
-                    storage = StorageCsv(file_path)
-                    movie_app = MovieApp(storage)
-                    movie_app.run()
-                    break
+                    from storage_csv import StorageCsv as storage_class
+                elif user_storage_choice == 3:
+                    from storage_sqlite import StorageSqlite as storage_class
+                else:
+                    from storage_ndjson import StorageNdjson as storage_class
+
+                if args.instrument:
+                    # after the storage import, so loading the database is recorded too
+                    from instrumentation import Instrumentation
+                    Instrumentation.enable()
+
+                # only the JSON and CSV storages keep a columnar snapshot
+                options = {"columnar": True} if args.columnar and user_storage_choice in (1, 2) else {}
+                storage = storage_class(file_path, **options)
+                movie_app = MovieApp(storage, throttle=args.throttle)
+                movie_app.run()
+                break
         except ValueError:
-            print("Please select one of the storage options 1-2")
+            print("Please select one of the storage options 1-4")
             input("Press Enter to try again\n")
 
 
@@ -0,0 +1,112 @@
+class Movie:
+    """
+    Compact record of a single movie, shared by all storages.
+
+    The rating and the year are parsed once when the movie is loaded, so stats,
+    sorting and searching don't have to convert strings again. A missing value
+    ("N/A" in OMDb responses and in the data files) is stored as None.
+    Series years like "2008–2013" are sorted and filtered by their first year,
+    the original text is kept in raw_year for the data files and the display.
+    """
+    __slots__ = ("rating", "year", "poster", "raw_year")
+
+    MISSING = "N/A"
+
+    def __init__(self, rating, year, poster, raw_year=None):
+        """
+        Constructor of class Movie.
+
+        Parameters:
+            rating (float or None): The IMDb rating.
+            year (int or None): The release year.
+            poster (str): The URL of the poster image.
+            raw_year (str, optional): The year as written in the data, e.g.
+                "2008–2013". Only kept if it is more than the year itself.
+        """
+        self.rating = rating
+        self.year = year
+        self.poster = poster
+        if raw_year in (None, "", self.MISSING) or raw_year == str(year):
+            raw_year = None
+        self.raw_year = raw_year
+
+    @classmethod
+    def from_strings(cls, rating, year, poster):
+        """
+        Create a Movie from the string values used in OMDb responses and data files.
+        """
+        return cls(cls.parse_rating(rating), cls.parse_year(year), poster,
+                   year if isinstance(year, str) else None)
+
+    @classmethod
+    def from_dict(cls, movie_data):
+        """
+        Create a Movie from a {"rating": ..., "year": ..., "poster": ...} dictionary.
+        """
+        return cls.from_strings(movie_data.get("rating"), movie_data.get("year"),
+                                movie_data.get("poster"))
+
+    @classmethod
+    def from_omdb(cls, movie_data):
+        """
+        Create a Movie from a successful OMDb response.
+        """
+        return cls.from_strings(movie_data["imdbRating"], movie_data["Year"], movie_data["Poster"])
+
+    @classmethod
+    def parse_rating(cls, rating):
+        """
+        Return the rating as float or None if it is missing.
+        """
+        if rating is None or rating == cls.MISSING or rating == "":
+            return None
+        return float(rating)
+
+    @classmethod
+    def parse_year(cls, year):
+        """
+        Return the (first) year as int or None if it is missing.
+        """
+        if year is None or isinstance(year, int):
+            return year
+        digits = str(year)[:4]
+        return int(digits) if digits.isdigit() else None
+
+    @property
+    def rating_text(self):
+        """
+        The rating as string, "N/A" if it is missing.
+        """
+        return self.MISSING if self.rating is None else str(self.rating)
+
+    @property
+    def year_text(self):
+        """
+        The year as written in the data (e.g. "2008–2013"), "N/A" if it is missing.
+        """
+        if self.raw_year is not None:
+            return self.raw_year
+        return self.MISSING if self.year is None else str(self.year)
+
+    def with_rating(self, rating):
+        """
+        Return a copy of the movie with another rating.
+        """
+        return Movie(rating, self.year, self.poster, self.raw_year)
+
+    def to_dict(self):
+        """
+        Return the movie as dictionary of strings, the format of the data files:
+            {"rating": "...", "year": "...", "poster": "..."}
+        """
+        return {"rating": self.rating_text, "year": self.year_text, "poster": self.poster}
+
+    def __eq__(self, other):
+        if not isinstance(other, Movie):
+            return NotImplemented
+        return ((self.rating, self.year, self.poster, self.raw_year)
+                == (other.rating, other.year, other.poster, other.raw_year))
+
+    def __repr__(self):
+        raw_year = "" if self.raw_year is None else f", raw_year={self.raw_year!r}"
+        return f"Movie(rating={self.rating!r}, year={self.year!r}, poster={self.poster!r}{raw_year})"
@@ -1,24 +1,75 @@
-import random
-import statistics
+import sys
+import threading
 import time
-import requests
+
+from config import Config
 
 
 class MovieApp:
-    def __init__(self, movie_storage):
+    # number of concurrent OMDb requests when adding several movies at once
+    FETCH_WORKERS = 8
+    # number of movies shown per page of the sorted movie list
+    PAGE_SIZE = 20
+    # maximum (width, height) of the poster thumbnails of the website
+    THUMBNAIL_SIZE = (256, 386)
+    # number of movies formatted and written at once by the movie list
+    LIST_CHUNK_SIZE = 1000
+
+    def __init__(self, movie_storage, omdb_cache=None, throttle=0, config=None):
         """
         Constructor of class MovieApp. Initializes the instance variables.
 
+        The HTTP session and the OMDb cache are only created when the first movie
+        is fetched, so commands that don't fetch start without importing requests
+        and sqlite3.
+
         Parameters:
             movie_storage (class): An object of a class inheriting from IStorage.
+            omdb_cache (OmdbCache, optional): Cache for OMDb responses. Defaults to
+                a cache stored in data/omdb_cache.sqlite.
+            throttle (float, optional): Seconds to wait after every movie of the
+                movie list, so long lists can be read while they scroll by.
+            config (Config, optional): The application settings, loaded from
+                data/api_key.json by default.
         """
         self._storage = movie_storage
-        self.API_KEY = self._storage.parse_json("data/api_key.json")["api_key"]
-        self.FETCH_MOVIE_URL = f"http://www.omdbapi.com/?apikey={self.API_KEY}&"
+        self.throttle = throttle
+        self._config = config or Config.load()
+        self._omdb_cache = omdb_cache
+        self._session = None
+        self._lazy_lock = threading.Lock()
+        self.API_KEY = self._config.api_key
+        self.FETCH_MOVIE_URL = self._config.fetch_movie_url
+
+    @property
+    def omdb_cache(self):
+        """
+        The cache for OMDb responses, opened on first use.
+        """
+        with self._lazy_lock:
+            if self._omdb_cache is None:
+                from omdb_cache import OmdbCache
+                self._omdb_cache = OmdbCache(self._config.omdb_cache_path)
+        return self._omdb_cache
+
+    @property
+    def session(self):
+        """
+        One pooled HTTP session, connections are reused between requests.
+        It is created on first use.
+        """
+        with self._lazy_lock:
+            if self._session is None:
+                import requests
+                self._session = requests.Session()
+                adapter = requests.adapters.HTTPAdapter(pool_maxsize=self.FETCH_WORKERS)
+                self._session.mount("http://", adapter)
+        return self._session
 
     def fetch_data(self, movie):
         """
         - Fetches data from the specified URL using the provided API key and parameters.
+          Responses are answered from the OMDb cache if they were fetched before.
 
         - Parameters:
             - request_url (str): The URL to fetch data from.
@@ -45,8 +96,68 @@ class MovieApp:
         }
     }
         """
-        res = requests.get(self.FETCH_MOVIE_URL, params=movie)
-        return res.json()
+        cached_response = self.omdb_cache.get(movie)
+        if cached_response is not None:
+            return cached_response
+
+        res = self.session.get(self.FETCH_MOVIE_URL, params=movie)
+        response = res.json()
+        self.omdb_cache.put(movie, response)
+        return response
+
+    def fetch_many(self, movie_titles):
+        """
+        Fetch several movies concurrently with a bounded pool of worker threads.
+
+        Parameters:
+            movie_titles (list): Titles to search for.
+
+        Returns:
+            list: One (title, movie_data, error) tuple per title in the given order.
+            movie_data is None if the request failed, error is None if it succeeded.
+        """
+        from concurrent.futures import ThreadPoolExecutor
+        import requests
+
+        def fetch_one(movie_title):
+            try:
+                return movie_title, self.fetch_data({"t": movie_title}), None
+            except (requests.exceptions.RequestException, ValueError) as e:
+                return movie_title, None, e
+
+        with ThreadPoolExecutor(max_workers=self.FETCH_WORKERS) as executor:
+            return list(executor.map(fetch_one, movie_titles))
+
+    def add_movies(self, movie_titles):
+        """
+        Fetch several movies concurrently and add every movie that was found
+        to the storage with a single batched write.
+
+        Parameters:
+            movie_titles (list): Titles to search for.
+
+        Returns:
+            list: One (title, added, message) tuple per title.
+        """
+        report = []
+        found_movies = []
+        for movie_title, movie_data, error in self.fetch_many(movie_titles):
+            if error is not None:
+                report.append((movie_title, False, f"could not be fetched: {error}"))
+            elif not self._storage.fetching_successful(movie_data.get("Response")):
+                report.append((movie_title, False, "couldn't be found"))
+            else:
+                found_movies.append(movie_data)
+
+        report.extend(self._storage.add_movies(found_movies))
+        return report
+
+    @staticmethod
+    def format_rating(rating):
+        """
+        Return the rating for display, "N/A" if the movie has no rating.
+        """
+        return "N/A" if rating is None else rating
 
     @staticmethod
     def show_menu_return_user_choice():
@@ -54,7 +165,7 @@ class MovieApp:
         Print the menu and return the user's choice for the menu.
 
         Returns:
-            int: The user's menu choice (0-9).
+            int: The user's menu choice (0-12).
         """
         user_choice = int(input(
             "\n"
@@ -69,242 +180,291 @@ class MovieApp:
             "7. Search movie\n"
             "8. Movies sorted by rating\n"
             "9. Generate website\n"
+            "10. Add movies from file\n"
+            "11. Generate website with local posters\n"
+            "12. Show timings\n"
             "\n"
-            "Enter you choice (0-9): "))
+            "Enter you choice (0-12): "))
 
         return user_choice
 
-    def _command_list_movies(self):
+    @staticmethod
+    def format_movie(movie_title, movie):
         """
-        Command to list all the movies in the movie storage.
+        Return the details of a movie as shown in the movie list.
         """
-        movies = self._storage.list_movies()
+        return (f"---------------------------------\n"
+                f"Title: {movie_title}\n"
+                f"Rating: {movie.rating_text}\n"
+                f"Year: {movie.year_text}\n"
+                f"Poster: {movie.poster}\n")
+
+    def list_movies(self, offset=0, limit=None, sort_key=None, out=None):
+        """
+        Write the details of a page of movies to out.
 
-        print(f"\n{len(movies)} movies in total:")
+        Without throttle the movies are formatted in chunks of LIST_CHUNK_SIZE
+        and every chunk is written at once, instead of one print per field.
 
-        # Iterate over the dictionary and display movie details
-        for movie_title, movie_data in movies.items():
-            print(f"---------------------------------\n"
-                  f"Title: {movie_title}")
-            for key, val in movie_data.items():
-                try:
-                    print(f"{key.capitalize()}: {val}")
-                except AttributeError:
-                    print(f"{key}: {val}")
-            time.sleep(0.8)
+        Parameters:
+            offset (int, optional): Number of movies to skip.
+            limit (int, optional): Maximum number of movies to list.
+            sort_key (str, optional): None, "title", "rating" or "year",
+                see IStorage.list_movies_page().
+            out (file, optional): Text stream to write to, sys.stdout by default.
+
+        Returns:
+            int: The number of movies listed.
+        """
+        out = out or sys.stdout
+        movies = self._storage.list_movies_page(offset, limit, sort_key)
+
+        if self.throttle:
+            for movie_title, movie in movies:
+                out.write(self.format_movie(movie_title, movie))
+                out.flush()
+                time.sleep(self.throttle)
+        else:
+            for start in range(0, len(movies), self.LIST_CHUNK_SIZE):
+                out.write("".join(self.format_movie(movie_title, movie)
+                                  for movie_title, movie in movies[start:start + self.LIST_CHUNK_SIZE]))
+            out.flush()
+        return len(movies)
+
+    def _command_list_movies(self):
+        """
+        Command to list all the movies in the movie storage.
+        """
+        print(f"\n{self._storage.count_movies()} movies in total:")
+        self.list_movies()
 
     def _command_add_movie(self):
+        """
+        Command to fetch a movie by its title from OMDb and add it to the movie storage.
+        """
+        import requests
+
         user_movie_title = input("Enter new movie name: ")
-        new_movie_data = self.fetch_data({"t": user_movie_title})
+        try:
+            new_movie_data = self.fetch_data({"t": user_movie_title})
+        except requests.exceptions.ConnectionError as e:
+            print(f"There was a connection Error. Please check your internet connection \n"
+                  f"You can still use other menu commands while having no internet connection \n"
+                  f"Further error details: {e} \n")
+            return
         fetch_successful = self._storage.fetching_successful(new_movie_data["Response"])
 
-        self._storage.add_movie(user_movie_title, new_movie_data, fetch_successful)
+        movie_title, added, message = self._storage.add_movie(user_movie_title, new_movie_data,
+                                                              fetch_successful)
+        if not fetch_successful:
+            print("We couldn't find the movie you were searching for")
+        else:
+            print(f"{movie_title} {message}")
+
+    def _command_add_movies(self):
+        """
+        Command to add every movie listed in a text file (one title per line).
+        """
+        file_path = input("Enter the path of a file with one movie title per line: ")
+        try:
+            with open(file_path, "r") as f:
+                movie_titles = [line.strip() for line in f if line.strip()]
+        except OSError as e:
+            print(f"The file couldn't be read: {e}")
+            return
+
+        report = self.add_movies(movie_titles)
+        for movie_title, added, message in report:
+            print(f"{movie_title} {message}")
+
+        added_count = sum(1 for _, added, _ in report if added)
+        print(f"\n{added_count} of {len(movie_titles)} movies were added to the list")
+
+        cache_stats = self.omdb_cache.stats()
+        print(f"OMDb cache: {cache_stats['hits']} hits, {cache_stats['misses']} misses, "
+              f"{cache_stats['entries']} cached responses")
+
+    def _command_delete_movie(self):
+        """
+        Command to delete a movie by its title from the movie storage.
+        """
+        movie_name = input("Enter movie name to delete: ").title()
+
+        if self._storage.delete_movie(movie_name):
+            print(f"{movie_name} was successfully deleted!")
+        else:
+            print(f"{movie_name} is not on the list")
+
+    def _command_update_movie(self):
+        """
+        Command to update the rating of a movie in the movie storage.
+        """
+        movie_name = input("Enter a movie name to update: ").title()
+        if not self._storage.has_movie(movie_name):
+            print(f"{movie_name} is not on the list")
+            return
+
+        new_movie_rating = float(input(f"Enter a new rating for {movie_name}: "))
+        # another process may have deleted the movie in the meantime
+        if self._storage.update_movie(movie_name, new_movie_rating):
+            print(f"The rating of {movie_name} was successfully updated to {new_movie_rating}")
+        else:
+            print(f"{movie_name} is not on the list")
 
     def _command_movie_stats(self):
         """
         Command to display various statistics about the movies in the movie storage,
         such as average rating, median rating, best-rated movie, and worst-rated movie.
         """
+        stats = self._storage.movie_stats()
 
-        def average_movie_rating():
-            """
-            Loop over movie ratings, divide it by total movie amount and print average score.
-            """
-            number_of_movies = len(self._storage.movie_dict)
-            rating_total = 0
-
-            for movie_name in self._storage.movie_dict:
-                movie_rating = self._storage.movie_dict[movie_name]["rating"]
-                if movie_rating != 'N/A':
-                    rating_total += float(movie_rating)
-            print(
-                f"The average score of all movies is: {round(rating_total / number_of_movies, 1)}")
-
-        def median_movie_rating():
-            """
-            Calculate the median rating of all movies.
-            """
-            sorted_ratings = []
-
-            for movie_data in self._storage.movie_dict.values():
-                rating = movie_data.get("rating")
-                if rating is not None and rating != "N/A":
-                    sorted_ratings.append(float(rating))
-
-            rating_median = round(statistics.median(sorted_ratings), 1)
-            print(f"The median of all movies is: {rating_median}")
-
-        def best_movie_rating():
-            """
-            Find the movie with the highest rating.
-            """
-            best_movie_name = None
-            best_rating = float("-inf")
-
-            for movie_name, movie_data in self._storage.movie_dict.items():
-                rating = movie_data.get("rating")
-                if rating is not None and rating != "N/A":
-                    rating_float = float(rating)
-                    if rating_float > best_rating:
-                        best_movie_name = movie_name
-                        best_rating = rating_float
-
-            if best_movie_name is not None:
-                print(f"The movie with the current highest rating is: {best_movie_name} "
-                      f"with a rating of {best_rating}")
-            else:
-                print("No movie ratings available.")
-
-        def worst_movie_rating():
-            """
-            Find the movie with the highest rating.
-            """
-            worst_movie_name = None
-            worst_rating = float("+inf")
-
-            for movie_name, movie_data in self._storage.movie_dict.items():
-                rating = movie_data.get("rating")
-                if rating is not None and rating != "N/A":
-                    rating_float = float(rating)
-                    if rating_float < worst_rating:
-                        worst_movie_name = movie_name
-                        worst_rating = rating_float
-
-            if worst_movie_name is not None:
-                print(f"The movie with the current lowest rating is: {worst_movie_name} "
-                      f"with a rating of {worst_rating}")
-            else:
-                print("No movie ratings available.")
+        if stats["average"] is not None:
+            print(f"The average score of all movies is: {round(stats['average'], 1)}")
+        if stats["median"] is not None:
+            print(f"The median of all movies is: {round(stats['median'], 1)}")
 
-        def movie_stats():
-            """
-            Wrapper function of (5. Stats) menu command. Calls four stat functions
-            """
-            average_movie_rating()
-            median_movie_rating()
-            best_movie_rating()
-            worst_movie_rating()
+        if stats["best"] is not None:
+            best_movie_name, best_rating = stats["best"]
+            print(f"The movie with the current highest rating is: {best_movie_name} "
+                  f"with a rating of {best_rating}")
+        else:
+            print("No movie ratings available.")
 
-        # Call wrapper function to execute all stats methods
-        movie_stats()
+        if stats["worst"] is not None:
+            worst_movie_name, worst_rating = stats["worst"]
+            print(f"The movie with the current lowest rating is: {worst_movie_name} "
+                  f"with a rating of {worst_rating}")
+        else:
+            print("No movie ratings available.")
 
     def _command_movie_random(self):
         """
         Command to randomly select a movie from the movie storage and display its title and rating.
         """
-        random_movie_title = random.choice(list(self._storage.movie_dict))
-        random_movie_rating = self._storage.movie_dict[random_movie_title].get("rating")
+        random_movie_title, random_movie_rating = self._storage.random_movie()
         print(f"\n"
               f"Your random movie:\n"
               f"Title: {random_movie_title}\n"
-              f"Rating: {random_movie_rating}")
+              f"Rating: {self.format_rating(random_movie_rating)}")
 
     def _command_search_movie(self):
         """
         Command to search for movies in the movie storage based on user input (search query).
-        Function is case-insensitive.
+        Function is case-insensitive. If no title contains the query, similar titles are suggested.
         """
         query = input("Search for a movie: ")
-        found_movies = []
-
-        for movie_title in self._storage.movie_dict.keys():
-            if query.lower() in movie_title.lower():
-                found_movies.append(movie_title)
+        found_movies = self._storage.search_movies(query)
 
         if found_movies:
             print(f"\n"
                   f"We found these movies according to your query '{query}':")
-            for movie_title in found_movies:
-                print(f"{movie_title}: {self._storage.movie_dict[movie_title].get('rating')}")
+            for movie_title, movie_rating in found_movies:
+                print(f"{movie_title}: {self.format_rating(movie_rating)}")
         else:
             print(f"I'm sorry! We couldn't find any movies according to your search query "
                   f"'{query}'.")
 
+            similar_movies = self._storage.fuzzy_search_movies(query, limit=5)
+            if similar_movies:
+                print("Did you mean:")
+                for movie_title, movie_rating in similar_movies:
+                    print(f"{movie_title}: {self.format_rating(movie_rating)}")
+
     def _command_sort_movie(self):
         """
-        Command to sort and display all movies in the movie storage by their ratings
-        in descending order.
+        Command to display the movies in the movie storage sorted by their ratings
+        in descending order, page by page. Optionally only movies within a rating
+        range (e.g. 7.5-8.0) are shown.
         """
-        print("\n"
-              "All movies sorted by their best rating in descending order:")
-        sorted_movies = []
+        rating_range = input("Enter a rating range (e.g. 7.5-8.0) or press enter for all movies: ")
+        min_rating = max_rating = None
+        if rating_range.strip():
+            try:
+                min_text, _, max_text = rating_range.partition("-")
+                min_rating = float(min_text) if min_text.strip() else None
+                max_rating = float(max_text) if max_text.strip() else None
+            except ValueError:
+                print(f"'{rating_range}' is not a valid rating range")
+                return
 
-        for movie, details in self._storage.movie_dict.items():
-            rating = details.get("rating")
-            if rating == 'N/A':
-                rating = 0.0
-            else:
-                rating = float(rating)
-            sorted_movies.append((movie, rating))
+        total = self._storage.count_movies_by_rating(min_rating, max_rating)
+        page_count = -(-total // self.PAGE_SIZE)
+        print(f"\n"
+              f"{total} movies sorted by their best rating in descending order:")
 
-        sorted_movies.sort(key=lambda x: x[1], reverse=True)
+        for page in range(page_count):
+            for movie, rating in self._storage.movies_sorted_by_rating(
+                    page * self.PAGE_SIZE, self.PAGE_SIZE, min_rating, max_rating):
+                print(f"{movie}: {self.format_rating(rating)}")
 
-        for movie, rating in sorted_movies:
-            if rating == 0.0:
-                print(f"{movie}: N/A")
-            else:
-                print(f"{movie}: {rating}")
+            if page + 1 < page_count:
+                answer = input(f"-- page {page + 1} of {page_count}, press enter for the next page "
+                               f"or 'q' to stop: ")
+                if answer.strip().lower() == "q":
+                    break
+
+    @staticmethod
+    def _command_show_timings():
+        """
+        Command to print the call counts, latencies and bytes read and written
+        collected since the start (python main.py --instrument).
+        """
+        from instrumentation import Instrumentation
 
-    def _generate_website(self, static_html):
+        if Instrumentation.active is None:
+            print("Timings are not recorded, start the application with --instrument")
+        else:
+            print(Instrumentation.active.report())
+
+    def generate_website(self, static_html, mirror_posters=False):
         """
         Generate a static HTML website containing a movie grid with movie properties.
+        Large catalogs are split into several pages, only pages whose movies changed
+        since the last build are written again.
 
         Parameters:
             static_html (str): The file path to the HTML template for the website.
+            mirror_posters (bool, optional): Download the posters into _static/posters,
+                create thumbnails (if Pillow is installed) and load them lazily.
         """
+        from site_generator import SiteGenerator
 
-        # get template
-        with open(static_html, "r") as f:
-            index_template = f.read()
+        movies = self._storage.list_movies()
+        generator = SiteGenerator(static_html, output_dir="_static")
 
-            complete_movie_grid = ""
-            for movie_name, movie_data in self._storage.movie_dict.items():
-                movie_title = movie_name
-                movie_year = movie_data.get("year")
-                movie_poster = movie_data.get("poster")
+        poster_paths = None
+        if mirror_posters:
+            from poster_mirror import PosterMirror
 
-                movie_grid = f'<li>' \
-                             f'<div class="movie">' \
-                             f'<img class="movie-poster" src="{movie_poster}" title=""/>' \
-                             f'<div class="movie-title">{movie_title}</div>' \
-                             f'<div class="movie-year">{movie_year}</div>' \
-                             f'</div>' \
-                             f'</li>'
-                complete_movie_grid += movie_grid
+            mirror = PosterMirror("_static/posters", thumbnail_size=self.THUMBNAIL_SIZE)
+            if mirror.thumbnail_size is None:
+                print("Pillow is not installed, the posters are used without thumbnails.")
+            mirror_report = mirror.mirror(movie.poster for movie in movies.values())
+            poster_paths = {url: f"posters/{file_name}"
+                            for url, file_name in mirror_report["paths"].items()}
+            print(f"Posters: {mirror_report['downloaded']} downloaded, "
+                  f"{mirror_report['unchanged']} unchanged, {mirror_report['failed']} failed")
 
-            index_title = index_template.replace("__TEMPLATE_TITLE__", "My Movie App")
-            complete_index = index_title.replace("__TEMPLATE_MOVIE_GRID__", complete_movie_grid)
+        report = generator.build(movies, poster_paths)
 
-        # generate index.html
-        with open("_static/index.html", "w") as f:
-            f.write(complete_index)
-            print("Website was generated successfully.")
+        print(f"Website was generated successfully: {report['pages']} pages, "
+              f"{report['written']} written, {report['skipped']} unchanged, "
+              f"{report['search_shards_written']} search index shards written, "
+              f"{report['bytes_written']} bytes in {report['seconds']:.2f} s")
 
     def run(self):
         """
         Entry point of the application. Displays the menu and executes corresponding commands
         based on user input.
 
-        Uses a dictionary of movies as database, each movie is a dictionary:
+        Uses a dictionary of movies as database, each movie is a Movie record:
             {
-                "Title": {
-                    "rating": "...",
-                    "year": "...",
-                    "poster": "..."
-                },
-                "Title": {
-                    "rating": "...",
-                    "year": "...",
-                    "poster": "..."
-                },
-                "Title": {
-                    "rating": "...",
-                    "year": "...",
-                    "poster": "..."
-                }
+                "Title": Movie(rating=7.9, year=1997, poster="..."),
+                "Title": Movie(rating=None, year=2023, poster="..."),
+                "Title": Movie(rating=9.0, year=2008, poster="...")
             }
 
-        - The menu has 9 entries and will be displayed as follows:
+        - The menu has 13 entries and will be displayed as follows:
             0. Exit
             1. List movies
             2. Add movie
@@ -315,6 +475,9 @@ class MovieApp:
             7. Search movie
             8. Movies sorted by rating
             9. Generate Website
+            10. Add movies from file
+            11. Generate website with local posters
+            12. Show timings
         """
 
         print("********** My Movies Database **********")
@@ -324,13 +487,16 @@ class MovieApp:
             0: lambda: print("Bye!"),
             1: lambda: self._command_list_movies(),
             2: lambda: self._command_add_movie(),
-            3: lambda: self._storage.delete_movie(),
-            4: lambda: self._storage.update_movie(),
+            3: lambda: self._command_delete_movie(),
+            4: lambda: self._command_update_movie(),
             5: lambda: self._command_movie_stats(),
             6: lambda: self._command_movie_random(),
             7: lambda: self._command_search_movie(),
             8: lambda: self._command_sort_movie(),
-            9: lambda: self._generate_website("_static/index_template.html")
+            9: lambda: self.generate_website("_static/index_template.html"),
+            10: lambda: self._command_add_movies(),
+            11: lambda: self.generate_website("_static/index_template.html", mirror_posters=True),
+            12: lambda: self._command_show_timings()
         }
 
         # Menu will be displayed as an infinite loop. Only entry 0 breaks this loop
@@ -340,6 +506,8 @@ class MovieApp:
 
                 action = choice_actions.get(user_choice)
                 if action:
+                    # pick up the changes other processes made to the data file
+                    self._storage.refresh()
                     action()
                     if user_choice == 0:
                         break
@@ -349,5 +517,5 @@ class MovieApp:
                 input("\nPress enter to continue")
 
             except ValueError:
-                print("Error! Please select one of the menu points 0-9")
+                print("Error! Please select one of the menu points 0-12")
                 input("Press Enter to try again")
@@ -0,0 +1,108 @@
+import json
+import sqlite3
+import threading
+import time
+
+
+class OmdbCache:
+    # responses of these errors depend on the API key, not on the movie
+    UNCACHEABLE_ERRORS = ("Invalid API key!", "Request limit reached!")
+
+    def __init__(self, file_path, ttl=7 * 24 * 3600, negative_ttl=24 * 3600, max_entries=10000):
+        """
+        Constructor of class OmdbCache. A persistent cache for OMDb responses
+        stored in a sqlite database.
+
+        Entries expire after ttl seconds ("Response": "False" answers after
+        negative_ttl seconds). Once more than max_entries responses are stored,
+        the least recently used ones are evicted.
+
+        Parameters:
+            file_path (str): The file path of the sqlite cache database.
+            ttl (int, optional): Lifetime of a found movie in seconds.
+            negative_ttl (int, optional): Lifetime of a "not found" answer in seconds.
+            max_entries (int, optional): Maximum number of cached responses.
+        """
+        self.file_path = file_path
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+
+        # the cache is shared by the fetch worker threads
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(file_path, check_same_thread=False)
+        self._connection.executescript(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "  key TEXT PRIMARY KEY,"
+            "  response TEXT NOT NULL,"
+            "  expires_at REAL NOT NULL,"
+            "  last_used REAL NOT NULL"
+            ");"
+            "CREATE INDEX IF NOT EXISTS responses_last_used ON responses (last_used);"
+        )
+
+    @staticmethod
+    def cache_key(params):
+        """
+        Return the cache key of the request parameters. Values are casefolded and
+        whitespace is collapsed, so "the  matrix" and "The Matrix" share one entry.
+        """
+        normalized = {key: " ".join(str(value).split()).casefold() for key, value in params.items()}
+        return json.dumps(normalized, sort_keys=True)
+
+    def get(self, params):
+        """
+        Return the cached response for the request parameters or None.
+        """
+        key = self.cache_key(params)
+        now = time.time()
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT response, expires_at FROM responses WHERE key = ?", (key,)).fetchone()
+
+            if row is None or row[1] < now:
+                if row is not None:
+                    self._connection.execute("DELETE FROM responses WHERE key = ?", (key,))
+                    self._connection.commit()
+                self.misses += 1
+                return None
+
+            self._connection.execute("UPDATE responses SET last_used = ? WHERE key = ?", (now, key))
+            self._connection.commit()
+            self.hits += 1
+            return json.loads(row[0])
+
+    def put(self, params, response):
+        """
+        Store a response and evict the least recently used entries if the cache is full.
+        Errors caused by the API key or the request quota are not cached.
+        """
+        if response.get("Error") in self.UNCACHEABLE_ERRORS:
+            return
+
+        now = time.time()
+        if response.get("Response") == "True":
+            expires_at = now + self.ttl
+        else:
+            expires_at = now + self.negative_ttl
+
+        with self._lock:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO responses (key, response, expires_at, last_used) "
+                "VALUES (?, ?, ?, ?)",
+                (self.cache_key(params), json.dumps(response), expires_at, now))
+            self._connection.execute(
+                "DELETE FROM responses WHERE key IN ("
+                "  SELECT key FROM responses ORDER BY last_used DESC LIMIT -1 OFFSET ?"
+                ")", (self.max_entries,))
+            self._connection.commit()
+
+    def stats(self):
+        """
+        Return the hit and miss counters and the number of cached responses.
+        """
+        with self._lock:
+            entries = self._connection.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        return {"hits": self.hits, "misses": self.misses, "entries": entries}
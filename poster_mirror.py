@@ -0,0 +1,154 @@
+import hashlib
+import io
+import os
+from concurrent.futures import ThreadPoolExecutor
+import requests
+
+from istorage import IStorage
+
+try:
+    from PIL import Image
+except ImportError:  # thumbnails are optional
+    Image = None
+
+
+class PosterMirror:
+    # number of concurrent poster downloads
+    DOWNLOAD_WORKERS = 8
+
+    def __init__(self, output_dir="_static/posters", thumbnail_size=None, session=None):
+        """
+        Constructor of class PosterMirror. Downloads the poster images into a
+        local directory, so the website doesn't depend on the remote image host.
+
+        Files are named after the SHA-256 of their content, posters shared by
+        several movies are stored once. A manifest remembers the ETag and
+        Last-Modified header of every URL, later runs send conditional requests
+        and only download new or changed images.
+
+        Parameters:
+            output_dir (str, optional): Directory the posters are stored in.
+            thumbnail_size (tuple, optional): (width, height) of thumbnails to create
+                next to the posters. Needs the Pillow package.
+            session (requests.Session, optional): Session used for the downloads.
+        """
+        self.output_dir = output_dir
+        self.manifest_path = os.path.join(output_dir, "manifest.json")
+        self.thumbnail_size = thumbnail_size if Image is not None else None
+        self._session = session or requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_maxsize=self.DOWNLOAD_WORKERS)
+        self._session.mount("http://", adapter)
+        self._session.mount("https://", adapter)
+
+        os.makedirs(output_dir, exist_ok=True)
+        try:
+            self.manifest = IStorage.parse_json(self.manifest_path)
+        except (FileNotFoundError, ValueError):
+            self.manifest = {}
+
+    @staticmethod
+    def is_remote(url):
+        """
+        Return True if the poster is a downloadable URL (OMDb uses "N/A" for no poster).
+        """
+        return isinstance(url, str) and url.startswith(("http://", "https://"))
+
+    def download(self, url):
+        """
+        Download a single poster with a conditional request.
+
+        Returns:
+            tuple: (url, manifest entry or None, status), status is one of
+            "downloaded", "unchanged" or the error message.
+        """
+        entry = self.manifest.get(url)
+        headers = {}
+        if entry is not None and os.path.exists(os.path.join(self.output_dir, entry["file"])):
+            if entry.get("etag"):
+                headers["If-None-Match"] = entry["etag"]
+            if entry.get("last_modified"):
+                headers["If-Modified-Since"] = entry["last_modified"]
+
+        try:
+            res = self._session.get(url, headers=headers, timeout=30)
+            if res.status_code == 304:
+                return url, self.with_thumbnail(entry), "unchanged"
+            res.raise_for_status()
+        except requests.exceptions.RequestException as e:
+            return url, entry, str(e)
+
+        extension = os.path.splitext(url.split("?")[0])[1].lower() or ".jpg"
+        content_hash = hashlib.sha256(res.content).hexdigest()
+        file_name = content_hash + extension
+        file_path = os.path.join(self.output_dir, file_name)
+
+        # identical images are stored only once
+        if not os.path.exists(file_path):
+            with IStorage.atomic_open(file_path, "wb") as f:
+                f.write(res.content)
+
+        new_entry = {
+            "file": file_name,
+            "etag": res.headers.get("ETag"),
+            "last_modified": res.headers.get("Last-Modified")
+        }
+        if self.thumbnail_size is not None:
+            new_entry["thumbnail"] = self.write_thumbnail(res.content, content_hash)
+        return url, new_entry, "downloaded"
+
+    def with_thumbnail(self, entry):
+        """
+        Return the manifest entry of an unchanged poster with its thumbnail,
+        which is created from the local copy if it is missing (e.g. the poster
+        was mirrored before thumbnails were enabled).
+        """
+        if self.thumbnail_size is None or \
+                (entry.get("thumbnail") and os.path.exists(os.path.join(self.output_dir, entry["thumbnail"]))):
+            return entry
+        with open(os.path.join(self.output_dir, entry["file"]), "rb") as f:
+            content = f.read()
+        content_hash = os.path.splitext(entry["file"])[0]
+        return dict(entry, thumbnail=self.write_thumbnail(content, content_hash))
+
+    def write_thumbnail(self, content, content_hash):
+        """
+        Write a JPEG thumbnail of the image and return its file name.
+        """
+        file_name = f"{content_hash}-thumb.jpg"
+        file_path = os.path.join(self.output_dir, file_name)
+        if not os.path.exists(file_path):
+            with Image.open(io.BytesIO(content)) as image:
+                image.thumbnail(self.thumbnail_size)
+                with IStorage.atomic_open(file_path, "wb") as f:
+                    image.convert("RGB").save(f, "JPEG", quality=85)
+        return file_name
+
+    def mirror(self, urls):
+        """
+        Download every poster URL concurrently and save the manifest.
+
+        Parameters:
+            urls (iterable): Poster URLs, duplicates and "N/A" are skipped.
+
+        Returns:
+            dict: {"paths": {url: local file name}, "downloaded": int,
+            "unchanged": int, "failed": int}. URLs that failed without an older
+            local copy are missing in paths.
+        """
+        remote_urls = {url for url in urls if self.is_remote(url)}
+        report = {"paths": {}, "downloaded": 0, "unchanged": 0, "failed": 0}
+
+        with ThreadPoolExecutor(max_workers=self.DOWNLOAD_WORKERS) as executor:
+            for url, entry, status in executor.map(self.download, remote_urls):
+                if status in ("downloaded", "unchanged"):
+                    report[status] += 1
+                else:
+                    report["failed"] += 1
+                if entry is not None:
+                    self.manifest[url] = entry
+                    file_name = entry.get("thumbnail") or entry["file"]
+                    if os.path.exists(os.path.join(self.output_dir, file_name)):
+                        report["paths"][url] = file_name
+
+        IStorage.modify_json(self.manifest_path, self.manifest)
+        return report
@@ -0,0 +1,101 @@
+import bisect
+
+
+class RatingIndex:
+    def __init__(self, movies=()):
+        """
+        Constructor of class RatingIndex. Keeps the titles ordered by rating
+        (best first, movies without rating last, ties by title) in two parallel
+        sorted lists that are updated with bisect.
+
+        Finding a position takes O(log N), so single updates, top-k and rating
+        range queries don't need to sort the catalog again.
+
+        Parameters:
+            movies (iterable, optional): (title, rating) tuples to index.
+        """
+        # _keys holds (sort key, title), _scores only the sort key for range bisection
+        entries = sorted((self.sort_key(rating), title) for title, rating in movies)
+        self._keys = entries
+        self._scores = [score for score, _ in entries]
+        self._ratings = {title: self.rating_from_key(score) for score, title in entries}
+
+    @staticmethod
+    def sort_key(rating):
+        """
+        Return the ascending sort key of a rating, missing ratings sort last.
+        """
+        return float("inf") if rating is None else -rating
+
+    @staticmethod
+    def rating_from_key(score):
+        """
+        Return the rating of a sort key.
+        """
+        return None if score == float("inf") else -score
+
+    def __len__(self):
+        return len(self._keys)
+
+    def add(self, title, rating):
+        """
+        Add a movie or move it to the position of its new rating.
+        """
+        if title in self._ratings:
+            self.remove(title)
+        key = (self.sort_key(rating), title)
+        position = bisect.bisect_left(self._keys, key)
+        self._keys.insert(position, key)
+        self._scores.insert(position, key[0])
+        self._ratings[title] = rating
+
+    def remove(self, title):
+        """
+        Remove a movie from the index, unknown titles are ignored.
+        """
+        if title not in self._ratings:
+            return
+        key = (self.sort_key(self._ratings.pop(title)), title)
+        position = bisect.bisect_left(self._keys, key)
+        del self._keys[position]
+        del self._scores[position]
+
+    def bounds(self, min_rating=None, max_rating=None):
+        """
+        Return the (start, end) positions of the movies rated between
+        min_rating and max_rating (both inclusive). Without bounds every movie,
+        including the ones without rating, is in the range.
+        """
+        if min_rating is None and max_rating is None:
+            return 0, len(self._keys)
+
+        start = 0 if max_rating is None else bisect.bisect_left(self._scores, -max_rating)
+        if min_rating is None:
+            end = bisect.bisect_left(self._scores, float("inf"))
+        else:
+            end = bisect.bisect_right(self._scores, -min_rating)
+        return start, max(start, end)
+
+    def count(self, min_rating=None, max_rating=None):
+        """
+        Return the number of movies rated between min_rating and max_rating.
+        """
+        start, end = self.bounds(min_rating, max_rating)
+        return end - start
+
+    def range(self, offset=0, limit=None, min_rating=None, max_rating=None):
+        """
+        Return (title, rating) tuples, best rating first, of the movies rated
+        between min_rating and max_rating, skipping the first offset movies.
+        """
+        start, end = self.bounds(min_rating, max_rating)
+        start = min(start + offset, end)
+        if limit is not None:
+            end = min(start + limit, end)
+        return [(title, self.rating_from_key(score)) for score, title in self._keys[start:end]]
+
+    def top(self, k):
+        """
+        Return the (title, rating) tuples of the k best rated movies.
+        """
+        return self.range(limit=k)
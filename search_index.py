@@ -0,0 +1,167 @@
+from collections import Counter
+import heapq
+import itertools
+import math
+
+
+class SearchIndex:
+    # minimum share of query trigrams a fuzzy match has to contain
+    FUZZY_THRESHOLD = 0.4
+    # stop collecting fuzzy candidates from common trigrams beyond this number of titles
+    FUZZY_MAX_CANDIDATES = 5000
+    # queries up to this length are tried again with one edit if nothing matches
+    FUZZY_SHORT_QUERY = 8
+
+    def __init__(self, titles=()):
+        """
+        Constructor of class SearchIndex. A trigram index over the casefolded
+        movie titles, kept up to date with add() and remove().
+
+        Substring queries only look at the titles that contain every trigram of
+        the query, fuzzy queries rank titles by the share of common trigrams, so
+        small typos still find the movie.
+
+        Parameters:
+            titles (iterable, optional): Titles to index.
+        """
+        self._folded_titles = {}
+        self._postings = {}
+        for title in titles:
+            self.add(title)
+
+    @staticmethod
+    def normalize(text):
+        """
+        Return the casefolded text with every run of whitespace collapsed to one space.
+        """
+        return " ".join(text.casefold().split())
+
+    @staticmethod
+    def trigrams(text, padded=False):
+        """
+        Return the set of trigrams (3 character substrings) of the text. Padded
+        trigrams also mark the beginning and the end of every word, which gives
+        short words weight in fuzzy matching.
+        """
+        if padded:
+            text = f" {text} "
+        return {text[i:i + 3] for i in range(len(text) - 2)}
+
+    def __len__(self):
+        return len(self._folded_titles)
+
+    def add(self, title):
+        """
+        Add a title to the index.
+        """
+        if title in self._folded_titles:
+            return
+        folded_title = self.normalize(title)
+        self._folded_titles[title] = folded_title
+        for trigram in self.trigrams(folded_title, padded=True):
+            self._postings.setdefault(trigram, set()).add(title)
+
+    def remove(self, title):
+        """
+        Remove a title from the index, unknown titles are ignored.
+        """
+        folded_title = self._folded_titles.pop(title, None)
+        if folded_title is None:
+            return
+        for trigram in self.trigrams(folded_title, padded=True):
+            posting = self._postings.get(trigram)
+            if posting is not None:
+                posting.discard(title)
+                if not posting:
+                    del self._postings[trigram]
+
+    def search(self, query):
+        """
+        Return every title that contains the query (case-insensitive) in alphabetical order.
+        """
+        folded_query = self.normalize(query)
+        query_trigrams = self.trigrams(folded_query)
+
+        if not query_trigrams:
+            # queries shorter than a trigram have to look at every title
+            candidates = self._folded_titles
+        else:
+            postings = sorted((self._postings.get(trigram, set()) for trigram in query_trigrams),
+                              key=len)
+            candidates = set.intersection(*postings)
+
+        return sorted(title for title in candidates if folded_query in self._folded_titles[title])
+
+    def fuzzy_search(self, query, limit=10):
+        """
+        Return up to limit (title, score) tuples of the titles most similar to the
+        query, best match first. The score is the share of query trigrams found in
+        the title (between 0 and 1), ties are won by the shorter title.
+
+        No more than FUZZY_MAX_CANDIDATES titles are scored per query, so the time
+        doesn't grow with the catalog, but a match may be missed on very common
+        trigrams. A short query without any match is tried again with one edit
+        (see edits()), a typo in a short word can leave no trigram in common.
+        """
+        folded_query = self.normalize(query)
+        matches = self.fuzzy_matches(folded_query)
+        if not matches and len(folded_query) <= self.FUZZY_SHORT_QUERY:
+            for variant in self.edits(folded_query):
+                for ranking in self.fuzzy_matches(variant).values():
+                    matches[ranking[2]] = max(ranking, matches.get(ranking[2], ranking))
+        return [(title, score) for score, _, title in heapq.nlargest(limit, matches.values())]
+
+    @staticmethod
+    def edits(text):
+        """
+        Return the strings one transposition or deletion of a character away from
+        the text, "drak" -> "dark", "dakr", "rak", "dak", ... A deletion in the
+        query matches an inserted character in the title.
+        """
+        transpositions = {text[:i] + text[i + 1] + text[i] + text[i + 2:] for i in range(len(text) - 1)}
+        deletions = {text[:i] + text[i + 1:] for i in range(len(text))}
+        return (transpositions | deletions) - {text, ""}
+
+    def fuzzy_candidates(self, query_trigrams, min_shared):
+        """
+        Return the set of titles fuzzy_search() scores for the query trigrams,
+        at most FUZZY_MAX_CANDIDATES.
+        """
+        # A match shares at least min_shared trigrams with the query, so it has to
+        # contain one of the rarest (len - min_shared + 1) query trigrams. Only the
+        # postings of these trigrams are scanned, the rarest first, until there are
+        # FUZZY_MAX_CANDIDATES candidates. A posting that doesn't fit any more is
+        # cut (in no particular order), which keeps queries fast on large catalogs
+        # at the cost of exactness.
+        rare_trigrams = sorted(query_trigrams, key=lambda trigram: len(self._postings.get(trigram, ())))
+        candidates = set()
+        for trigram in rare_trigrams[:len(query_trigrams) - min_shared + 1]:
+            room = self.FUZZY_MAX_CANDIDATES - len(candidates)
+            if room <= 0:
+                break
+            posting = self._postings.get(trigram, ())
+            candidates.update(posting if len(posting) <= room else itertools.islice(posting, room))
+        return candidates
+
+    def fuzzy_matches(self, folded_query):
+        """
+        Return {title: (score, -length, title)} of every title sharing at least
+        FUZZY_THRESHOLD of the trigrams of the normalized query.
+        """
+        query_trigrams = self.trigrams(folded_query, padded=True)
+        if not query_trigrams:
+            return {}
+        min_shared = max(1, math.ceil(self.FUZZY_THRESHOLD * len(query_trigrams)))
+        candidates = self.fuzzy_candidates(query_trigrams, min_shared)
+
+        # count the shared trigrams from the postings instead of splitting every
+        # candidate into trigrams, the intersections and the counting run in C
+        shared_counts = Counter()
+        for trigram in query_trigrams:
+            posting = self._postings.get(trigram)
+            if posting:
+                shared_counts.update(posting & candidates)
+
+        folded_titles = self._folded_titles
+        return {title: (shared / len(query_trigrams), -len(folded_titles[title]), title)
+                for title, shared in shared_counts.items() if shared >= min_shared}
@@ -0,0 +1,264 @@
+import base64
+import hashlib
+import html
+import os
+import time
+import zlib
+
+from istorage import IStorage
+from search_index import SearchIndex
+
+
+class SiteGenerator:
+    # number of movies per generated page
+    PAGE_SIZE = 1000
+    # number of grid items joined before they are written to the file
+    CHUNK_SIZE = 200
+    # number of movies per shard of the client-side search index
+    SEARCH_SHARD_SIZE = 5000
+    # directory of the search index inside the output directory
+    SEARCH_DIR = "search"
+    # bits per distinct trigram in the trigram filter of a search index shard
+    SEARCH_FILTER_BITS = 8
+
+    def __init__(self, template_path, output_dir="_static", page_size=PAGE_SIZE,
+                 site_title="My Movie App", lazy_images=True, search_index=True):
+        """
+        Constructor of class SiteGenerator. Renders the movie grid into static
+        HTML pages.
+
+        The catalog is split into pages of page_size movies (index.html, page-2.html,
+        ...), every page is streamed into its file in chunks. A manifest in the
+        output directory stores a content hash per page, pages whose movies didn't
+        change since the last build are not rendered again.
+
+        Parameters:
+            template_path (str): The file path of the HTML template.
+            output_dir (str, optional): Directory the pages are written to.
+            page_size (int, optional): Number of movies per page.
+            site_title (str, optional): Title shown on every page.
+            lazy_images (bool, optional): Let the browser load posters only when
+                they are scrolled into view (loading="lazy").
+            search_index (bool, optional): Also write the search index the page
+                loads to search, filter and sort the whole catalog in the browser.
+                The page is rendered statically until it is searched.
+        """
+        self.template_path = template_path
+        self.output_dir = output_dir
+        self.page_size = page_size
+        self.site_title = site_title
+        self.lazy_images = lazy_images
+        self.search_index = search_index
+        self.poster_paths = {}
+        self.manifest_path = os.path.join(output_dir, "site_manifest.json")
+
+    @staticmethod
+    def page_file_name(page_number):
+        """
+        Return the file name of a page, the first page is index.html.
+        """
+        return "index.html" if page_number == 1 else f"page-{page_number}.html"
+
+    def poster_src(self, movie):
+        """
+        Return the image source of the movie poster, the local copy if there is one.
+        """
+        local_path = self.poster_paths.get(movie.poster)
+        return local_path if local_path is not None else movie.poster or ""
+
+    def movie_grid_item(self, movie_title, movie):
+        """
+        Return the HTML grid item of a single movie.
+        """
+        loading = ' loading="lazy"' if self.lazy_images else ''
+        return f'<li>' \
+               f'<div class="movie">' \
+               f'<img class="movie-poster" src="{html.escape(self.poster_src(movie))}"{loading} title=""/>' \
+               f'<div class="movie-title">{html.escape(movie_title)}</div>' \
+               f'<div class="movie-year">{html.escape(movie.year_text)}</div>' \
+               f'</div>' \
+               f'</li>'
+
+    def page_navigation(self, page_number, page_count):
+        """
+        Return the HTML links to the previous and next page.
+        """
+        if page_count <= 1:
+            return ""
+        links = []
+        if page_number > 1:
+            links.append(f'<a href="{self.page_file_name(page_number - 1)}">&laquo; Previous</a>')
+        # without the page count, so adding or deleting movies at the end doesn't
+        # change the navigation of every page
+        links.append(f'<span>Page {page_number}</span>')
+        if page_number < page_count:
+            links.append(f'<a href="{self.page_file_name(page_number + 1)}">Next &raquo;</a>')
+        return f'<div class="page-nav">{" ".join(links)}</div>'
+
+    def load_manifest(self):
+        """
+        Return the page hashes of the last build, an empty dict if there was none.
+        """
+        try:
+            return IStorage.parse_json(self.manifest_path)
+        except (FileNotFoundError, ValueError):
+            return {}
+
+    def write_page(self, file_path, head, movies, tail):
+        """
+        Stream a single page into its file and return the number of bytes written.
+        """
+        bytes_written = 0
+        with IStorage.atomic_open(file_path, "wb") as f:
+            bytes_written += f.write(head.encode())
+            for start in range(0, len(movies), self.CHUNK_SIZE):
+                chunk = "".join(self.movie_grid_item(movie_title, movie)
+                                for movie_title, movie in movies[start:start + self.CHUNK_SIZE])
+                bytes_written += f.write(chunk.encode())
+            bytes_written += f.write(tail.encode())
+        return bytes_written
+
+    def search_record(self, movie_title, movie):
+        """
+        Return the search index row of a movie:
+            [title, normalized title, rating, year, poster, year text]
+        The year is used for sorting and filtering, the year text is shown.
+        """
+        return [movie_title, SearchIndex.normalize(movie_title), movie.rating, movie.year,
+                self.poster_src(movie), movie.year_text]
+
+    @classmethod
+    def trigram_filter(cls, rows):
+        """
+        Return the trigram filter of a search index shard, base64 encoded: a
+        bitmap with the bit crc32(trigram) % size set for every trigram of the
+        words of the normalized titles. The size is a power of two,
+        SEARCH_FILTER_BITS per trigram. The page only fetches the shards whose
+        filter has the bits of every trigram of the query words set, the others
+        can't contain a match.
+        """
+        # query words contain no space, neither do the trigrams looked up
+        words = set(" ".join(row[1] for row in rows).split(" "))
+        trigrams = {word[i:i + 3] for word in words for i in range(len(word) - 2)}
+        size = 64
+        while size < len(trigrams) * cls.SEARCH_FILTER_BITS:
+            size *= 2
+        bitmap = bytearray(size // 8)
+        for trigram in trigrams:
+            bit = zlib.crc32(trigram.encode()) & (size - 1)
+            bitmap[bit >> 3] |= 1 << (bit & 7)
+        return base64.b64encode(bitmap).decode()
+
+    def load_search_filters(self):
+        """
+        Return {shard file name: trigram filter} of the last build.
+        """
+        try:
+            index = IStorage.parse_json(os.path.join(self.output_dir, self.SEARCH_DIR, "index.json"))
+            return {shard.split("?")[0]: trigram_filter
+                    for shard, trigram_filter in zip(index["shards"], index["filters"])}
+        except (FileNotFoundError, ValueError, KeyError, TypeError):
+            return {}
+
+    def write_search_index(self, movie_items, old_manifest, manifest, report):
+        """
+        Write the movies as shards of SEARCH_SHARD_SIZE search index rows
+        (search/shard-1.json, ...) and the list of shards with their trigram
+        filters (search/index.json).
+
+        Shards whose rows didn't change since the last build are not written
+        again. The list of shards names every shard with its hash, so browsers
+        can cache the shards until they change.
+        """
+        os.makedirs(os.path.join(self.output_dir, self.SEARCH_DIR), exist_ok=True)
+        old_filters = self.load_search_filters()
+        shards = []
+        filters = []
+        for start in range(0, len(movie_items), self.SEARCH_SHARD_SIZE):
+            file_name = f"{self.SEARCH_DIR}/shard-{start // self.SEARCH_SHARD_SIZE + 1}.json"
+            rows = [self.search_record(movie_title, movie)
+                    for movie_title, movie in movie_items[start:start + self.SEARCH_SHARD_SIZE]]
+            data = IStorage.serializer.dumps(rows)
+            manifest[file_name] = hashlib.sha256(data).hexdigest()
+            shards.append(f"{file_name}?v={manifest[file_name][:16]}")
+
+            file_path = os.path.join(self.output_dir, file_name)
+            if old_manifest.get(file_name) == manifest[file_name] and os.path.exists(file_path) \
+                    and file_name in old_filters:
+                filters.append(old_filters[file_name])
+                report["search_shards_skipped"] += 1
+                continue
+            filters.append(self.trigram_filter(rows))
+            with IStorage.atomic_open(file_path, "wb") as f:
+                report["bytes_written"] += f.write(data)
+            report["search_shards_written"] += 1
+
+        index = {"count": len(movie_items), "fields": ["title", "normalized", "rating", "year", "poster", "year_text"],
+                 "shard_size": self.SEARCH_SHARD_SIZE, "shards": shards, "filters": filters}
+        IStorage.modify_json(os.path.join(self.output_dir, self.SEARCH_DIR, "index.json"), index)
+
+    def build(self, movies, poster_paths=None):
+        """
+        Render the pages of the given movies and the search index and return a
+        build report:
+            {"pages": int, "written": int, "skipped": int, "removed": int,
+             "search_shards_written": int, "search_shards_skipped": int,
+             "bytes_written": int, "seconds": float}
+
+        Parameters:
+            movies (dict): The movie dictionary, title -> Movie.
+            poster_paths (dict, optional): Poster URL -> local image path
+                (relative to the output directory) of mirrored posters.
+        """
+        start_time = time.perf_counter()
+        self.poster_paths = poster_paths or {}
+        with open(self.template_path, "r") as f:
+            template = f.read()
+        template = template.replace("__TEMPLATE_TITLE__", html.escape(self.site_title))
+        template_head, _, template_tail = template.partition("__TEMPLATE_MOVIE_GRID__")
+        template_hash = hashlib.sha256(template.encode()).hexdigest()
+
+        movie_items = list(movies.items())
+        page_count = max(1, -(-len(movie_items) // self.page_size))
+        old_manifest = self.load_manifest()
+        manifest = {}
+        report = {"pages": page_count, "written": 0, "skipped": 0, "removed": 0,
+                  "search_shards_written": 0, "search_shards_skipped": 0, "bytes_written": 0}
+
+        for page_number in range(1, page_count + 1):
+            page_movies = movie_items[(page_number - 1) * self.page_size:page_number * self.page_size]
+            navigation = self.page_navigation(page_number, page_count)
+            file_name = self.page_file_name(page_number)
+            file_path = os.path.join(self.output_dir, file_name)
+
+            # the hash covers everything the page is rendered from
+            page_hash = hashlib.sha256(template_hash.encode())
+            page_hash.update(f"{navigation}\0{self.lazy_images}\0".encode())
+            for movie_title, movie in page_movies:
+                page_hash.update(
+                    f"{movie_title}\0{movie.year_text}\0{self.poster_src(movie)}\0".encode())
+            manifest[file_name] = page_hash.hexdigest()
+
+            if old_manifest.get(file_name) == manifest[file_name] and os.path.exists(file_path):
+                report["skipped"] += 1
+                continue
+
+            tail = template_tail.replace("__TEMPLATE_PAGE_NAV__", navigation)
+            report["bytes_written"] += self.write_page(file_path, template_head, page_movies, tail)
+            report["written"] += 1
+
+        if self.search_index:
+            self.write_search_index(movie_items, old_manifest, manifest, report)
+
+        # delete pages and search index shards of a former, larger catalog
+        for file_name in old_manifest:
+            if file_name not in manifest:
+                try:
+                    os.remove(os.path.join(self.output_dir, file_name))
+                    report["removed"] += 1
+                except FileNotFoundError:
+                    pass
+
+        IStorage.modify_json(self.manifest_path, manifest)
+        report["seconds"] = time.perf_counter() - start_time
+        return report
@@ -1,157 +1,310 @@
+from columnar_snapshot import ColumnarSnapshot
 from istorage import IStorage
-import requests
+from movie import Movie
 import csv
-import pandas as pd
+import hashlib
+import io
+import os
 
 
 class StorageCsv(IStorage):
-    def __init__(self, file_path):
+    # bytes before the read position compared before only the appended rows are read
+    CHECK_SIZE = 4096
+
+    def __init__(self, file_path, columnar=False):
         """
         Constructor of class StorageCsv. Initializes the instance variables.
 
         Parameters:
             file_path (str, optional): The file path of the CSV containing movie data.
+            columnar (bool, optional): Keep a binary columnar snapshot of the CSV
+                file next to it (file_path + ".cols") and load from it while it
+                matches the file, see ColumnarSnapshot.
         """
-        self.API_KEY = self.parse_json("data/api_key.json")["api_key"]
-        self.MOVIE_FETCH_URL = f"http://www.omdbapi.com/?apikey={self.API_KEY}&"
         self.file_path = file_path
-        self.movie_data_csv = self.return_csv_lines()
-        self.movie_dict = self.list_movies()
+        self.columnar = columnar
+        self.load()
 
-    def modify_csv(self, data):
+    def load(self):
         """
-        Modifies the CSV file with new data.
+        Read the whole CSV file into movie_dict.
 
-        Parameters:
-            data (list): List of data to be appended to the CSV file.
+        With columnar, a columnar snapshot of the same file and generation is
+        mapped instead, and only the rows appended after it was made are read.
+        Otherwise a new one is saved.
         """
-        with open(self.file_path, 'a', newline='') as csvfile:
-            writer = csv.writer(csvfile)
-            writer.writerows(data)
+        self.generation = self.read_lock_state()[1]
+        self._signature = self.file_signature(self.file_path)
+        columns = self.open_columns() if self.columnar else None
+        if columns is not None:
+            self.movie_dict = columns
+            self._read_offset = columns.source[4]
+            self._covered_tail = self.read_covered_tail()
+            self.read_tail()
+            return
 
-    def return_csv_lines(self):
+        self._read_offset = self._signature[1]
+        self._covered_tail = self.read_covered_tail()
+        self.movie_dict = self.load_csv()
+        if self.columnar:
+            self.save_columns((*self._signature, self.generation, self._read_offset,
+                               self.checksum(self._covered_tail)))
+
+    @staticmethod
+    def checksum(data):
         """
-        Returns an ordered list of every cell in the CSV.
+        Return a 64-bit checksum of data as signed integer.
         """
-        with open(self.file_path, "r") as f:
-            data = f.read()
-            data_cells = data.split("\n")
-            return data_cells
+        return int.from_bytes(hashlib.blake2b(data, digest_size=8).digest(), "little", signed=True)
 
-    def list_movies(self):
+    def open_columns(self):
         """
-        Returns a dictionary of dictionaries that
-        contains the movies information in the database.
+        Return the columnar snapshot if it was made from the current file and
+        generation, None otherwise. The file has to be unchanged, or it has to
+        have grown with the last CHECK_SIZE bytes before the end of the snapshot
+        unchanged, then the rows appended since are read on top of it like
+        refresh() does. A file edited in place makes the snapshot stale.
+        """
+        columns = ColumnarSnapshot.open(self.columns_path)
+        if columns is None or self._signature is None:
+            return None
+        inode, size, mtime_ns, generation, read_offset, checksum = columns.source
+        if inode != self._signature[0] or generation != self.generation:
+            return None
+        if (size, mtime_ns) == self._signature[1:]:
+            return columns
+        if self._signature[1] > size and self.checksum(self.read_covered_tail(read_offset)) == checksum:
+            return columns
+        return None
 
-        The function loads the information from the CSV file
-        and returns the data.
+    def refresh(self):
+        """
+        Pick up the changes of other processes. Rows they appended are read from
+        the last read position on, only a replaced file (a deleted or updated
+        movie, which starts a new generation) makes the storage load everything again.
 
-        For example, the function may return:
-        {
-          "Titanic": {
-            "rating": 9,
-            "year": 1999
-          },
-          "..." {
-            ...
-          },
-        }
+        Returns:
+            bool: True if the database changed.
+
+        The file is edited in place if it didn't grow or the bytes before the
+        read position changed, it is loaded again as well then.
         """
-        movie_dict = {}
-        for movie_data in self.movie_data_csv[1:]:
-            try:
-                title, rating, year, poster = movie_data.split(",")
+        generation = self.read_lock_state()[1]
+        signature = self.file_signature(self.file_path)
+        if generation == self.generation and signature == self._signature:
+            return False
+        if (generation == self.generation and signature is not None
+                and signature[0] == self._signature[0] and signature[1] > self._signature[1]):
+            changed_titles = self.read_tail()
+            if changed_titles is not None:
+                self._signature = signature
+                self.movies_changed(changed_titles)
+                return bool(changed_titles)
+        self.load()
+        self.reset_indexes()
+        return True
 
-                # Add the movie data to the movie_dict using the movie_title as key
-                movie_dict[title] = {
-                    "rating": rating,
-                    "year": year,
-                    "poster": poster
-                }
-            # continue loop if rating is N/A
-            except ValueError:
-                pass
-        return movie_dict
+    def read_covered_tail(self, offset=None):
+        """
+        Return the last CHECK_SIZE bytes of the file before offset, by default
+        before the read position.
+        """
+        if offset is None:
+            offset = self._read_offset
+        start = max(0, offset - self.CHECK_SIZE)
+        with open(self.file_path, "rb") as f:
+            f.seek(start)
+            return f.read(offset - start)
 
-    def add_movie(self, movie_title, movie_data, fetch_successful):
+    def read_tail(self):
         """
-        Add a movie to the storage system by fetching its data from an external API
-        and saving it to the CSV file.
+        Read the complete rows appended after the last read position into movie_dict.
+
+        Returns:
+            list: The titles of the rows read, None if the bytes before the read
+            position changed, which means the file was edited in place.
         """
-        try:
-            if not fetch_successful:
-                raise RuntimeError
+        start = max(0, self._read_offset - self.CHECK_SIZE)
+        with open(self.file_path, "rb") as f:
+            f.seek(start)
+            data = f.read()
+        covered = self._read_offset - start
+        if data[:covered] != self._covered_tail:
+            return None
+        # a row that is still being written is read on the next refresh
+        end = data.rfind(b"\n") + 1
+        tail = data[covered:end] if end > covered else b""
+        self._read_offset += len(tail)
+        self._covered_tail = data[max(0, covered + len(tail) - self.CHECK_SIZE):covered + len(tail)]
+        return self.parse_rows(csv.reader(io.StringIO(tail.decode(), newline="")))
 
-            new_movie_title = str(movie_data["Title"])
-            new_movie_rating = str(movie_data["imdbRating"])
-            new_movie_year = str(movie_data["Year"])
-            new_movie_poster = movie_data["Poster"]
+    @staticmethod
+    def movie_row(movie_title, movie):
+        """
+        Return the CSV row of a movie: [title, rating, year, poster].
+        """
+        return [movie_title, movie.rating_text, movie.year_text, movie.poster]
 
-            # check if movie is in database --> flag = True
-            movie_in_database = False
-            if new_movie_title in self.movie_dict:
-                movie_in_database = True
+    def modify_csv(self, data):
+        """
+        Modifies the CSV file with new data. Callers hold write_lock().
 
-            # add movie to database if it doesn't exist and response is true
-            if movie_in_database:
-                print(f"{new_movie_title} is already on the list")
-            else:
-                new_movie = [new_movie_title, new_movie_rating, new_movie_year, new_movie_poster]
+        Parameters:
+            data (list): List of data to be appended to the CSV file.
+        """
+        rows = io.StringIO(newline="")
+        csv.writer(rows).writerows(data)
+        lines = rows.getvalue().encode()
+        with open(self.file_path, "a+b") as csvfile:
+            if csvfile.tell() > 0:
+                csvfile.seek(-1, os.SEEK_END)
+                if csvfile.read(1) != b"\n":
+                    # start on a new line after a last row without line break
+                    lines = b"\n" + lines
+            csvfile.write(lines)
 
-                self.modify_csv([new_movie])
+    def rewrite_csv(self, title, new_row):
+        """
+        Rewrite the CSV file in a single streaming pass, replacing or dropping the
+        row of the given movie. The result is written to a temporary file that
+        atomically replaces the original, the file is never loaded as a whole.
+        Callers hold write_lock().
 
-                # Update in-memory storage
-                self.movie_data_csv = self.return_csv_lines()
-                self.movie_dict = self.list_movies()
-                print(f"{new_movie_title} was successfully added to the list")
+        Parameters:
+            title (str): Title of the movie whose row should be changed.
+            new_row (list or None): Replacement row, None deletes the row.
+        """
+        with open(self.file_path, "r", newline="") as src, \
+                self.atomic_open(self.file_path, "w", newline="") as dst:
+            reader = csv.reader(src)
+            writer = csv.writer(dst)
+            writer.writerow(next(reader))  # header
+            for row in reader:
+                if row and row[0] == title:
+                    if new_row is not None:
+                        writer.writerow(new_row)
+                else:
+                    writer.writerow(row)
 
-        except RuntimeError:
-            print("We couldn't find the movie you were searching for")
+        # the new file was written from the rows just read, refresh() must not load it again
+        self.file_replaced()
+        self._signature = self.file_signature(self.file_path)
+        self._read_offset = self._signature[1]
+        self._covered_tail = self.read_covered_tail()
 
-        except requests.exceptions.ConnectionError as e:
-            print(f"There was a connection Error. Please check your internet connection\n"
-                  f"You can still use other menu commands while having no internet connection\n"
-                  f"Further error details: {e} \n")
+    def parse_rows(self, rows):
+        """
+        Decode CSV rows straight into Movie records of movie_dict.
 
-    def delete_movie(self):
+        Returns:
+            list: The titles of the rows.
         """
-        Delete a movie from the storage system based on user input (movie_name).
+        movie_titles = []
+        for row in rows:
+            # skip empty or malformed rows
+            if len(row) != 4:
+                continue
+            title, rating, year, poster = row
+            self.movie_dict[title] = Movie.from_strings(rating, year, poster)
+            movie_titles.append(title)
+        return movie_titles
+
+    def load_csv(self):
         """
-        movie_name = input("Enter movie name to delete: ").title()
+        Read the CSV in a single streaming pass with csv.reader, so quoted cells
+        (e.g. titles containing a comma) are handled correctly. Every row is
+        decoded straight into its Movie record.
 
-        # Check if movie is in database
-        if movie_name in self.movie_dict:
-            # Use pandas to delete movie from CSV file
-            df = pd.read_csv(self.file_path)
-            df = df[df['title'] != movie_name]
-            df.to_csv(self.file_path, index=False)
+        Returns:
+            dict: The movie dictionary, title -> Movie.
+        """
+        self.movie_dict = {}
+        with open(self.file_path, "r", newline="") as f:
+            reader = csv.reader(f)
+            next(reader, None)  # header
+            self.parse_rows(reader)
+        return self.movie_dict
 
-            # Update in-memory storage
-            self.movie_data_csv = self.return_csv_lines()
-            self.movie_dict = self.list_movies()
+    def list_movies(self):
+        """
+        Returns a dictionary that maps the title of every
+        movie in the database to its Movie record.
 
-            print(f"Movie '{movie_name}' deleted successfully.")
-        else:
-            print(f"Movie '{movie_name}' not found in the CSV file.")
+        The data is loaded from the CSV file when the
+        storage is created and kept up to date on every change.
 
-    def update_movie(self):
+        For example, the function may return:
+        {
+          "Titanic": Movie(rating=7.9, year=1997, poster="..."),
+          "..." Movie(...)
+        }
         """
+        return self.movie_dict
 
-        Update the rating of a movie in the storage system
-        based on user input (movie name and new rating).
+    def add_movies(self, movies_data):
         """
-        movie_name = input("Enter a movie name to update: ").title()
-        movie_in_database = False  # flag
+        Add several fetched movies at once. All new rows are appended to the
+        CSV file with a single write.
 
-        # Check if movie is in database
-        if movie_name in self.movie_dict:
-            movie_in_database = True
+        Parameters:
+            movies_data (list): List of successful OMDb responses.
+
+        Returns:
+            list: One (title, added, message) tuple per movie.
+        """
+        with self.write_lock():
+            report = []
+            new_movies = []
+            batch_titles = set()
+            for movie_data in movies_data:
+                new_movie_title = str(movie_data["Title"])
+                if new_movie_title in self.movie_dict or new_movie_title in batch_titles:
+                    report.append((new_movie_title, False, "is already on the list"))
+                    continue
 
-        if movie_in_database:
-            new_movie_rating = float(input(f"Enter a new rating for {movie_name}: "))
+                new_movie = Movie.from_omdb(movie_data)
+                new_movies.append(self.movie_row(new_movie_title, new_movie))
+                batch_titles.add(new_movie_title)
+                report.append((new_movie_title, True, "was successfully added to the list"))
 
-            self.movie_dict[movie_name]["rating"] = new_movie_rating
-            self.modify_json("data/movies_data.json", self.movie_dict)
-            print(f"The rating of {movie_name} was successfully updated to {new_movie_rating}")
-        else:
-            print("This movie doesn't exist in the data base, please try again")
+            if new_movies:
+                self.modify_csv(new_movies)
+                # reads the new rows (and rows other processes appended) into movie_dict
+                self.refresh()
+        return report
+
+    def delete_movie(self, movie_title):
+        """
+        Delete the movie with the given title from the CSV file.
+
+        Returns:
+            bool: True if the movie was deleted, False if it is not in the database.
+        """
+        with self.write_lock():
+            if movie_title not in self.movie_dict:
+                return False
+            self.rewrite_csv(movie_title, None)
+
+            # Update in-memory storage
+            del self.movie_dict[movie_title]
+            self.movies_changed([movie_title])
+        return True
+
+    def update_movie(self, movie_title, new_rating):
+        """
+        Update the rating of the movie with the given title.
+
+        Returns:
+            bool: True if the movie was updated, False if it is not in the database.
+        """
+        with self.write_lock():
+            if movie_title not in self.movie_dict:
+                return False
+            movie = self.movie_dict[movie_title]
+            updated_movie = movie.with_rating(new_rating)
+            self.rewrite_csv(movie_title, self.movie_row(movie_title, updated_movie))
+
+            # Update in-memory storage
+            self.movie_dict[movie_title] = updated_movie
+            self.movies_changed([movie_title])
+        return True
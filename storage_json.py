@@ -1,124 +1,266 @@
-import requests
-import json
+import os
 
+from columnar_snapshot import ColumnarSnapshot
 from istorage import IStorage
+from movie import Movie
 
 
 class StorageJson(IStorage):
-    def __init__(self, file_path):
+    # compact the journal into the snapshot once it grows beyond this size (bytes)
+    JOURNAL_COMPACT_THRESHOLD = 1024 * 1024
+
+    def __init__(self, file_path, compact_threshold=JOURNAL_COMPACT_THRESHOLD, columnar=False):
         """
         Constructor of class StorageJson. Initializes the instance variables.
 
+        The movie database consists of two files: the JSON snapshot at file_path
+        and an append-only journal next to it (file_path + ".journal"). Every
+        mutation is appended to the journal as one JSON line instead of rewriting
+        the whole snapshot. On load the journal is replayed on top of the snapshot.
+
         Parameters:
             file_path (str): The file path of the movie database JSON.
+            compact_threshold (int, optional): Journal size in bytes after which
+                the journal is folded into the snapshot.
+            columnar (bool, optional): Keep a binary columnar snapshot of the
+                snapshot and the journal next to them (file_path + ".cols") and
+                load from it while it matches them, see ColumnarSnapshot.
         """
-        self.API_KEY = self.parse_json("data/api_key.json")["api_key"]
-        self.MOVIE_DATA_URL = f"http://www.omdbapi.com/?apikey={self.API_KEY}&"
         self.file_path = file_path
-        self.movie_dict = self.parse_json(self.file_path)
+        self.journal_path = f"{file_path}.journal"
+        self.compact_threshold = compact_threshold
+        self.columnar = columnar
+        self.load()
+
+        if self.journal_size() > self.compact_threshold:
+            self.compact()
+
+    def load(self):
+        """
+        Read the snapshot and replay the whole journal on top of it.
+
+        With columnar, a columnar snapshot made from the same snapshot and
+        generation is mapped instead, and only the journal entries after the
+        ones it contains are replayed. Otherwise a new one is saved.
+        """
+        self.generation = self.read_lock_state()[1]
+        self._snapshot_signature = self.file_signature(self.file_path)
+        self._journal_offset = 0
+        columns = self.open_columns() if self.columnar else None
+        if columns is not None:
+            self.movie_dict = columns
+            self._journal_offset = columns.source[4]
+            self.replay_journal()
+            return
+
+        self.movie_dict = {movie_title: Movie.from_dict(movie_data)
+                           for movie_title, movie_data in self.parse_json(self.file_path).items()}
+        self.replay_journal()
+        if self.columnar:
+            self.save_columns((*self._snapshot_signature, self.generation, self._journal_offset, 0))
+
+    def open_columns(self):
+        """
+        Return the columnar snapshot if it was made from the current snapshot and
+        generation, None otherwise. It contains the journal up to a position, the
+        journal only grows until the next compaction replaces the snapshot.
+        """
+        columns = ColumnarSnapshot.open(self.columns_path)
+        if (columns is None or self._snapshot_signature is None
+                or columns.source[:4] != (*self._snapshot_signature, self.generation)
+                or columns.source[4] > self.journal_size()):
+            return None
+        return columns
+
+    def refresh(self):
+        """
+        Pick up the changes of other processes. Entries they appended to the
+        journal are replayed from the last read position, only a compaction (a new
+        snapshot and generation) makes the storage load everything again.
+
+        Returns:
+            bool: True if the database changed.
+        """
+        journal_size = self.journal_size()
+        if (self.read_lock_state()[1] != self.generation
+                or self.file_signature(self.file_path) != self._snapshot_signature
+                or journal_size < self._journal_offset):
+            self.load()
+            self.reset_indexes()
+            return True
+        if journal_size > self._journal_offset:
+            changed_titles = self.replay_journal()
+            self.movies_changed(changed_titles)
+            return bool(changed_titles)
+        return False
+
+    def journal_size(self):
+        """
+        Return the size of the journal file in bytes (0 if there is none).
+        """
+        try:
+            return os.path.getsize(self.journal_path)
+        except FileNotFoundError:
+            return 0
+
+    def apply_journal_entry(self, entry):
+        """
+        Apply a single journal entry to the in-memory movie_dict.
+
+        Parameters:
+            entry (dict): {"op": "put", "title": ..., "movie": {...}}
+                or {"op": "delete", "title": ...}
+        """
+        if entry["op"] == "put":
+            self.movie_dict[entry["title"]] = Movie.from_dict(entry["movie"])
+        elif entry["op"] == "delete":
+            self.movie_dict.pop(entry["title"], None)
+
+    def replay_journal(self):
+        """
+        Replay every complete journal entry after the already replayed part
+        on top of movie_dict.
+
+        A torn last line (the process died or is still appending) is not
+        applied, it is read again on the next refresh. A complete line that
+        can't be decoded (the rest of a line torn by a crash, which the next
+        append ended) is skipped.
+
+        Returns:
+            list: The titles of the replayed entries.
+        """
+        changed_titles = []
+        try:
+            with open(self.journal_path, "rb") as f:
+                f.seek(self._journal_offset)
+                for line in f:
+                    if not line.endswith(b"\n"):
+                        break
+                    self._journal_offset += len(line)
+                    try:
+                        entry = IStorage.serializer.loads(line)
+                    except ValueError:
+                        continue
+                    self.apply_journal_entry(entry)
+                    changed_titles.append(entry["title"])
+        except FileNotFoundError:
+            pass
+        return changed_titles
+
+    def append_journal(self, entries):
+        """
+        Append entries to the journal with a single write and apply them to
+        movie_dict by replaying the journal, which also picks up entries other
+        processes appended in the meantime. Compacts the journal when it grew
+        beyond the threshold.
+
+        Parameters:
+            entries (list): List of journal entries, see apply_journal_entry().
+        """
+        lines = b"".join(IStorage.serializer.dumps(entry) + b"\n" for entry in entries)
+        with open(self.journal_path, "a+b") as f:
+            if f.tell() > 0:
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) != b"\n":
+                    # start on a new line after a line torn by a crash or a failed write
+                    lines = b"\n" + lines
+            f.write(lines)
+            f.flush()
+            os.fsync(f.fileno())
+        self.refresh()
+
+        if self.journal_size() > self.compact_threshold:
+            self.compact()
+
+    def compact(self):
+        """
+        Write the current movie_dict as new snapshot and empty the journal.
+
+        The snapshot is replaced atomically first. If the process dies before the
+        journal is emptied, replaying it again on the next load is harmless because
+        every entry overwrites or removes a whole movie. Other processes notice the
+        compaction by the generation of the database, even if the journal grew past
+        their read position again before their next refresh.
+        """
+        with self.write_lock():
+            snapshot = {movie_title: movie.to_dict() for movie_title, movie in self.movie_dict.items()}
+            self.modify_json(self.file_path, snapshot)
+            with open(self.journal_path, "w"):
+                pass
+            self.file_replaced()
+            self._snapshot_signature = self.file_signature(self.file_path)
+            self._journal_offset = 0
 
     def list_movies(self):
         """
-        Returns a dictionary of dictionaries that
-        contains the movies information in the database.
+        Returns a dictionary that maps the title of every
+        movie in the database to its Movie record.
 
-        The function loads the information from the JSON
-        file and returns the data.
+        The data is loaded from the JSON snapshot and the
+        journal when the storage is created.
 
         For example, the function may return:
             {
-                "Title": {
-                    "rating": "...",
-                    "year": "...",
-                    "poster": "..."
-                },
-                "Title": {
-                    "rating": "...",
-                    "year": "...",
-                    "poster": "..."
-                },
-                "Title": {
-                    "rating": "...",
-                    "year": "...",
-                    "poster": "..."
-                }
+                "Titanic": Movie(rating=7.9, year=1997, poster="..."),
+                "Run Rabbit Run": Movie(rating=None, year=2023, poster="...")
             }
         """
-        return self.parse_json(self.file_path)
+        return self.movie_dict
 
-    def add_movie(self, movie_title, movie_data, fetch_successful):
+    def add_movies(self, movies_data):
         """
-        Add a new movie with its name, rating, and other details to the database.
-        Modify the JSON by adding the new movie to the database.
+        Add several fetched movies at once. All new movies are written to the
+        journal with a single append.
+
+        Parameters:
+            movies_data (list): List of successful OMDb responses.
+
+        Returns:
+            list: One (title, added, message) tuple per movie.
         """
-        # fetch data and parse it from database
-        try:
-            if not fetch_successful:
-                raise RuntimeError
-
-            new_movie_title = movie_data["Title"]
-            new_movie_rating = movie_data["imdbRating"]
-            new_movie_year = movie_data["Year"]
-            new_movie_poster = movie_data["Poster"]
-
-            # check if movie is in database --> flag = True
-            movie_in_database = False
-            if new_movie_title in self.movie_dict:
-                movie_in_database = True
-
-            # add movie to database if it doesn't exist and response is true
-            if movie_in_database:
-                print(f"{new_movie_title} is already on the list")
-            else:
-                new_movie = {
-                    "rating": new_movie_rating,
-                    "year": new_movie_year,
-                    "poster": new_movie_poster
-                }
-                self.movie_dict[new_movie_title] = new_movie
-                self.modify_json(self.file_path, self.movie_dict)
-                print(f"{new_movie_title} was successfully added to the list")
-
-        except RuntimeError:
-            print("We couldn't find the movie you were searching for")
-
-        except requests.exceptions.ConnectionError as e:
-            print(f"There was a connection Error. Please check your internet connection \n"
-                  f"You can still use other menu commands while having no internet connection \n"
-                  f"Further error details: {e} \n")
-
-    def delete_movie(self):
-        """
-        Get user input for the movie name and delete the movie if it exists in the database.
-        """
-        movie_name = input("Enter movie name to delete: ").title()
-
-        # check if movie is in database and delete it
-        if movie_name in self.movie_dict:
-            del self.movie_dict[movie_name]
-            self.modify_json(self.file_path, self.movie_dict)
-            print(f"{movie_name} was successfully deleted!")
-
-        else:
-            print(f"{movie_name} is not on the list\n")
-
-    def update_movie(self):
-        """
-        Get user input for the movie name and the new movie rating.
-        Find the movie in the database and update its rating.
-        """
-        movie_name = input("Enter a movie name to update: ").title()
-        movie_in_database = False  # flag
-
-        # Check if movie is in database
-        if movie_name in self.movie_dict:
-            movie_in_database = True
-
-        if movie_in_database:
-            new_movie_rating = float(input(f"Enter a new rating for {movie_name}: "))
-
-            self.movie_dict[movie_name]["rating"] = new_movie_rating
-            self.modify_json("data/movies_data.json", self.movie_dict)
-            print(f"The rating of {movie_name} was successfully updated to {new_movie_rating}")
-        else:
-            print("This movie doesn't exist in the data base, please try again")
+        with self.write_lock():
+            report = []
+            entries = []
+            batch_titles = set()
+            for movie_data in movies_data:
+                new_movie_title = movie_data["Title"]
+                if new_movie_title in self.movie_dict or new_movie_title in batch_titles:
+                    report.append((new_movie_title, False, "is already on the list"))
+                    continue
+
+                new_movie = Movie.from_omdb(movie_data)
+                entries.append({"op": "put", "title": new_movie_title, "movie": new_movie.to_dict()})
+                batch_titles.add(new_movie_title)
+                report.append((new_movie_title, True, "was successfully added to the list"))
+
+            if entries:
+                self.append_journal(entries)
+        return report
+
+    def delete_movie(self, movie_title):
+        """
+        Delete the movie with the given title from the database.
+
+        Returns:
+            bool: True if the movie was deleted, False if it is not in the database.
+        """
+        with self.write_lock():
+            if movie_title not in self.movie_dict:
+                return False
+            self.append_journal([{"op": "delete", "title": movie_title}])
+        return True
+
+    def update_movie(self, movie_title, new_rating):
+        """
+        Update the rating of the movie with the given title.
+
+        Returns:
+            bool: True if the movie was updated, False if it is not in the database.
+        """
+        with self.write_lock():
+            if movie_title not in self.movie_dict:
+                return False
+            movie = self.movie_dict[movie_title]
+            updated_movie = movie.with_rating(new_rating)
+            self.append_journal([{"op": "put", "title": movie_title, "movie": updated_movie.to_dict()}])
+        return True
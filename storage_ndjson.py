@@ -0,0 +1,391 @@
+from collections.abc import Mapping
+import mmap
+import os
+
+from istorage import IStorage
+from movie import Movie
+
+
+class NdjsonCatalog(Mapping):
+    def __init__(self, file_path, generation=0):
+        """
+        Constructor of class NdjsonCatalog. A title -> Movie mapping over a
+        line-delimited JSON file with one movie per line:
+            {"title": "...", "rating": "...", "year": "...", "poster": "..."}
+
+        The file is memory-mapped and only the offset of the latest line of every
+        title is kept in memory, a movie is decoded when it is looked up. Changes
+        are appended as new lines, deletions as {"title": "...", "deleted": true}.
+
+        The offset index is saved next to the file (file_path + ".idx"). On load
+        and on refresh() only the lines appended since the last read are scanned.
+
+        Parameters:
+            file_path (str): The file path of the NDJSON catalog.
+            generation (int, optional): The generation of the catalog file, see
+                IStorage.write_lock(). A saved index of another generation is ignored.
+        """
+        self.file_path = file_path
+        self.generation = generation
+        self.index_path = f"{file_path}.idx"
+        self._offsets = {}
+        self._mmap = None
+        self._size = 0
+        self._inode = None
+        # end of the last indexed line, a line still being written comes after it
+        self._end = 0
+        # bytes of lines that were replaced or deleted by later lines
+        self.garbage = 0
+        self.load_index()
+
+    def __getitem__(self, movie_title):
+        offset = self._offsets[movie_title]
+        end = self._mmap.find(b"\n", offset)
+        return Movie.from_dict(IStorage.serializer.loads(self._mmap[offset:end]))
+
+    def __contains__(self, movie_title):
+        return movie_title in self._offsets
+
+    def __iter__(self):
+        return iter(self._offsets)
+
+    def __len__(self):
+        return len(self._offsets)
+
+    def remap(self):
+        """
+        Map the current content of the file into memory.
+        """
+        with open(self.file_path, "rb") as f:
+            stat = os.fstat(f.fileno())
+            self._size = stat.st_size
+            self._inode = stat.st_ino
+            # an mmap of an empty file is not possible, readers still holding
+            # the old mapping keep using it until they are done
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if self._size else None
+
+    def scan_lines(self, start=0):
+        """
+        Yield (offset, line) of every complete line from offset start on.
+        """
+        data = self._mmap
+        if data is None:
+            return
+        offset = start
+        while offset < len(data):
+            end = data.find(b"\n", offset)
+            if end == -1:
+                break
+            yield offset, data[offset:end]
+            offset = end + 1
+
+    def index_line(self, offset, line):
+        """
+        Update the offset index with the line at offset.
+
+        Returns:
+            str: The title of the line, None for a broken line.
+        """
+        try:
+            record = IStorage.serializer.loads(line)
+        except ValueError:
+            # the rest of a line torn by a crash
+            self.garbage += len(line) + 1
+            return None
+        movie_title = record["title"]
+        old_offset = self._offsets.get(movie_title)
+        if old_offset is not None:
+            self.garbage += self._mmap.find(b"\n", old_offset) - old_offset + 1
+        if record.get("deleted"):
+            self._offsets.pop(movie_title, None)
+            self.garbage += len(line) + 1
+        else:
+            # an updated movie keeps its position in the catalog order
+            self._offsets[movie_title] = offset
+        return movie_title
+
+    def read_tail(self):
+        """
+        Index the complete lines appended since the last read, by this or
+        another process.
+
+        Returns:
+            list: The titles of the new lines.
+        """
+        self.remap()
+        movie_titles = []
+        for offset, line in self.scan_lines(self._end):
+            movie_title = self.index_line(offset, line)
+            if movie_title is not None:
+                movie_titles.append(movie_title)
+            self._end = offset + len(line) + 1
+        return movie_titles
+
+    def load_index(self):
+        """
+        Load the saved offset index and scan the lines appended since, or scan
+        the whole file if the index is missing or belongs to another file or generation.
+        """
+        self._offsets = {}
+        self.garbage = 0
+        self._end = 0
+        try:
+            index = IStorage.parse_json(self.index_path)
+            signature = IStorage.file_signature(self.file_path)
+            if (index["generation"] == self.generation and index["inode"] == signature[0]
+                    and index["size"] <= signature[1]):
+                self._offsets = index["offsets"]
+                self.garbage = index["garbage"]
+                self._end = index["size"]
+        except (FileNotFoundError, ValueError, KeyError):
+            pass
+
+        indexed_end = self._end
+        self.read_tail()
+        if self._end != indexed_end or indexed_end == 0:
+            self.save_index()
+
+    def save_index(self):
+        """
+        Save the offset index next to the catalog.
+        """
+        IStorage.modify_json(self.index_path, {
+            "generation": self.generation,
+            "inode": self._inode,
+            "size": self._end,
+            "garbage": self.garbage,
+            "offsets": self._offsets
+        })
+
+    def refresh(self):
+        """
+        Index the lines other processes appended since the last read.
+
+        Returns:
+            list or None: The titles of the new lines, None if the file was
+            replaced (compacted by another process) and the whole index was loaded again.
+        """
+        signature = IStorage.file_signature(self.file_path)
+        if signature[0] != self._inode or signature[1] < self._end:
+            self.load_index()
+            return None
+        if signature[1] == self._size:
+            return []
+        return self.read_tail()
+
+    def append(self, records):
+        """
+        Append records to the file with a single write and index them.
+
+        Parameters:
+            records (list): {"title": ..., "rating": ..., "year": ..., "poster": ...}
+                or {"title": ..., "deleted": True} dictionaries.
+
+        Returns:
+            list: The titles of the new lines, including lines other processes
+            appended since the last read.
+        """
+        data = b"".join(IStorage.serializer.dumps(record) + b"\n" for record in records)
+        if self._size and self._mmap[-1:] != b"\n":
+            # start on a new line after a line torn by a crash
+            data = b"\n" + data
+        with open(self.file_path, "ab") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        return self.read_tail()
+
+    def compact(self, generation):
+        """
+        Rewrite the file with the latest line of every movie only and save the
+        index of the new generation of the file.
+        """
+        offsets = {}
+        offset = 0
+        with IStorage.atomic_open(self.file_path, "wb") as f:
+            for movie_title, old_offset in self._offsets.items():
+                line = self._mmap[old_offset:self._mmap.find(b"\n", old_offset) + 1]
+                f.write(line)
+                offsets[movie_title] = offset
+                offset += len(line)
+
+        self._offsets = offsets
+        self.garbage = 0
+        self._end = offset
+        self.generation = generation
+        self.remap()
+        self.save_index()
+
+    def scan(self):
+        """
+        Stream (title, Movie) tuples of every movie in file order (updated movies
+        come after the others until the next compaction). The file is read
+        sequentially and only one movie is decoded at a time.
+        """
+        for offset, line in self.scan_lines():
+            try:
+                record = IStorage.serializer.loads(line)
+            except ValueError:
+                # the rest of a line torn by a crash, skipped like in index_line()
+                continue
+            if self._offsets.get(record["title"]) == offset:
+                yield record["title"], Movie.from_dict(record)
+
+
+class StorageNdjson(IStorage):
+    # rewrite the catalog once replaced and deleted lines take up this many bytes
+    COMPACT_THRESHOLD = 1024 * 1024
+
+    def __init__(self, file_path, compact_threshold=COMPACT_THRESHOLD):
+        """
+        Constructor of class StorageNdjson. Initializes the instance variables.
+
+        The movies are kept in a memory-mapped, line-delimited JSON file (see
+        NdjsonCatalog), so opening the storage doesn't decode the whole catalog
+        and commands that only touch a few titles stay fast on large catalogs.
+
+        Parameters:
+            file_path (str): The file path of the NDJSON catalog, created if missing.
+            compact_threshold (int, optional): Bytes of replaced and deleted lines
+                after which the catalog is rewritten.
+        """
+        self.file_path = file_path
+        self.compact_threshold = compact_threshold
+        if not os.path.exists(file_path):
+            open(file_path, "ab").close()
+        self.generation = self.read_lock_state()[1]
+        self.movie_dict = NdjsonCatalog(file_path, self.generation)
+
+    @staticmethod
+    def movie_record(movie_title, movie):
+        """
+        Return the NDJSON record of a movie.
+        """
+        return {"title": movie_title, **movie.to_dict()}
+
+    @classmethod
+    def convert(cls, source_path, target_path):
+        """
+        Convert a JSON, CSV or SQLite movie database (chosen by the file extension
+        of source_path) into an NDJSON catalog at target_path.
+
+        Returns:
+            int: The number of converted movies.
+        """
+        extension = os.path.splitext(source_path)[1].lower()
+        if extension == ".csv":
+            from storage_csv import StorageCsv
+            source = StorageCsv(source_path)
+        elif extension == ".sqlite":
+            from storage_sqlite import StorageSqlite
+            source = StorageSqlite(source_path)
+        else:
+            from storage_json import StorageJson
+            source = StorageJson(source_path)
+
+        movie_count = 0
+        with cls.atomic_open(target_path, "wb") as f:
+            for movie_title, movie in source.list_movies().items():
+                f.write(IStorage.serializer.dumps(cls.movie_record(movie_title, movie)) + b"\n")
+                movie_count += 1
+        return movie_count
+
+    def iter_movies(self):
+        """
+        Stream (title, Movie) tuples of every movie without loading the whole catalog.
+        """
+        return self.movie_dict.scan()
+
+    def refresh(self):
+        """
+        Pick up the lines other processes appended to the catalog. Only a
+        compaction by another process makes the storage load the index again.
+
+        Returns:
+            bool: True if the database changed.
+        """
+        generation = self.read_lock_state()[1]
+        if generation != self.generation:
+            self.generation = self.movie_dict.generation = generation
+            self.movie_dict.load_index()
+            self.reset_indexes()
+            return True
+        changed_titles = self.movie_dict.refresh()
+        if changed_titles is None:
+            self.reset_indexes()
+            return True
+        self.movies_changed(changed_titles)
+        return bool(changed_titles)
+
+    def write_records(self, records):
+        """
+        Append records to the catalog, update the indexes and compact the
+        catalog when it holds too many outdated lines. Callers hold write_lock().
+        """
+        self.movies_changed(self.movie_dict.append(records))
+        if self.movie_dict.garbage > self.compact_threshold:
+            self.movie_dict.compact(self.file_replaced())
+
+    def list_movies(self):
+        """
+        Returns a mapping of the title of every movie in the database to its Movie
+        record. The movies are decoded from the catalog when they are accessed.
+        """
+        return self.movie_dict
+
+    def add_movies(self, movies_data):
+        """
+        Add several fetched movies at once. All new movies are appended to the
+        catalog with a single write.
+
+        Parameters:
+            movies_data (list): List of successful OMDb responses.
+
+        Returns:
+            list: One (title, added, message) tuple per movie.
+        """
+        with self.write_lock():
+            report = []
+            records = []
+            batch_titles = set()
+            for movie_data in movies_data:
+                new_movie_title = movie_data["Title"]
+                if new_movie_title in self.movie_dict or new_movie_title in batch_titles:
+                    report.append((new_movie_title, False, "is already on the list"))
+                    continue
+
+                records.append(self.movie_record(new_movie_title, Movie.from_omdb(movie_data)))
+                batch_titles.add(new_movie_title)
+                report.append((new_movie_title, True, "was successfully added to the list"))
+
+            if records:
+                self.write_records(records)
+        return report
+
+    def delete_movie(self, movie_title):
+        """
+        Delete the movie with the given title from the database.
+
+        Returns:
+            bool: True if the movie was deleted, False if it is not in the database.
+        """
+        with self.write_lock():
+            if movie_title not in self.movie_dict:
+                return False
+            self.write_records([{"title": movie_title, "deleted": True}])
+        return True
+
+    def update_movie(self, movie_title, new_rating):
+        """
+        Update the rating of the movie with the given title.
+
+        Returns:
+            bool: True if the movie was updated, False if it is not in the database.
+        """
+        with self.write_lock():
+            if movie_title not in self.movie_dict:
+                return False
+            movie = self.movie_dict[movie_title]
+            updated_movie = movie.with_rating(new_rating)
+            self.write_records([self.movie_record(movie_title, updated_movie)])
+        return True
@@ -0,0 +1,271 @@
+from istorage import IStorage
+from movie import Movie
+import sqlite3
+
+
+class StorageSqlite(IStorage):
+    def __init__(self, file_path):
+        """
+        Constructor of class StorageSqlite. Initializes the instance variables.
+
+        The movies are stored in an indexed sqlite table. In contrast to the JSON
+        and CSV storages the catalog is not held in memory, searching, sorting and
+        the statistics are answered by SQL queries.
+
+        Parameters:
+            file_path (str): The file path of the sqlite movie database.
+        """
+        self.file_path = file_path
+        # the API server shares the storage between its threads, it serializes the access
+        self._connection = sqlite3.connect(file_path, check_same_thread=False)
+        self._connection.executescript(
+            "CREATE TABLE IF NOT EXISTS movies ("
+            "  title TEXT PRIMARY KEY,"
+            "  rating REAL,"
+            "  year INTEGER,"
+            "  poster TEXT,"
+            "  raw_year TEXT"
+            ");"
+            "CREATE INDEX IF NOT EXISTS movies_rating ON movies (rating);"
+            "CREATE INDEX IF NOT EXISTS movies_year ON movies (year);"
+        )
+        # raw_year (e.g. "2008–2013" of a series, year holds 2008) was added later
+        columns = {row[1] for row in self._connection.execute("PRAGMA table_info(movies)")}
+        if "raw_year" not in columns:
+            with self._connection:
+                self._connection.execute("ALTER TABLE movies ADD COLUMN raw_year TEXT")
+        self._data_version = self.data_version()
+
+    def data_version(self):
+        """
+        Return SQLite's data version, it changes when another connection commits.
+        """
+        return self._connection.execute("PRAGMA data_version").fetchone()[0]
+
+    def refresh(self):
+        """
+        The queries always see the current database. Only the search index and
+        the cached statistics are dropped when another process changed the table.
+
+        Returns:
+            bool: True if the database changed.
+        """
+        data_version = self.data_version()
+        if data_version == self._data_version:
+            return False
+        self._data_version = data_version
+        self.reset_indexes()
+        return True
+
+    def has_movie(self, movie_title):
+        """
+        Return True if a movie with the given title is in the database.
+        """
+        row = self._connection.execute(
+            "SELECT 1 FROM movies WHERE title = ?", (movie_title,)).fetchone()
+        return row is not None
+
+    def count_movies(self):
+        """
+        Return the number of movies in the database.
+        """
+        return self._connection.execute("SELECT COUNT(*) FROM movies").fetchone()[0]
+
+    def get_movie(self, movie_title):
+        """
+        Return the Movie record of the given title, None if it is not in the database.
+        """
+        row = self._connection.execute(
+            "SELECT rating, year, poster, raw_year FROM movies WHERE title = ?", (movie_title,)).fetchone()
+        if row is None:
+            return None
+        rating, year, poster, raw_year = row
+        return Movie(rating, Movie.parse_year(year), poster, raw_year)
+
+    def list_movies(self):
+        """
+        Returns a dictionary that maps the title of every
+        movie in the database to its Movie record.
+
+        For example, the function may return:
+        {
+          "Titanic": Movie(rating=7.9, year=1997, poster="..."),
+          "..." Movie(...)
+        }
+        """
+        rows = self._connection.execute("SELECT title, rating, year, poster, raw_year FROM movies")
+        return {title: Movie(rating, Movie.parse_year(year), poster, raw_year)
+                for title, rating, year, poster, raw_year in rows}
+
+    def list_movies_page(self, offset=0, limit=None, sort_key=None):
+        """
+        Return a page of (title, Movie) tuples, sorted and limited by SQLite.
+        """
+        order_by = {
+            None: "rowid",
+            "title": "title",
+            "rating": "rating IS NULL, rating DESC, title",
+            "year": "year IS NULL, year, title"
+        }.get(sort_key)
+        if order_by is None:
+            raise ValueError(f"Unknown sort key: {sort_key}")
+        rows = self._connection.execute(
+            f"SELECT title, rating, year, poster, raw_year FROM movies ORDER BY {order_by} LIMIT ? OFFSET ?",
+            (-1 if limit is None else limit, offset))
+        return [(title, Movie(rating, Movie.parse_year(year), poster, raw_year))
+                for title, rating, year, poster, raw_year in rows]
+
+    def search_movies(self, query):
+        """
+        Return a (title, rating) tuple for every movie whose title contains the
+        query. The search is case-insensitive, missing ratings are None.
+        """
+        pattern = "%" + query.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+        rows = self._connection.execute(
+            "SELECT title, rating FROM movies WHERE title LIKE ? ESCAPE '\\'", (pattern,))
+        return rows.fetchall()
+
+    def movie_titles(self):
+        """
+        Return the titles of every movie in the database.
+        """
+        return [row[0] for row in self._connection.execute("SELECT title FROM movies")]
+
+    def fuzzy_search_movies(self, query, limit=10):
+        """
+        Return up to limit (title, rating) tuples of the movies whose titles are
+        most similar to the query. The titles come from the in-memory search
+        index, their ratings are looked up in the database.
+        """
+        movie_titles = [movie_title for movie_title, _ in self.search_index().fuzzy_search(query, limit)]
+        placeholders = ", ".join("?" * len(movie_titles))
+        ratings = dict(self._connection.execute(
+            f"SELECT title, rating FROM movies WHERE title IN ({placeholders})", movie_titles))
+        return [(movie_title, ratings.get(movie_title)) for movie_title in movie_titles]
+
+    @staticmethod
+    def rating_condition(min_rating, max_rating):
+        """
+        Return the WHERE clause and its parameters for the rating bounds.
+        """
+        if min_rating is None and max_rating is None:
+            return "", ()
+        return "WHERE rating BETWEEN ? AND ?", (
+            float("-inf") if min_rating is None else min_rating,
+            float("inf") if max_rating is None else max_rating)
+
+    def movies_sorted_by_rating(self, offset=0, limit=None, min_rating=None, max_rating=None):
+        """
+        Return (title, rating) tuples sorted by rating in descending order, ties by
+        title, see IStorage.movies_sorted_by_rating(). Only the requested page is read
+        from the rating index of the table.
+        """
+        condition, parameters = self.rating_condition(min_rating, max_rating)
+        rows = self._connection.execute(
+            f"SELECT title, rating FROM movies {condition} "
+            f"ORDER BY rating IS NULL, rating DESC, title LIMIT ? OFFSET ?",
+            (*parameters, -1 if limit is None else limit, offset))
+        return rows.fetchall()
+
+    def count_movies_by_rating(self, min_rating=None, max_rating=None):
+        """
+        Return the number of movies movies_sorted_by_rating() returns for the rating bounds.
+        """
+        condition, parameters = self.rating_condition(min_rating, max_rating)
+        return self._connection.execute(
+            f"SELECT COUNT(*) FROM movies {condition}", parameters).fetchone()[0]
+
+    def compute_movie_stats(self):
+        """
+        Compute the rating statistics of the database with SQL queries,
+        see IStorage.movie_stats(). Movies without a rating are ignored.
+        """
+        rated_count, average = self._connection.execute(
+            "SELECT COUNT(rating), AVG(rating) FROM movies").fetchone()
+        if rated_count == 0:
+            return {"count": 0, "average": None, "median": None, "best": None, "worst": None}
+
+        # the median is read from the rating index, only the middle rows are fetched
+        middle_ratings = [row[0] for row in self._connection.execute(
+            "SELECT rating FROM movies WHERE rating IS NOT NULL ORDER BY rating "
+            "LIMIT ? OFFSET ?", (2 - rated_count % 2, (rated_count - 1) // 2))]
+        median = sum(middle_ratings) / len(middle_ratings)
+
+        best = self._connection.execute(
+            "SELECT title, rating FROM movies WHERE rating IS NOT NULL "
+            "ORDER BY rating DESC LIMIT 1").fetchone()
+        worst = self._connection.execute(
+            "SELECT title, rating FROM movies WHERE rating IS NOT NULL "
+            "ORDER BY rating LIMIT 1").fetchone()
+        return {"count": rated_count, "average": average, "median": median,
+                "best": best, "worst": worst}
+
+    def random_movie(self):
+        """
+        Return the (title, rating) tuple of a random movie.
+        """
+        return self._connection.execute(
+            "SELECT title, rating FROM movies ORDER BY RANDOM() LIMIT 1").fetchone()
+
+    def insert_movies(self, movies_data):
+        """
+        Insert the new movies of the OMDb responses in a single transaction.
+
+        Returns:
+            list: One (title, added, message) tuple per movie.
+        """
+        report = []
+        with self._connection:
+            for movie_data in movies_data:
+                new_movie_title = str(movie_data["Title"])
+                new_movie = Movie.from_omdb(movie_data)
+                cursor = self._connection.execute(
+                    "INSERT OR IGNORE INTO movies (title, rating, year, poster, raw_year) VALUES (?, ?, ?, ?, ?)",
+                    (new_movie_title, new_movie.rating, new_movie.year, new_movie.poster, new_movie.raw_year))
+                if cursor.rowcount:
+                    report.append((new_movie_title, True, "was successfully added to the list"))
+                else:
+                    report.append((new_movie_title, False, "is already on the list"))
+        self.movies_changed([movie_title for movie_title, added, _ in report if added])
+        return report
+
+    def add_movies(self, movies_data):
+        """
+        Add several fetched movies at once in a single transaction.
+
+        Parameters:
+            movies_data (list): List of successful OMDb responses.
+
+        Returns:
+            list: One (title, added, message) tuple per movie.
+        """
+        return self.insert_movies(movies_data)
+
+    def delete_movie(self, movie_title):
+        """
+        Delete the movie with the given title from the database.
+
+        Returns:
+            bool: True if the movie was deleted, False if it is not in the database.
+        """
+        with self._connection:
+            cursor = self._connection.execute("DELETE FROM movies WHERE title = ?", (movie_title,))
+        if not cursor.rowcount:
+            return False
+        self.movies_changed([movie_title])
+        return True
+
+    def update_movie(self, movie_title, new_rating):
+        """
+        Update the rating of the movie with the given title.
+
+        Returns:
+            bool: True if the movie was updated, False if it is not in the database.
+        """
+        with self._connection:
+            cursor = self._connection.execute(
+                "UPDATE movies SET rating = ? WHERE title = ?", (new_rating, movie_title))
+        if not cursor.rowcount:
+            return False
+        self.movies_changed([movie_title])
+        return True
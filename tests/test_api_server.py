@@ -0,0 +1,72 @@
+import gzip
+import http.client
+import json
+import os
+import tempfile
+import threading
+import unittest
+
+from api_server import MovieApiServer
+from storage_json import StorageJson
+
+
+def omdb_movie(title, rating="7.5", year="2001"):
+    return {"Title": title, "imdbRating": rating, "Year": year, "Poster": "N/A", "Response": "True"}
+
+
+class MovieApiServerTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        file_path = os.path.join(self.tmp_dir.name, "movies.json")
+        with open(file_path, "w") as f:
+            f.write("{}")
+        self.storage = StorageJson(file_path)
+        self.storage.add_movies([omdb_movie("Breaking Bad", "9.5", "2008–2013")] +
+                                [omdb_movie(f"Movie {i}") for i in range(150)])
+        self.server = MovieApiServer(("127.0.0.1", 0), self.storage)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.connection = http.client.HTTPConnection(*self.server.server_address)
+
+    def tearDown(self):
+        self.connection.close()
+        self.server.shutdown()
+        self.server.server_close()
+        self.tmp_dir.cleanup()
+
+    def get(self, path, headers=None):
+        self.connection.request("GET", path, headers=headers or {})
+        response = self.connection.getresponse()
+        return response, response.read()
+
+    def test_movie_keeps_year_text(self):
+        response, body = self.get("/movies/Breaking%20Bad")
+        self.assertEqual(response.status, 200)
+        movie = json.loads(body)
+        self.assertEqual((movie["year"], movie["year_text"]), (2008, "2008–2013"))
+
+    def test_search_is_limited(self):
+        movies = json.loads(self.get("/search?q=movie")[1])
+        self.assertEqual((movies["count"], len(movies["movies"])), (150, MovieApiServer.DEFAULT_LIMIT))
+        movies = json.loads(self.get("/search?q=movie&limit=5")[1])
+        self.assertEqual(len(movies["movies"]), 5)
+        movies = json.loads(self.get("/search?q=moive&fuzzy=1&limit=3")[1])
+        self.assertEqual(len(movies["movies"]), 3)
+        self.assertEqual(self.get("/search?q=movie&limit=0")[0].status, 400)
+
+    def test_etag_and_gzip(self):
+        response, body = self.get("/movies?limit=100", {"Accept-Encoding": "gzip"})
+        self.assertEqual(response.getheader("Content-Encoding"), "gzip")
+        self.assertEqual(len(json.loads(gzip.decompress(body))["movies"]), 100)
+        etag = response.getheader("ETag")
+
+        response, body = self.get("/movies?limit=100", {"If-None-Match": etag})
+        self.assertEqual((response.status, body), (304, b""))
+
+        self.storage.update_movie("Movie 1", 1.0)
+        response, _ = self.get("/movies?limit=100", {"If-None-Match": etag})
+        self.assertEqual(response.status, 200)
+        self.assertNotEqual(response.getheader("ETag"), etag)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,75 @@
+import contextlib
+import io
+import os
+import tempfile
+import unittest
+
+import cli
+from storage_json import StorageJson
+from storage_ndjson import StorageNdjson
+
+
+def omdb_movie(title, rating="7.5", year="2001"):
+    return {"Title": title, "imdbRating": rating, "Year": year, "Poster": "N/A", "Response": "True"}
+
+
+class CliTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.file_path = os.path.join(self.tmp_dir.name, "movies.json")
+        with open(self.file_path, "w") as f:
+            f.write("{}")
+        StorageJson(self.file_path).add_movies([omdb_movie("Titanic", "7.9", "1997"), omdb_movie("Up", "8.3"),
+                                                omdb_movie("Unrated", "N/A", "2008–2013")])
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def run_cli(self, *argv):
+        """
+        Run the command line interface on the test database, return
+        (exit code, stdout, stderr).
+        """
+        out, err = io.StringIO(), io.StringIO()
+        with contextlib.redirect_stdout(out), contextlib.redirect_stderr(err):
+            exit_code = cli.main(["--file", self.file_path, *argv])
+        return exit_code, out.getvalue(), err.getvalue()
+
+    def test_list(self):
+        self.assertEqual(self.run_cli("list", "--sort", "rating", "--limit", "2"),
+                         (0, "Up\t8.3\t2001\tN/A\nTitanic\t7.9\t1997\tN/A\n", ""))
+        exit_code, output, _ = self.run_cli("list", "--offset", "2")
+        self.assertEqual(output, "Unrated\tN/A\t2008–2013\tN/A\n")
+
+    def test_update_and_delete(self):
+        self.assertEqual(self.run_cli("update", "Titanic", "9")[0], 0)
+        self.assertEqual(self.run_cli("delete", "Up")[0], 0)
+        self.assertEqual(self.run_cli("delete", "Up"), (1, "", "Up is not on the list\n"))
+        self.assertEqual(self.run_cli("update", "Up", "5")[0], 1)
+        self.assertEqual(sorted(StorageJson(self.file_path).list_movies()), ["Titanic", "Unrated"])
+        self.assertEqual(StorageJson(self.file_path).get_movie("Titanic").rating, 9.0)
+
+    def test_stats(self):
+        exit_code, output, _ = self.run_cli("stats")
+        self.assertEqual(exit_code, 0)
+        self.assertEqual(output.splitlines(), ["count: 2", "average: 8.1", "median: 8.1",
+                                               "best: Up (8.3)", "worst: Titanic (7.9)"])
+
+    def test_search(self):
+        self.assertEqual(self.run_cli("search", "TAN"), (0, "Titanic\t7.9\n", ""))
+        self.assertEqual(self.run_cli("search", "Titnaic")[0], 1)
+        self.assertEqual(self.run_cli("search", "Titnaic", "--fuzzy", "--limit", "1"), (0, "Titanic\t7.9\n", ""))
+
+    def test_convert(self):
+        target = os.path.join(self.tmp_dir.name, "movies.ndjson")
+        exit_code, output, _ = self.run_cli("convert", self.file_path, target)
+        self.assertEqual((exit_code, output), (0, f"3 movies were converted to {target}\n"))
+        self.assertEqual(StorageNdjson(target).list_movies(), StorageJson(self.file_path).list_movies())
+
+    def test_columnar_needs_json_or_csv(self):
+        with self.assertRaises(SystemExit), contextlib.redirect_stderr(io.StringIO()):
+            cli.main(["--storage", "sqlite", "--columnar", "stats"])
+
+
+if __name__ == "__main__":
+    unittest.main()
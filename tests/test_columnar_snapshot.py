@@ -0,0 +1,134 @@
+import json
+import os
+import random
+import tempfile
+import unittest
+
+from columnar_snapshot import ColumnarSnapshot
+from movie import Movie
+from storage_csv import StorageCsv
+from storage_json import StorageJson
+
+
+def omdb_movie(title, rating="7.5", year="2001"):
+    return {"Title": title, "imdbRating": rating, "Year": year, "Poster": "N/A", "Response": "True"}
+
+
+def random_movies(count, seed=3):
+    rng = random.Random(seed)
+    movies = {}
+    for i in range(count):
+        rating = rng.choice(["N/A", "7.5", str(round(rng.uniform(1, 10), 1))])
+        year = rng.choice(["N/A", "1997", "2008–2013", str(rng.randrange(1920, 2025))])
+        poster = rng.choice(["N/A", f"https://example.com/{i}.jpg"])
+        movies[f"Movie {rng.randrange(10 ** 6)} ü"] = {"rating": rating, "year": year, "poster": poster}
+    return movies
+
+
+class ColumnarSnapshotTest(unittest.TestCase):
+    def test_movies_round_trip(self):
+        movies = {movie_title: Movie.from_dict(movie_data) for movie_title, movie_data in random_movies(300).items()}
+        snapshot = ColumnarSnapshot(ColumnarSnapshot.encode(movies.items(), (1, 2, 3, 4, 5, -6)))
+        self.assertEqual(snapshot.source, (1, 2, 3, 4, 5, -6))
+        self.assertEqual(list(snapshot), list(movies))
+        self.assertEqual(dict(snapshot.items()), movies)
+        self.assertNotIn("Missing", snapshot)
+
+        # changes are kept on top of the columns in dict order
+        first_title, second_title = list(movies)[:2]
+        snapshot[first_title] = movies[first_title] = Movie(1.0, None, None)
+        del snapshot[second_title], movies[second_title]
+        snapshot["New"] = movies["New"] = Movie(None, 2001, "x")
+        del snapshot["New"], movies["New"]
+        snapshot[second_title] = movies[second_title] = Movie(2.0, 2002, "y")
+        self.assertTrue(snapshot.changed)
+        self.assertEqual(list(snapshot.items()), list(movies.items()))
+        with self.assertRaises(KeyError):
+            del snapshot["New"]
+
+    def test_other_data_is_rejected(self):
+        encoded = ColumnarSnapshot.encode([("Titanic", Movie(7.9, 1997, "x"))])
+        for data in (b"", encoded[:-8], b"XCOL" + encoded[4:], encoded[:4] + b"\x09" + encoded[5:]):
+            with self.assertRaises(ValueError):
+                ColumnarSnapshot(data)
+
+
+class ColumnarStorageTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.file_path = os.path.join(self.tmp_dir.name, "movies.json")
+        with open(self.file_path, "w") as f:
+            json.dump(random_movies(300), f)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_queries_match_the_storage_without_snapshot(self):
+        StorageJson(self.file_path, columnar=True)
+        storage = StorageJson(self.file_path, columnar=True)
+        self.assertIsInstance(storage.movie_dict, ColumnarSnapshot)
+        reference = StorageJson(self.file_path)
+
+        self.assertEqual(list(storage.list_movies().items()), list(reference.list_movies().items()))
+        self.assertEqual(storage.movie_stats(), reference.movie_stats())
+        for sort_key in ("title", "rating", "year"):
+            with self.subTest(sort_key=sort_key):
+                self.assertEqual(storage.list_movies_page(10, 50, sort_key),
+                                 reference.list_movies_page(10, 50, sort_key))
+        for bounds in ((None, None), (7.5, 7.5), (None, 5.0), (8.0, None)):
+            with self.subTest(bounds=bounds):
+                self.assertEqual(storage.movies_sorted_by_rating(5, 30, *bounds),
+                                 reference.movies_sorted_by_rating(5, 30, *bounds))
+                self.assertEqual(storage.count_movies_by_rating(*bounds),
+                                 reference.count_movies_by_rating(*bounds))
+
+    def test_journal_is_replayed_on_top_of_the_snapshot(self):
+        StorageJson(self.file_path, columnar=True)
+        # writes of a process that doesn't keep the snapshot
+        writer = StorageJson(self.file_path)
+        writer.add_movies([omdb_movie("Titanic", "10.0")])
+        writer.delete_movie(next(iter(writer.movie_dict)))
+
+        storage = StorageJson(self.file_path, columnar=True)
+        self.assertIsInstance(storage.movie_dict, ColumnarSnapshot)
+        self.assertEqual(list(storage.list_movies().items()), list(writer.list_movies().items()))
+        self.assertEqual(storage.movies_sorted_by_rating(limit=1), [("Titanic", 10.0)])
+        self.assertEqual(storage.movie_stats(), writer.movie_stats())
+
+    def test_compaction_makes_the_snapshot_stale(self):
+        StorageJson(self.file_path, columnar=True)
+        writer = StorageJson(self.file_path, compact_threshold=0)
+        writer.update_movie(next(iter(writer.movie_dict)), 0.5)
+
+        storage = StorageJson(self.file_path, columnar=True)
+        self.assertNotIsInstance(storage.movie_dict, ColumnarSnapshot)
+        self.assertEqual(storage.list_movies(), writer.list_movies())
+        # a new snapshot was saved
+        self.assertIsInstance(StorageJson(self.file_path, columnar=True).movie_dict, ColumnarSnapshot)
+
+    def test_csv_snapshot(self):
+        csv_path = os.path.join(self.tmp_dir.name, "movies.csv")
+        with open(csv_path, "w") as f:
+            f.write("title,rating,year,poster\n")
+        StorageCsv(csv_path).add_movies([omdb_movie("Titanic", "7.9", "1997"), omdb_movie("Up", "8.3")])
+        StorageCsv(csv_path, columnar=True)
+        StorageCsv(csv_path).add_movies([omdb_movie("Heat", "8.3", "1995")])
+
+        # rows appended after the snapshot are read on top of it
+        storage = StorageCsv(csv_path, columnar=True)
+        self.assertIsInstance(storage.movie_dict, ColumnarSnapshot)
+        self.assertEqual(list(storage.list_movies()), ["Titanic", "Up", "Heat"])
+
+        # an edit in place makes it stale
+        with open(csv_path) as f:
+            content = f.read()
+        with open(csv_path, "w") as f:
+            f.write(content.replace("Titanic,7.9", "Titanic,1.9") + "Jaws,8.1,1975,N/A\n")
+        storage = StorageCsv(csv_path, columnar=True)
+        self.assertNotIsInstance(storage.movie_dict, ColumnarSnapshot)
+        self.assertEqual(storage.list_movies()["Titanic"].rating, 1.9)
+        self.assertEqual(len(storage.list_movies()), 4)
+
+
+if __name__ == "__main__":
+    unittest.main()
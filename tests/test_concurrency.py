@@ -0,0 +1,81 @@
+import multiprocessing
+import os
+import tempfile
+import unittest
+
+from storage_csv import StorageCsv
+from storage_json import StorageJson
+from storage_ndjson import StorageNdjson
+from storage_sqlite import StorageSqlite
+
+STORAGES = {
+    "json": (StorageJson, "{}"),
+    "csv": (StorageCsv, "title,rating,year,poster\n"),
+    "ndjson": (StorageNdjson, None),
+    "sqlite": (StorageSqlite, None),
+}
+SHARED_TITLES = [f"Shared {i}" for i in range(5)]
+
+
+def omdb_movie(title, rating="5.0"):
+    return {"Title": title, "imdbRating": rating, "Year": "2001", "Poster": "N/A", "Response": "True"}
+
+
+def writer(storage_name, file_path, worker, operations):
+    """
+    Add, update and delete titles of the worker's own and race the other
+    workers to add the shared titles. Returns ({title: rating} expected of the
+    own titles, shared titles this worker added).
+    """
+    storage = STORAGES[storage_name][0](file_path)
+    expected = {}
+    shared_added = []
+    for i in range(operations):
+        movie_title = f"Worker {worker} {i}"
+        ((_, added, _),) = storage.add_movies([omdb_movie(movie_title)])
+        assert added, movie_title
+        expected[movie_title] = 5.0
+        if i % 3 == 1:
+            assert storage.update_movie(movie_title, worker + i / 100)
+            expected[movie_title] = worker + i / 100
+        elif i % 3 == 2:
+            assert storage.delete_movie(movie_title)
+            del expected[movie_title]
+        ((_, added, _),) = storage.add_movies([omdb_movie(SHARED_TITLES[i % len(SHARED_TITLES)])])
+        if added:
+            shared_added.append(SHARED_TITLES[i % len(SHARED_TITLES)])
+    return expected, shared_added
+
+
+class ConcurrentWritersTest(unittest.TestCase):
+    PROCESSES = 4
+    OPERATIONS = 30
+
+    def test_no_update_is_lost(self):
+        for storage_name, (storage_class, content) in STORAGES.items():
+            with self.subTest(storage=storage_name), tempfile.TemporaryDirectory() as tmp_dir:
+                file_path = os.path.join(tmp_dir, f"movies.{storage_name}")
+                if content is not None:
+                    with open(file_path, "w") as f:
+                        f.write(content)
+
+                with multiprocessing.Pool(self.PROCESSES) as pool:
+                    outcomes = pool.starmap(writer, [(storage_name, file_path, worker, self.OPERATIONS)
+                                                     for worker in range(self.PROCESSES)])
+
+                expected = {}
+                shared_added = []
+                for worker_expected, worker_shared_added in outcomes:
+                    expected.update(worker_expected)
+                    shared_added.extend(worker_shared_added)
+                # every shared title was added by exactly one worker
+                self.assertEqual(sorted(shared_added), SHARED_TITLES)
+
+                movies = storage_class(file_path).list_movies()
+                self.assertEqual(sorted(movies), sorted([*expected, *SHARED_TITLES]))
+                for movie_title, rating in expected.items():
+                    self.assertEqual(movies[movie_title].rating, rating, movie_title)
+
+
+if __name__ == "__main__":
+    unittest.main()
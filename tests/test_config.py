@@ -0,0 +1,38 @@
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+
+from config import Config
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class ConfigTest(unittest.TestCase):
+    def test_file_is_parsed_once(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            file_path = os.path.join(tmp_dir, "api_key.json")
+            with open(file_path, "w") as f:
+                json.dump({"api_key": "first"}, f)
+            config = Config.load(file_path)
+            os.remove(file_path)
+            self.assertIs(Config.load(file_path), config)
+            self.assertEqual(config.fetch_movie_url, "http://www.omdbapi.com/?apikey=first&")
+
+
+class LazyImportTest(unittest.TestCase):
+    def test_startup_skips_unused_modules(self):
+        # a fresh interpreter, the other tests already imported everything
+        script = ("import sys, cli, main, movie_app, storage_json\n"
+                  "print(sorted(name for name in ('requests', 'sqlite3', 'concurrent.futures', 'storage_csv', "
+                  "'storage_sqlite', 'storage_ndjson', 'api_server', 'site_generator', 'poster_mirror', "
+                  "'instrumentation') if name in sys.modules))")
+        result = subprocess.run([sys.executable, "-c", script], cwd=ROOT_DIR,
+                                capture_output=True, text=True, check=True)
+        self.assertEqual(result.stdout.strip(), "[]")
+
+
+if __name__ == "__main__":
+    unittest.main()
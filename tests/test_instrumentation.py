@@ -0,0 +1,75 @@
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+
+from instrumentation import Instrumentation
+from storage_json import StorageJson
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class Journal:
+    def __init__(self, file_path):
+        self.file_path = file_path
+
+    def append(self, data):
+        with open(self.file_path, "a") as f:
+            f.write(data)
+
+    @staticmethod
+    def read(file_path):
+        with open(file_path) as f:
+            return f.read()
+
+
+class InstrumentationTest(unittest.TestCase):
+    def test_calls_and_bytes_are_recorded(self):
+        instrumentation = Instrumentation()
+        instrumentation.instrument_method(Journal, "append", "append", lambda args: args[0].file_path)
+        instrumentation.instrument_method(Journal, "read", "read", lambda args: args[0])
+        # instrumenting twice doesn't count the calls twice
+        instrumentation.instrument_method(Journal, "append", "append", lambda args: args[0].file_path)
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            journal = Journal(os.path.join(tmp_dir, "journal"))
+            journal.append("12345")
+            journal.append("678")
+            self.assertEqual(Journal.read(journal.file_path), "12345678")
+
+        append = instrumentation.calls["Journal.append"]
+        self.assertEqual((append["count"], append["bytes_written"], sum(append["histogram"])), (2, 8, 2))
+        self.assertEqual(instrumentation.calls["Journal.read"]["bytes_read"], 8)
+        report = instrumentation.report()
+        self.assertIn("Journal.append", report)
+        self.assertIn("latency histograms", report)
+
+    def test_percentile_bound(self):
+        instrumentation = Instrumentation()
+        histogram = [0, 90, 0, 9] + [0] * (len(Instrumentation.BUCKETS_MS) - 4) + [1]
+        self.assertEqual(instrumentation.percentile_bound(histogram, 0.5), Instrumentation.BUCKETS_MS[1])
+        self.assertEqual(instrumentation.percentile_bound(histogram, 0.99), Instrumentation.BUCKETS_MS[3])
+        self.assertIsNone(instrumentation.percentile_bound(histogram, 1))
+
+    def test_cli_prints_the_report_on_exit(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            file_path = os.path.join(tmp_dir, "movies.json")
+            with open(file_path, "w") as f:
+                f.write("{}")
+            StorageJson(file_path).add_movies([{"Title": "Titanic", "imdbRating": "7.9", "Year": "1997",
+                                                "Poster": "N/A", "Response": "True"}])
+            result = subprocess.run([sys.executable, "cli.py", "--instrument", "--file", file_path,
+                                     "update", "Titanic", "8"],
+                                    cwd=ROOT_DIR, capture_output=True, text=True, check=True)
+
+        table = result.stderr.split("\n\n")[0]
+        lines = {line.split()[0]: line.split() for line in table.splitlines()}
+        self.assertEqual(lines["StorageJson.update_movie"][1], "1")
+        self.assertEqual(lines["StorageJson.load"][1], "1")
+        self.assertEqual(lines["StorageJson.load"][7], "2")  # the snapshot "{}"
+        self.assertGreater(int(lines["StorageJson.append_journal"][8]), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,55 @@
+import os
+import tempfile
+import unittest
+
+from movie import Movie
+from storage_csv import StorageCsv
+from storage_json import StorageJson
+from storage_ndjson import StorageNdjson
+from storage_sqlite import StorageSqlite
+
+
+def omdb_series(title, year="2008–2013"):
+    return {"Title": title, "imdbRating": "9.5", "Year": year, "Poster": "N/A", "Response": "True"}
+
+
+class SeriesYearTest(unittest.TestCase):
+    def test_series_year_is_kept(self):
+        movie = Movie.from_strings("9.5", "2008–2013", "N/A")
+        self.assertEqual(movie.year, 2008)
+        self.assertEqual(movie.year_text, "2008–2013")
+        self.assertEqual(movie.to_dict()["year"], "2008–2013")
+        self.assertEqual(movie.with_rating(8.0).year_text, "2008–2013")
+
+    def test_plain_year_has_no_raw_year(self):
+        self.assertIsNone(Movie.from_strings("7.9", "1997", "N/A").raw_year)
+        self.assertIsNone(Movie.from_strings("7.9", "N/A", "N/A").raw_year)
+
+    def test_storages_round_trip(self):
+        storages = [
+            ("json", "movies.json", lambda path: StorageJson(path), "{}"),
+            ("json columnar", "movies.json", lambda path: StorageJson(path, columnar=True), "{}"),
+            ("csv", "movies.csv", lambda path: StorageCsv(path), "title,rating,year,poster\n"),
+            ("csv columnar", "movies.csv", lambda path: StorageCsv(path, columnar=True), "title,rating,year,poster\n"),
+            ("ndjson", "movies.ndjson", lambda path: StorageNdjson(path), ""),
+            ("sqlite", "movies.sqlite", lambda path: StorageSqlite(path), None),
+        ]
+        for name, file_name, open_storage, content in storages:
+            with self.subTest(storage=name), tempfile.TemporaryDirectory() as tmp_dir:
+                file_path = os.path.join(tmp_dir, file_name)
+                if content is not None:
+                    with open(file_path, "w") as f:
+                        f.write(content)
+                storage = open_storage(file_path)
+                storage.add_movies([omdb_series("Breaking Bad"), omdb_series("Titanic", "1997")])
+                storage.update_movie("Breaking Bad", 9.4)
+                # twice, the second load of a columnar storage maps its snapshot
+                for _ in range(2):
+                    movies = open_storage(file_path).list_movies()
+                    movie = movies["Breaking Bad"]
+                    self.assertEqual((movie.rating, movie.year, movie.year_text), (9.4, 2008, "2008–2013"))
+                    self.assertEqual(movies["Titanic"].year_text, "1997")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,179 @@
+import contextlib
+import io
+import json
+import os
+import tempfile
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+from urllib.parse import parse_qs, urlsplit
+
+from config import Config
+from movie_app import MovieApp
+from storage_json import StorageJson
+from storage_sqlite import StorageSqlite
+
+
+def omdb_movie(title, rating="7.5"):
+    return {"Title": title, "imdbRating": rating, "Year": "2001", "Poster": "N/A", "Response": "True"}
+
+
+class OmdbServer:
+    """
+    Local HTTP server answering OMDb requests for the titles in movies, other
+    titles are not found and a title in failing is answered with 500. Every
+    request takes delay seconds, the most requests served at once are counted.
+    """
+    def __init__(self, movies, delay=0.1):
+        self.movies = movies
+        self.failing = set()
+        self.delay = delay
+        self.requests = 0
+        self.running = 0
+        self.max_running = 0
+        self._lock = threading.Lock()
+        server = self
+
+        class OmdbHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                movie_title = parse_qs(urlsplit(self.path).query)["t"][0]
+                with server._lock:
+                    server.requests += 1
+                    server.running += 1
+                    server.max_running = max(server.max_running, server.running)
+                time.sleep(server.delay)
+                with server._lock:
+                    server.running -= 1
+                if movie_title in server.failing:
+                    self.send_error(500)
+                    return
+                movie = server.movies.get(movie_title, {"Response": "False", "Error": "Movie not found!"})
+                body = json.dumps(movie).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), OmdbHandler)
+        self.url = f"http://127.0.0.1:{self._server.server_address[1]}/"
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+class MovieAppTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        file_path = os.path.join(self.tmp_dir.name, "movies.json")
+        with open(file_path, "w") as f:
+            f.write("{}")
+        self.storage = StorageJson(file_path)
+        # unrated movies count as well
+        self.storage.add_movies([omdb_movie("Titanic"), omdb_movie("Unrated", "N/A"), omdb_movie("Up", "8.3")])
+        self.app = MovieApp(self.storage, config=Config("test"))
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def run_command(self, command):
+        out = io.StringIO()
+        with contextlib.redirect_stdout(out):
+            command()
+        return out.getvalue()
+
+    def test_list_movies_prints_the_total(self):
+        output = self.run_command(self.app._command_list_movies)
+        self.assertIn("3 movies in total:", output)
+        for movie_title in ("Titanic", "Unrated", "Up"):
+            self.assertIn(movie_title, output)
+
+    def test_list_movies_page(self):
+        out = io.StringIO()
+        self.assertEqual(self.app.list_movies(offset=1, limit=1, sort_key="title", out=out), 1)
+        self.assertIn("Unrated", out.getvalue())
+        self.assertNotIn("Titanic", out.getvalue())
+
+    def test_count_movies(self):
+        self.assertEqual(self.storage.count_movies(), 3)
+        sqlite_storage = StorageSqlite(os.path.join(self.tmp_dir.name, "movies.sqlite"))
+        sqlite_storage.add_movies([omdb_movie("Titanic"), omdb_movie("Unrated", "N/A")])
+        self.assertEqual(sqlite_storage.count_movies(), 2)
+
+    def test_sort_movies_by_rating(self):
+        self.assertEqual(self.storage.movies_sorted_by_rating(),
+                         [("Up", 8.3), ("Titanic", 7.5), ("Unrated", None)])
+        # the rating index is updated by the writes
+        self.storage.update_movie("Titanic", 9.0)
+        self.storage.add_movies([omdb_movie("Heat", "8.3")])
+        with mock.patch("builtins.input", return_value="8-9"):
+            output = self.run_command(self.app._command_sort_movie)
+        self.assertIn("3 movies sorted", output)
+        self.assertLess(output.index("Titanic: 9.0"), output.index("Heat: 8.3"))
+        self.assertLess(output.index("Heat: 8.3"), output.index("Up: 8.3"))
+        self.assertNotIn("Unrated", output)
+
+    def test_movie_stats(self):
+        output = self.run_command(self.app._command_movie_stats)
+        self.assertIn("The average score of all movies is: 7.9", output)
+        self.assertIn("The median of all movies is: 7.9", output)
+        self.assertIn("highest rating is: Up with a rating of 8.3", output)
+        self.assertIn("lowest rating is: Titanic with a rating of 7.5", output)
+
+    def test_movie_stats_are_cached_until_a_change(self):
+        stats = self.storage.movie_stats()
+        self.assertIs(self.storage.movie_stats(), stats)
+        self.storage.update_movie("Unrated", 9.0)
+        stats = self.storage.movie_stats()
+        self.assertEqual((stats["count"], stats["best"]), (3, ("Unrated", 9.0)))
+        # a change of another process
+        StorageJson(self.storage.file_path).delete_movie("Unrated")
+        self.assertTrue(self.storage.refresh())
+        self.assertEqual(self.storage.movie_stats()["best"], ("Up", 8.3))
+
+
+class AddMoviesTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        file_path = os.path.join(self.tmp_dir.name, "movies.json")
+        with open(file_path, "w") as f:
+            f.write("{}")
+        self.storage = StorageJson(file_path)
+        self.storage.add_movies([omdb_movie("Titanic")])
+        self.server = OmdbServer({movie_title: omdb_movie(movie_title)
+                                  for movie_title in ("Titanic", "Up", "Alien", "Heat", "Jaws", "Fargo")})
+        config = Config("test", omdb_cache_path=os.path.join(self.tmp_dir.name, "omdb_cache.sqlite"))
+        config.OMDB_URL = self.server.url
+        self.app = MovieApp(self.storage, config=config)
+
+    def tearDown(self):
+        self.server.close()
+        self.tmp_dir.cleanup()
+
+    def test_add_movies_concurrently(self):
+        self.server.failing.add("Heat")
+        report = self.app.add_movies(["Up", "Titanic", "Unknown", "Heat", "Alien", "Jaws", "Fargo"])
+
+        self.assertEqual([(movie_title, added) for movie_title, added, _ in report],
+                         [("Unknown", False), ("Heat", False), ("Up", True), ("Titanic", False),
+                          ("Alien", True), ("Jaws", True), ("Fargo", True)])
+        self.assertIn("could not be fetched", report[1][2])
+        self.assertEqual(sorted(self.storage.list_movies()), ["Alien", "Fargo", "Jaws", "Titanic", "Up"])
+        self.assertGreater(self.server.max_running, 1)
+
+    def test_cached_responses_are_not_fetched_again(self):
+        self.app.add_movies(["Up", "Unknown"])
+        requests = self.server.requests
+        self.app.add_movies(["up", "Unknown"])
+        self.assertEqual(self.server.requests, requests)
+
+
+if __name__ == "__main__":
+    unittest.main()
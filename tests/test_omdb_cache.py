@@ -0,0 +1,65 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from omdb_cache import OmdbCache
+
+
+def omdb_movie(title):
+    return {"Title": title, "imdbRating": "7.5", "Year": "2001", "Poster": "N/A", "Response": "True"}
+
+
+NOT_FOUND = {"Response": "False", "Error": "Movie not found!"}
+
+
+class OmdbCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.file_path = os.path.join(self.tmp_dir.name, "omdb_cache.sqlite")
+        self.now = 1000.0
+        patcher = mock.patch("omdb_cache.time.time", lambda: self.now)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_titles_share_an_entry_across_instances(self):
+        OmdbCache(self.file_path).put({"t": "The  Matrix"}, omdb_movie("The Matrix"))
+        cache = OmdbCache(self.file_path)
+        self.assertEqual(cache.get({"t": "the matrix "}), omdb_movie("The Matrix"))
+        self.assertIsNone(cache.get({"t": "Matrix"}))
+        self.assertEqual(cache.stats(), {"hits": 1, "misses": 1, "entries": 1})
+
+    def test_entries_expire(self):
+        cache = OmdbCache(self.file_path, ttl=100, negative_ttl=10)
+        cache.put({"t": "Up"}, omdb_movie("Up"))
+        cache.put({"t": "Unknown"}, NOT_FOUND)
+        self.now += 50
+        self.assertIsNone(cache.get({"t": "Unknown"}))
+        self.assertEqual(cache.get({"t": "Up"}), omdb_movie("Up"))
+        self.now += 51
+        self.assertIsNone(cache.get({"t": "Up"}))
+        self.assertEqual(cache.stats()["entries"], 0)
+
+    def test_least_recently_used_entries_are_evicted(self):
+        cache = OmdbCache(self.file_path, max_entries=2)
+        for movie_title in ("Up", "Alien"):
+            cache.put({"t": movie_title}, omdb_movie(movie_title))
+            self.now += 1
+        cache.get({"t": "Up"})
+        self.now += 1
+        cache.put({"t": "Jaws"}, omdb_movie("Jaws"))
+        self.assertIsNone(cache.get({"t": "Alien"}))
+        self.assertIsNotNone(cache.get({"t": "Up"}))
+        self.assertIsNotNone(cache.get({"t": "Jaws"}))
+
+    def test_api_key_errors_are_not_cached(self):
+        cache = OmdbCache(self.file_path)
+        cache.put({"t": "Up"}, {"Response": "False", "Error": "Request limit reached!"})
+        self.assertIsNone(cache.get({"t": "Up"}))
+
+
+if __name__ == "__main__":
+    unittest.main()
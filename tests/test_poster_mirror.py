@@ -0,0 +1,139 @@
+import os
+import tempfile
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import poster_mirror
+from poster_mirror import PosterMirror
+
+
+class MarkerThumbnailMirror(PosterMirror):
+    """
+    Writes the thumbnails without Pillow, the content is the poster content.
+    """
+    def write_thumbnail(self, content, content_hash):
+        file_name = f"{content_hash}-thumb.jpg"
+        with open(os.path.join(self.output_dir, file_name), "wb") as f:
+            f.write(content)
+        return file_name
+
+
+class ImageServer:
+    """
+    Local HTTP server serving images with ETags. A path that isn't in images
+    is answered with 404, a path in failing with 500.
+    """
+    def __init__(self, images):
+        self.images = images
+        self.failing = set()
+        self.bodies_sent = 0
+        server = self
+
+        class ImageHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                content = server.images.get(self.path)
+                if self.path in server.failing or content is None:
+                    self.send_error(500 if self.path in server.failing else 404)
+                    return
+                etag = f'"{hash(content) & 0xffffffff:x}"'
+                if self.headers.get("If-None-Match") == etag:
+                    self.send_response(304)
+                    self.end_headers()
+                    return
+                server.bodies_sent += 1
+                self.send_response(200)
+                self.send_header("ETag", etag)
+                self.send_header("Content-Length", str(len(content)))
+                self.end_headers()
+                self.wfile.write(content)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), ImageHandler)
+        self.url = f"http://127.0.0.1:{self._server.server_address[1]}"
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+class PosterMirrorTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.server = ImageServer({"/a.jpg": b"poster one", "/b.jpg": b"poster one", "/c.jpg": b"poster two"})
+        self.urls = [self.server.url + path for path in ("/a.jpg", "/b.jpg", "/c.jpg", "/missing.jpg")] + ["N/A"]
+
+    def tearDown(self):
+        self.server.close()
+        self.tmp_dir.cleanup()
+
+    def mirror(self):
+        return PosterMirror(self.tmp_dir.name).mirror(self.urls)
+
+    def poster_files(self):
+        return sorted(name for name in os.listdir(self.tmp_dir.name) if name != "manifest.json")
+
+    def test_identical_posters_are_stored_once(self):
+        report = self.mirror()
+        self.assertEqual((report["downloaded"], report["unchanged"], report["failed"]), (3, 0, 1))
+        self.assertEqual(len(self.poster_files()), 2)
+        a_url, b_url, c_url, missing_url = self.urls[:4]
+        self.assertEqual(report["paths"][a_url], report["paths"][b_url])
+        self.assertNotEqual(report["paths"][a_url], report["paths"][c_url])
+        self.assertNotIn(missing_url, report["paths"])
+
+    def test_unchanged_posters_are_not_downloaded_again(self):
+        first = self.mirror()
+        bodies_sent = self.server.bodies_sent
+        second = self.mirror()
+        self.assertEqual((second["downloaded"], second["unchanged"], second["failed"]), (0, 3, 1))
+        self.assertEqual(self.server.bodies_sent, bodies_sent)
+        self.assertEqual(second["paths"], first["paths"])
+
+    def test_changed_poster_is_downloaded_again(self):
+        self.mirror()
+        self.server.images["/c.jpg"] = b"poster three"
+        report = self.mirror()
+        self.assertEqual((report["downloaded"], report["unchanged"]), (1, 2))
+        self.assertEqual(len(self.poster_files()), 3)
+
+    def test_failed_download_keeps_older_copy(self):
+        first = self.mirror()
+        c_url = self.urls[2]
+        self.server.failing.add("/c.jpg")
+        report = self.mirror()
+        self.assertEqual(report["failed"], 2)
+        self.assertEqual(report["paths"][c_url], first["paths"][c_url])
+        self.assertNotIn(self.urls[3], report["paths"])
+
+    def test_thumbnails_of_unchanged_posters(self):
+        self.mirror()
+        mirror = MarkerThumbnailMirror(self.tmp_dir.name)
+        mirror.thumbnail_size = (100, 150)
+        report = mirror.mirror(self.urls)
+        self.assertEqual(report["unchanged"], 3)
+        self.assertEqual(len(self.poster_files()), 4)
+        a_url, b_url, c_url = self.urls[:3]
+        self.assertTrue(report["paths"][a_url].endswith("-thumb.jpg"))
+        self.assertEqual(report["paths"][a_url], report["paths"][b_url])
+        with open(os.path.join(self.tmp_dir.name, report["paths"][c_url]), "rb") as f:
+            self.assertEqual(f.read(), b"poster two")
+
+    @unittest.skipIf(poster_mirror.Image is None, "needs Pillow")
+    def test_pillow_thumbnails_of_unchanged_posters(self):
+        import io
+        image = io.BytesIO()
+        poster_mirror.Image.new("RGB", (300, 450), "red").save(image, "PNG")
+        self.server.images["/a.jpg"] = image.getvalue()
+        self.mirror()
+        report = PosterMirror(self.tmp_dir.name, thumbnail_size=(100, 150)).mirror(self.urls[:1])
+        self.assertEqual(report["unchanged"], 1)
+        with poster_mirror.Image.open(os.path.join(self.tmp_dir.name, report["paths"][self.urls[0]])) as thumbnail:
+            self.assertEqual(thumbnail.size, (100, 150))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,51 @@
+import random
+import unittest
+
+from rating_index import RatingIndex
+
+
+def expected_range(ratings, offset=0, limit=None, min_rating=None, max_rating=None):
+    """
+    The movies of RatingIndex.range() computed by sorting all of them.
+    """
+    if min_rating is not None or max_rating is not None:
+        ratings = {title: rating for title, rating in ratings.items() if rating is not None
+                   and (min_rating is None or rating >= min_rating)
+                   and (max_rating is None or rating <= max_rating)}
+    movies = sorted(ratings.items(), key=lambda movie: (movie[1] is None, -(movie[1] or 0), movie[0]))
+    return movies[offset:None if limit is None else offset + limit]
+
+
+class RatingIndexTest(unittest.TestCase):
+    def test_updates_keep_the_order(self):
+        rng = random.Random(11)
+        ratings = {}
+        index = RatingIndex()
+        for i in range(2000):
+            movie_title = f"Movie {rng.randrange(300)}"
+            if rng.random() < 0.3:
+                ratings.pop(movie_title, None)
+                index.remove(movie_title)
+            else:
+                rating = rng.choice([None, round(rng.uniform(1, 10), 1), 7.5])
+                ratings[movie_title] = rating
+                index.add(movie_title, rating)
+
+        self.assertEqual(len(index), len(ratings))
+        self.assertEqual(index.range(), expected_range(ratings))
+        self.assertEqual(RatingIndex(ratings.items()).range(), expected_range(ratings))
+        self.assertEqual(index.top(5), expected_range(ratings, limit=5))
+        for bounds in ((7.5, 7.5), (None, 5.0), (8.0, None), (9.0, 2.0), (7.5, 10.0)):
+            with self.subTest(bounds=bounds):
+                self.assertEqual(index.range(3, 20, *bounds), expected_range(ratings, 3, 20, *bounds))
+                self.assertEqual(index.count(*bounds), len(expected_range(ratings, 0, None, *bounds)))
+
+    def test_unknown_title_is_ignored(self):
+        index = RatingIndex([("Titanic", 7.9)])
+        index.remove("Up")
+        self.assertEqual(index.range(offset=5), [])
+        self.assertEqual(index.range(), [("Titanic", 7.9)])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,55 @@
+import unittest
+
+from search_index import SearchIndex
+
+
+class CountingSearchIndex(SearchIndex):
+    def fuzzy_candidates(self, query_trigrams, min_shared):
+        candidates = super().fuzzy_candidates(query_trigrams, min_shared)
+        self.scored.append(len(candidates))
+        return candidates
+
+
+class SearchIndexTest(unittest.TestCase):
+    def setUp(self):
+        self.index = SearchIndex(["The Dark Knight", "The Dark Knight Rises", "Dark City", "Titanic", "Up"])
+
+    def test_substring_search(self):
+        self.assertEqual(self.index.search("dark KNIGHT"), ["The Dark Knight", "The Dark Knight Rises"])
+        self.assertEqual(self.index.search("u"), ["Up"])
+        self.index.remove("Up")
+        self.assertEqual(self.index.search("up"), [])
+
+    def test_fuzzy_search(self):
+        self.assertEqual(self.index.fuzzy_search("dark knigt")[0][0], "The Dark Knight")
+        self.assertEqual(self.index.fuzzy_search("titanik", limit=1), [("Titanic", 5 / 7)])
+        self.assertEqual(self.index.fuzzy_search("xyzzy"), [])
+
+    def test_fuzzy_search_short_word_with_one_edit(self):
+        # "drak" shares no trigram with "dark"
+        self.assertIn("The Dark Knight", [title for title, _ in self.index.fuzzy_search("drak")])
+        self.assertEqual(self.index.fuzzy_search("tiatnic")[0][0], "Titanic")
+
+
+class FuzzyCandidateBoundTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        # every 10th title is a sequel, far more than FUZZY_MAX_CANDIDATES share "Part II"
+        cls.index = CountingSearchIndex(f"Movie {i}, Part II" if i % 10 == 0 else f"Movie {i}"
+                                        for i in range(100000))
+
+    def setUp(self):
+        self.index.scored = []
+
+    def test_common_trigrams_are_bounded(self):
+        for query in ("Part II", "Movie", "moive 12345", "Movie 99999 x"):
+            self.assertTrue(self.index.fuzzy_search(query))
+        self.assertTrue(self.index.scored)
+        self.assertLessEqual(max(self.index.scored), SearchIndex.FUZZY_MAX_CANDIDATES)
+
+    def test_best_match_is_found(self):
+        self.assertEqual(self.index.fuzzy_search("moive 12345", limit=1)[0][0], "Movie 12345")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,68 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import istorage
+from istorage import IStorage, JsonSerializer, get_serializer, set_serializer
+from storage_json import StorageJson
+from storage_ndjson import StorageNdjson
+
+AVAILABLE = [serializer for serializer in istorage.SERIALIZERS.values() if serializer.available()]
+
+
+def omdb_movie(title, rating="7.5", year="2001"):
+    return {"Title": title, "imdbRating": rating, "Year": year, "Poster": "N/A", "Response": "True"}
+
+
+class SerializerTest(unittest.TestCase):
+    def setUp(self):
+        default_serializer = IStorage.serializer
+        self.addCleanup(setattr, IStorage, "serializer", default_serializer)
+
+    def test_fallback_to_the_standard_library(self):
+        with mock.patch("istorage.orjson", None), mock.patch("istorage.msgspec", None):
+            self.assertIs(get_serializer(), JsonSerializer)
+            for name in ("orjson", "msgspec"):
+                with self.assertRaisesRegex(ValueError, "not installed"):
+                    set_serializer(name)
+        with self.assertRaisesRegex(ValueError, "Unknown serializer"):
+            get_serializer("pickle")
+        self.assertIs(set_serializer("json"), JsonSerializer)
+        self.assertIs(IStorage.serializer, JsonSerializer)
+
+    def test_serializers_agree(self):
+        data = {"title": "Crème_brûlée–“Ø”", "rating": "N/A", "nested": [1, 2.5, None, True]}
+        for serializer in AVAILABLE:
+            with self.subTest(serializer=serializer.name):
+                encoded = serializer.dumps(data)
+                # compact, a single line of the journal
+                self.assertNotIn(b" ", encoded)
+                self.assertNotIn(b"\n", encoded)
+                self.assertEqual(serializer.loads(encoded), data)
+                self.assertEqual(JsonSerializer.loads(encoded), data)
+                with self.assertRaises(ValueError):
+                    serializer.loads(b'{"title":"Torn","rat')
+
+    def test_files_are_read_by_every_serializer(self):
+        for writer in AVAILABLE:
+            for reader in AVAILABLE:
+                with self.subTest(writer=writer.name, reader=reader.name), \
+                        tempfile.TemporaryDirectory() as tmp_dir:
+                    json_path = os.path.join(tmp_dir, "movies.json")
+                    ndjson_path = os.path.join(tmp_dir, "movies.ndjson")
+                    with open(json_path, "w") as f:
+                        f.write("{}")
+                    set_serializer(writer.name)
+                    storage = StorageJson(json_path, compact_threshold=200)
+                    storage.add_movies([omdb_movie(f"Movie {i} – ü") for i in range(5)])
+                    storage.update_movie("Movie 1 – ü", 9.0)
+                    StorageNdjson.convert(json_path, ndjson_path)
+
+                    set_serializer(reader.name)
+                    self.assertEqual(StorageJson(json_path).list_movies(), storage.list_movies())
+                    self.assertEqual(dict(StorageNdjson(ndjson_path).list_movies()), storage.list_movies())
+
+
+if __name__ == "__main__":
+    unittest.main()
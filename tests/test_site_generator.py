@@ -0,0 +1,113 @@
+import base64
+import json
+import os
+import re
+import shutil
+import subprocess
+import tempfile
+import unittest
+import zlib
+
+from istorage import IStorage
+from movie import Movie
+from search_index import SearchIndex
+from site_generator import SiteGenerator
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SEARCH_SCRIPT = os.path.join(ROOT_DIR, "_static", "movie_search.js")
+
+
+def movies(count):
+    return {f"Movie {i}": Movie(7.5, 2000 + i % 20, f"https://example.com/{i}.jpg") for i in range(count)}
+
+
+class SiteGeneratorTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.output_dir = self.tmp_dir.name
+        self.template_path = os.path.join(ROOT_DIR, "_static", "index_template.html")
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def generator(self):
+        generator = SiteGenerator(self.template_path, self.output_dir, page_size=100)
+        generator.SEARCH_SHARD_SIZE = 50
+        return generator
+
+    def search_index(self):
+        return IStorage.parse_json(os.path.join(self.output_dir, "search", "index.json"))
+
+    def test_rebuild_writes_changed_pages_only(self):
+        catalog = movies(250)
+        report = self.generator().build(catalog)
+        self.assertEqual((report["pages"], report["written"], report["search_shards_written"]), (3, 3, 5))
+
+        catalog["Movie 120"] = Movie(9.0, 2001, "https://example.com/new.jpg")
+        report = self.generator().build(catalog)
+        self.assertEqual((report["written"], report["skipped"]), (1, 2))
+        self.assertEqual((report["search_shards_written"], report["search_shards_skipped"]), (1, 4))
+        self.assertEqual(len(self.search_index()["filters"]), 5)
+
+    def test_static_posters_are_lazy(self):
+        self.generator().build(movies(10))
+        with open(os.path.join(self.output_dir, "index.html")) as f:
+            page = f.read()
+        self.assertEqual(page.count('loading="lazy"'), 10)
+
+    def test_grid_item_is_escaped(self):
+        movie = Movie(7.0, 2008, 'x" onerror="alert(1)', raw_year="2008–<b>2013</b>")
+        item = self.generator().movie_grid_item("Tom & <Jerry>", movie)
+        self.assertIn("Tom &amp; &lt;Jerry&gt;", item)
+        self.assertIn("2008–&lt;b&gt;2013&lt;/b&gt;", item)
+        self.assertIn('src="x&quot; onerror=&quot;alert(1)"', item)
+
+    def test_trigram_filter_has_every_trigram(self):
+        self.generator().build(movies(250))
+        index = self.search_index()
+        self.assertEqual(index["shard_size"], 50)
+
+        def may_contain(shard_number, title):
+            bitmap = base64.b64decode(index["filters"][shard_number])
+            bits = [zlib.crc32(trigram.encode()) % (len(bitmap) * 8)
+                    for word in SearchIndex.normalize(title).split() for trigram in SearchIndex.trigrams(word)]
+            return all(bitmap[bit >> 3] & (1 << (bit & 7)) for bit in bits)
+
+        self.assertTrue(may_contain(0, "Movie 49"))
+        self.assertTrue(may_contain(4, "movie 249"))
+        self.assertFalse(may_contain(0, "Titanic"))
+
+
+class SearchScriptTest(unittest.TestCase):
+    def test_casefold_table_matches_python(self):
+        with open(SEARCH_SCRIPT, encoding="utf-8") as f:
+            script = f.read()
+        casefold = json.loads(re.search(r"const CASEFOLD = (\{.*?\});", script, re.S).group(1))
+        spaces = json.loads(re.search(r"const SPACES = (\".*?\");", script).group(1))
+        self.assertEqual(casefold, {chr(c): chr(c).casefold() for c in range(0x110000)
+                                    if chr(c).casefold() != chr(c).lower()})
+        self.assertEqual(spaces, "".join(chr(c) for c in range(0x110000) if chr(c).isspace()))
+
+    @unittest.skipUnless(shutil.which("node"), "needs node")
+    def test_script_matches_python(self):
+        texts = ["  The  DARK Knight ", "Straße", "ΣΊΣΥΦΟΣ", "ﬁlm noir", "Ꭰ ꭰ", "Café 𝒳-Files"]
+        rows = [[text, SearchIndex.normalize(text)] for text in texts]
+        bitmap = SiteGenerator.trigram_filter(rows)
+        queries = ["dark", "strasse", "σίσυφος", "film noir", "files", "xyz", "qqq"]
+        script = (f"const search = require({json.dumps(SEARCH_SCRIPT)});"
+                  f"const bitmap = Buffer.from({json.dumps(bitmap)}, 'base64');"
+                  f"console.log(JSON.stringify({{"
+                  f"normalized: {json.dumps(texts)}.map(search.normalize),"
+                  f"found: {json.dumps(queries)}.map(function (query) {{"
+                  f"  return search.mayContain(bitmap, search.normalize(query).split(' ').flatMap(search.trigrams));"
+                  f"}})}}));")
+        result = json.loads(subprocess.run(["node", "-e", script], capture_output=True, text=True, check=True).stdout)
+
+        self.assertEqual(result["normalized"], [SearchIndex.normalize(text) for text in texts])
+        # no shard is skipped that contains a match
+        self.assertEqual(result["found"][:5], [True] * 5)
+        self.assertEqual(result["found"][5:], [False, False])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,107 @@
+import os
+import tempfile
+import unittest
+
+from movie import Movie
+from storage_csv import StorageCsv
+
+
+def omdb_movie(title, rating="7.5"):
+    return {"Title": title, "imdbRating": rating, "Year": "2001", "Poster": "N/A", "Response": "True"}
+
+
+class StorageCsvTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.file_path = os.path.join(self.tmp_dir.name, "movies.csv")
+        with open(self.file_path, "w") as f:
+            f.write("title,rating,year,poster\n")
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_add_after_last_row_without_line_break(self):
+        with open(self.file_path, "a") as f:
+            f.write("Titanic,7.9,1997,x")
+        storage = StorageCsv(self.file_path)
+        storage.add_movies([omdb_movie("New Movie")])
+
+        reloaded = StorageCsv(self.file_path)
+        self.assertEqual(sorted(reloaded.list_movies()), ["New Movie", "Titanic"])
+        self.assertEqual(reloaded.list_movies()["Titanic"].rating, 7.9)
+        self.assertEqual(sorted(storage.list_movies()), ["New Movie", "Titanic"])
+
+    def test_add_update_delete(self):
+        storage = StorageCsv(self.file_path)
+        storage.add_movies([omdb_movie("Up, Again"), omdb_movie("Titanic")])
+        self.assertTrue(storage.update_movie("Titanic", 9.0))
+        self.assertTrue(storage.delete_movie("Up, Again"))
+        self.assertFalse(storage.delete_movie("Up, Again"))
+
+        movies = StorageCsv(self.file_path).list_movies()
+        self.assertEqual(list(movies), ["Titanic"])
+        self.assertEqual(movies["Titanic"].rating, 9.0)
+
+    def test_rewrite_keeps_the_other_rows(self):
+        with open(self.file_path, "a") as f:
+            f.write('"Up, Again",8.3,2009,x\nTitanic,7.9,1997,y\nUnrated,N/A,2008–2013,N/A\n')
+        storage = StorageCsv(self.file_path)
+        self.assertTrue(storage.delete_movie("Titanic"))
+        self.assertTrue(storage.update_movie("Unrated", 6.5))
+
+        with open(self.file_path) as f:
+            self.assertEqual(f.read(), 'title,rating,year,poster\n"Up, Again",8.3,2009,x\nUnrated,6.5,2008–2013,N/A\n')
+        # the temporary file replaced the CSV file
+        self.assertEqual(sorted(os.listdir(self.tmp_dir.name)), ["movies.csv", "movies.csv.lock"])
+        self.assertEqual(storage.list_movies(), StorageCsv(self.file_path).list_movies())
+
+    def test_quoted_cells_and_malformed_rows(self):
+        with open(self.file_path, "a", newline="") as f:
+            f.write('"Crouching Tiger, Hidden Dragon",7.9,2000,x\r\n'
+                    '"The ""Good"" Place",8.2,2016–2020,y\n'
+                    '"Line\nBreak",N/A,N/A,N/A\n'
+                    '\n'
+                    'Too,Few\n')
+        movies = StorageCsv(self.file_path).list_movies()
+        self.assertEqual(list(movies), ["Crouching Tiger, Hidden Dragon", 'The "Good" Place', "Line\nBreak"])
+        self.assertEqual(movies["Crouching Tiger, Hidden Dragon"], Movie(7.9, 2000, "x"))
+        self.assertEqual(movies['The "Good" Place'].year_text, "2016–2020")
+        self.assertEqual(movies["Line\nBreak"], Movie(None, None, "N/A"))
+
+    def test_refresh_reads_appended_rows(self):
+        storage = StorageCsv(self.file_path)
+        other = StorageCsv(self.file_path)
+        other.add_movies([omdb_movie("Titanic")])
+        self.assertTrue(storage.refresh())
+        self.assertEqual(storage.search_movies("tan"), [("Titanic", 7.5)])
+
+        # a row that is still being written is read once it is complete
+        with open(self.file_path, "a") as f:
+            f.write("Up,8.3,20")
+        self.assertFalse(storage.refresh())
+        self.assertNotIn("Up", storage.list_movies())
+        with open(self.file_path, "a") as f:
+            f.write("09,x\n")
+        self.assertTrue(storage.refresh())
+        self.assertEqual(storage.list_movies()["Up"].year, 2009)
+
+        other.delete_movie("Titanic")
+        self.assertTrue(storage.refresh())
+        self.assertEqual(list(storage.list_movies()), ["Up"])
+
+    def test_refresh_after_an_edit_in_place(self):
+        storage = StorageCsv(self.file_path)
+        storage.add_movies([omdb_movie("Titanic"), omdb_movie("Up")])
+        with open(self.file_path) as f:
+            content = f.read()
+        # same size, the edited row is before the read position
+        with open(self.file_path, "w") as f:
+            f.write(content.replace("Titanic,7.5", "Titanic,9.5") + "Heat,8.3,1995,x\n")
+        self.assertTrue(storage.refresh())
+        self.assertEqual(storage.list_movies()["Titanic"].rating, 9.5)
+        self.assertEqual(storage.movies_sorted_by_rating(limit=1), [("Titanic", 9.5)])
+        self.assertIn("Heat", storage.list_movies())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,85 @@
+import os
+import tempfile
+import unittest
+
+from storage_json import StorageJson
+
+
+def omdb_movie(title, rating="7.5"):
+    return {"Title": title, "imdbRating": rating, "Year": "2001", "Poster": "N/A", "Response": "True"}
+
+
+class TornJournalTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.file_path = os.path.join(self.tmp_dir.name, "movies.json")
+        with open(self.file_path, "w") as f:
+            f.write("{}")
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_append_after_torn_line(self):
+        storage = StorageJson(self.file_path)
+        storage.add_movies([omdb_movie("Before")])
+        # a crash or a failed write left half an entry behind
+        with open(storage.journal_path, "ab") as f:
+            f.write(b'{"op":"put","title":"Torn","mo')
+
+        report = storage.add_movies([omdb_movie("New Movie")])
+        self.assertEqual(report, [("New Movie", True, "was successfully added to the list")])
+        self.assertIn("New Movie", storage.movie_dict)
+        storage.update_movie("Before", 9.0)
+
+        reloaded = StorageJson(self.file_path)
+        self.assertEqual(sorted(reloaded.movie_dict), ["Before", "New Movie"])
+        self.assertEqual(reloaded.movie_dict["Before"].rating, 9.0)
+
+    def test_torn_last_line_is_not_applied(self):
+        storage = StorageJson(self.file_path)
+        with open(storage.journal_path, "ab") as f:
+            f.write(b'{"op":"put","title":"Torn","movie":{"rating":"7.0"')
+        self.assertFalse(storage.refresh())
+        self.assertEqual(len(StorageJson(self.file_path).movie_dict), 0)
+
+
+class RefreshTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.file_path = os.path.join(self.tmp_dir.name, "movies.json")
+        with open(self.file_path, "w") as f:
+            f.write("{}")
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_journal_entries_of_another_process(self):
+        storage = StorageJson(self.file_path)
+        other = StorageJson(self.file_path)
+        self.assertFalse(storage.refresh())
+        self.assertEqual(storage.search_movies("tan"), [])
+
+        other.add_movies([omdb_movie("Titanic"), omdb_movie("Up")])
+        other.update_movie("Up", 9.0)
+        self.assertTrue(storage.refresh())
+        self.assertFalse(storage.refresh())
+        self.assertEqual(storage.movie_dict, other.movie_dict)
+        # the indexes were updated with the replayed titles
+        self.assertEqual(storage.search_movies("tan"), [("Titanic", 7.5)])
+        self.assertEqual(storage.movies_sorted_by_rating(limit=1), [("Up", 9.0)])
+
+    def test_compaction_of_another_process(self):
+        storage = StorageJson(self.file_path)
+        other = StorageJson(self.file_path, compact_threshold=0)
+        other.add_movies([omdb_movie("Titanic")])
+        self.assertEqual(os.path.getsize(other.journal_path), 0)
+        other.delete_movie("Titanic")
+        other.add_movies([omdb_movie("Up")])
+
+        self.assertTrue(storage.refresh())
+        self.assertEqual(list(storage.movie_dict), ["Up"])
+        self.assertEqual(storage.search_movies("titanic"), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
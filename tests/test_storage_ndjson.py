@@ -0,0 +1,70 @@
+import os
+import tempfile
+import unittest
+
+from istorage import IStorage
+from storage_ndjson import StorageNdjson
+
+
+def omdb_movie(title, rating="7.5"):
+    return {"Title": title, "imdbRating": rating, "Year": "2001", "Poster": "N/A", "Response": "True"}
+
+
+class StorageNdjsonTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.file_path = os.path.join(self.tmp_dir.name, "movies.ndjson")
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_torn_line_is_skipped(self):
+        StorageNdjson(self.file_path).add_movies([omdb_movie("Before")])
+        # a crash left half a line behind
+        with open(self.file_path, "ab") as f:
+            f.write(b'{"title":"Torn","rat')
+        StorageNdjson(self.file_path).add_movies([omdb_movie("After")])
+
+        storage = StorageNdjson(self.file_path)
+        self.assertEqual(sorted(storage.list_movies()), ["After", "Before"])
+        self.assertEqual([movie_title for movie_title, _ in storage.iter_movies()], ["Before", "After"])
+
+    def test_compaction(self):
+        storage = StorageNdjson(self.file_path, compact_threshold=200)
+        other = StorageNdjson(self.file_path)
+        storage.add_movies([omdb_movie(f"Movie {i}") for i in range(5)])
+        self.assertTrue(other.refresh())
+        for i in range(10):
+            storage.update_movie("Movie 1", i)
+        storage.delete_movie("Movie 3")
+
+        # only the latest line of every movie is left
+        with open(self.file_path, "rb") as f:
+            self.assertLess(len(f.read().splitlines()), 10)
+        self.assertLessEqual(storage.movie_dict.garbage, 200)
+        expected = ["Movie 0", "Movie 1", "Movie 2", "Movie 4"]
+        self.assertEqual(list(storage.list_movies()), expected)
+        self.assertEqual(storage.list_movies()["Movie 1"].rating, 9.0)
+
+        # the other process notices the new file and keeps appending to it
+        self.assertTrue(other.refresh())
+        self.assertEqual(list(other.list_movies()), expected)
+        other.add_movies([omdb_movie("After")])
+        reloaded = StorageNdjson(self.file_path)
+        self.assertEqual([movie_title for movie_title, _ in reloaded.iter_movies()], [*expected, "After"])
+        self.assertEqual(reloaded.get_movie("Movie 1").rating, 9.0)
+
+    def test_saved_index_is_reused(self):
+        StorageNdjson(self.file_path).add_movies([omdb_movie("Titanic"), omdb_movie("Up")])
+        StorageNdjson(self.file_path).update_movie("Titanic", 9.0)
+        with open(self.file_path, "ab") as f:
+            f.write(b'{"title":"Appended","rating":"N/A","year":"N/A","poster":"N/A"}\n')
+
+        storage = StorageNdjson(self.file_path)
+        self.assertEqual(list(storage.list_movies()), ["Titanic", "Up", "Appended"])
+        self.assertEqual(storage.get_movie("Titanic").rating, 9.0)
+        self.assertEqual(IStorage.parse_json(storage.movie_dict.index_path)["size"], os.path.getsize(self.file_path))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,88 @@
+import os
+import sqlite3
+import tempfile
+import unittest
+
+from storage_json import StorageJson
+from storage_sqlite import StorageSqlite
+
+
+def omdb_movie(title, rating="7.5", year="2001"):
+    return {"Title": title, "imdbRating": rating, "Year": year, "Poster": "N/A", "Response": "True"}
+
+
+MOVIES = [omdb_movie("Titanic", "7.9", "1997"), omdb_movie("Up", "8.3", "2009"),
+          omdb_movie("100% Wolf", "5.6", "2020"), omdb_movie("Snake_Eyes", "6.0", "1998"),
+          omdb_movie("Unrated", "N/A", "N/A"), omdb_movie("Breaking Bad", "9.5", "2008–2013"),
+          omdb_movie("Alien", "8.5", "1979"), omdb_movie("Aliens", "8.4", "1986")]
+
+
+class StorageSqliteTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.file_path = os.path.join(self.tmp_dir.name, "movies.sqlite")
+        self.storage = StorageSqlite(self.file_path)
+        self.storage.add_movies(MOVIES)
+        # the in-memory queries of the other storages are the reference
+        json_path = os.path.join(self.tmp_dir.name, "movies.json")
+        with open(json_path, "w") as f:
+            f.write("{}")
+        self.reference = StorageJson(json_path)
+        self.reference.add_movies(MOVIES)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_queries_match_the_in_memory_storage(self):
+        self.assertEqual(self.storage.list_movies(), self.reference.list_movies())
+        for sort_key in (None, "title", "rating", "year"):
+            with self.subTest(sort_key=sort_key):
+                self.assertEqual(self.storage.list_movies_page(1, 4, sort_key),
+                                 self.reference.list_movies_page(1, 4, sort_key))
+        for bounds in ((None, None), (8.0, None), (None, 8.3), (6.0, 8.4)):
+            with self.subTest(bounds=bounds):
+                self.assertEqual(self.storage.movies_sorted_by_rating(0, None, *bounds),
+                                 self.reference.movies_sorted_by_rating(0, None, *bounds))
+                self.assertEqual(self.storage.count_movies_by_rating(*bounds),
+                                 self.reference.count_movies_by_rating(*bounds))
+        self.assertEqual(self.storage.movie_stats(), self.reference.movie_stats())
+
+    def test_search_escapes_like_wildcards(self):
+        self.assertEqual(sorted(self.storage.search_movies("alien")), [("Alien", 8.5), ("Aliens", 8.4)])
+        self.assertEqual(self.storage.search_movies("0%"), [("100% Wolf", 5.6)])
+        self.assertEqual(self.storage.search_movies("e_e"), [("Snake_Eyes", 6.0)])
+        self.assertEqual(self.storage.fuzzy_search_movies("Titnaic", 1), [("Titanic", 7.9)])
+
+    def test_changes_of_other_connections(self):
+        self.assertEqual(self.storage.movie_stats()["best"], ("Breaking Bad", 9.5))
+        other = StorageSqlite(self.file_path)
+        self.assertTrue(other.update_movie("Up", 9.9))
+        self.assertTrue(other.delete_movie("Titanic"))
+        self.assertFalse(other.delete_movie("Titanic"))
+
+        self.assertTrue(self.storage.refresh())
+        self.assertFalse(self.storage.refresh())
+        self.assertEqual(self.storage.movie_stats()["best"], ("Up", 9.9))
+        self.assertFalse(self.storage.has_movie("Titanic"))
+        self.assertIsNone(self.storage.get_movie("Titanic"))
+
+
+class SqliteMigrationTest(unittest.TestCase):
+    def test_table_without_raw_year_is_migrated(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            file_path = os.path.join(tmp_dir, "movies.sqlite")
+            connection = sqlite3.connect(file_path)
+            with connection:
+                connection.execute("CREATE TABLE movies (title TEXT PRIMARY KEY, rating REAL, "
+                                   "year INTEGER, poster TEXT)")
+                connection.execute("INSERT INTO movies VALUES ('Titanic', 7.9, 1997, 'x')")
+            connection.close()
+
+            storage = StorageSqlite(file_path)
+            storage.add_movies([omdb_movie("Breaking Bad", "9.5", "2008–2013")])
+            self.assertEqual(storage.get_movie("Titanic").year_text, "1997")
+            self.assertEqual(StorageSqlite(file_path).get_movie("Breaking Bad").year_text, "2008–2013")
+
+
+if __name__ == "__main__":
+    unittest.main()